@@ -1,16 +1,9 @@
 from fastapi import HTTPException, Request, status
 from fastapi.params import Depends
 from sqlalchemy.orm import Session
-from .database import SessionLocal
+from .database import get_db
 from . import models
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def role_required(allowed_roles):
     def dependency(request: Request):
         role_id = request.session.get("role_id")
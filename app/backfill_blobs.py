@@ -0,0 +1,131 @@
+"""
+Backfill: pindahkan file base64 lama dari tabel ke blob store.
+
+    python -m app.backfill_blobs                    # semua tabel, batch 50
+    python -m app.backfill_blobs --batch-size 20 --only soldering,dossier
+    python -m app.backfill_blobs --keep-legacy      # isi hash tapi jangan kosongkan kolom lama
+    python -m app.backfill_blobs --metadata         # isi metadata PDF untuk baris T_Blob lama
+
+Setiap batch di-commit sendiri. Baris yang sudah punya hash dilewati, jadi
+kalau proses berhenti di tengah jalan cukup jalankan ulang perintah yang sama.
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import select
+
+from .blobstore import BlobNotFound, get_blob_store
+from .database import SessionLocal
+from .documents import DOCUMENT_KINDS, pdf_metadata, store_pdf
+from .uploads import decode_pdf_base64
+from .models import Blob
+
+
+def backfill_field(db, kind: str, batch_size: int, keep_legacy: bool, limit: int = None) -> int:
+    field = DOCUMENT_KINDS[kind]
+    model = field.model
+    pk = model.__mapper__.primary_key[0]
+    sha_col = getattr(model, field.sha_attr)
+    legacy_col = getattr(model, field.legacy_attr)
+
+    done = 0
+    last_id = None
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        stmt = (
+            select(pk, legacy_col)
+            .where(sha_col.is_(None), legacy_col.like("_%"))
+            .order_by(pk)
+            .limit(size)
+        )
+        if last_id is not None:
+            # seek supaya baris yang gagal decode tidak diambil berulang
+            stmt = stmt.where(pk > last_id)
+        rows = db.execute(stmt).all()
+        if not rows:
+            break
+
+        started = time.perf_counter()
+        for row_id, legacy_value in rows:
+            last_id = row_id
+            try:
+                data = decode_pdf_base64(legacy_value, max_bytes=0)
+            except Exception as e:
+                print(f"  ⚠️ {kind} id={row_id}: base64 tidak valid, dilewati ({e})")
+                continue
+            blob = store_pdf(db, data)
+            values = {field.sha_attr: blob.sha256}
+            if not keep_legacy:
+                values[field.legacy_attr] = ""
+            db.query(model).filter(pk == row_id).update(values, synchronize_session=False)
+            done += 1
+        db.commit()
+        print(f"  {kind}: +{len(rows)} rows (total {done}) in {time.perf_counter() - started:.2f}s, last id={last_id}")
+    return done
+
+
+def backfill_metadata(db, batch_size: int, limit: int = None) -> int:
+    """Isi PageCount/PdfVersion/Producer untuk baris T_Blob dari sebelum metadata dicatat saat upload."""
+    store = get_blob_store()
+    done = 0
+    last_sha = ""
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        blobs = db.execute(
+            select(Blob).where(Blob.pdf_version.is_(None), Blob.sha256 > last_sha).order_by(Blob.sha256).limit(size)
+        ).scalars().all()
+        if not blobs:
+            break
+        started = time.perf_counter()
+        for blob in blobs:
+            last_sha = blob.sha256
+            try:
+                with store.open(blob.sha256) as f:
+                    meta = pdf_metadata(f)
+            except BlobNotFound:
+                print(f"  ⚠️ blob {blob.sha256}: file tidak ada di blob store, dilewati")
+                continue
+            blob.page_count = meta["page_count"]
+            blob.pdf_version = meta["pdf_version"]
+            blob.producer = meta["producer"]
+            done += 1
+        db.commit()
+        print(f"  metadata: +{len(blobs)} blobs (total {done}) in {time.perf_counter() - started:.2f}s")
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.backfill_blobs", description="Move base64 PDF columns into the blob store")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--only", default="", help=f"comma separated kinds: {','.join(DOCUMENT_KINDS)}")
+    parser.add_argument("--limit", type=int, default=None, help="max rows per kind (for trial runs)")
+    parser.add_argument("--keep-legacy", action="store_true", help="do not clear the old base64 columns")
+    parser.add_argument("--metadata", action="store_true", help="only fill PDF metadata for existing T_Blob rows")
+    args = parser.parse_args(argv)
+
+    kinds = [k.strip() for k in args.only.split(",") if k.strip()] or list(DOCUMENT_KINDS)
+    unknown = set(kinds) - set(DOCUMENT_KINDS)
+    if unknown:
+        parser.error(f"unknown kinds: {', '.join(sorted(unknown))}")
+
+    db = SessionLocal()
+    if args.metadata:
+        try:
+            print(f"Done, metadata filled for {backfill_metadata(db, args.batch_size, args.limit)} blobs.")
+        finally:
+            db.close()
+        return 0
+    try:
+        total = 0
+        for kind in kinds:
+            print(f"Backfilling {kind} ...")
+            total += backfill_field(db, kind, args.batch_size, args.keep_legacy, args.limit)
+        print(f"Done, {total} files moved to blob store.")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
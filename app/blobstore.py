@@ -0,0 +1,155 @@
+"""
+Penyimpanan blob (PDF) berbasis isi, dengan key SHA-256.
+
+File yang isinya sama hanya disimpan sekali. Tabel database cukup menyimpan
+hash-nya; ukuran dan jumlah halaman dicatat di T_Blob (lihat app/documents.py).
+Backend dipilih lewat setting BLOB_STORE; saat ini tersedia "local".
+"""
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Optional, Tuple
+
+from . import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobNotFound(KeyError):
+    pass
+
+
+class BlobStore:
+    """Interface untuk backend blob store."""
+
+    def put(self, data: bytes) -> str:
+        raise NotImplementedError
+
+    def put_stream(self, stream: BinaryIO) -> Tuple[str, int]:
+        """Simpan dari file-like object secara bertahap, return (sha256, size)."""
+        raise NotImplementedError
+
+    def open(self, sha256: str) -> BinaryIO:
+        raise NotImplementedError
+
+    def get(self, sha256: str) -> bytes:
+        with self.open(sha256) as f:
+            return f.read()
+
+    def exists(self, sha256: str) -> bool:
+        raise NotImplementedError
+
+    def size(self, sha256: str) -> int:
+        raise NotImplementedError
+
+    def delete(self, sha256: str) -> None:
+        raise NotImplementedError
+
+    def local_path(self, sha256: str) -> Optional[str]:
+        """Path file di disk kalau backend-nya filesystem (untuk sendfile), selain itu None."""
+        return None
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _check_key(sha256: str) -> str:
+    key = (sha256 or "").lower()
+    if len(key) != 64 or any(c not in "0123456789abcdef" for c in key):
+        raise ValueError(f"Invalid blob key: {sha256!r}")
+    return key
+
+
+class LocalBlobStore(BlobStore):
+    """Blob di filesystem lokal: <root>/ab/cd/abcd...ef"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, sha256: str) -> str:
+        key = _check_key(sha256)
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def _commit_tmp(self, tmp_path: str, sha256: str):
+        path = self._path(sha256)
+        if os.path.exists(path):
+            os.remove(tmp_path)  # isi sama sudah ada
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def put(self, data: bytes) -> str:
+        sha = sha256_hex(data)
+        if self.exists(sha):
+            return sha
+        fd, tmp_path = tempfile.mkstemp(prefix=".upload-", dir=self.root)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self._commit_tmp(tmp_path, sha)
+        return sha
+
+    def put_stream(self, stream: BinaryIO) -> Tuple[str, int]:
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix=".upload-", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        sha = hasher.hexdigest()
+        self._commit_tmp(tmp_path, sha)
+        return sha, size
+
+    def open(self, sha256: str) -> BinaryIO:
+        try:
+            return open(self._path(sha256), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def size(self, sha256: str) -> int:
+        try:
+            return os.path.getsize(self._path(sha256))
+        except FileNotFoundError:
+            raise BlobNotFound(sha256)
+
+    def delete(self, sha256: str) -> None:
+        try:
+            os.remove(self._path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, sha256: str) -> Optional[str]:
+        path = self._path(sha256)
+        return path if os.path.exists(path) else None
+
+
+BLOB_STORES = {
+    "local": lambda: LocalBlobStore(settings.BLOB_STORE_DIR),
+}
+
+_store = None
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None:
+        try:
+            factory = BLOB_STORES[settings.BLOB_STORE]
+        except KeyError:
+            raise ValueError(f"Unknown BLOB_STORE '{settings.BLOB_STORE}', pilih salah satu: {sorted(BLOB_STORES)}")
+        _store = factory()
+    return _store
+
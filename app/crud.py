@@ -1,13 +1,21 @@
 from typing import Optional
 from fastapi import FastAPI, Response, HTTPException
 from sqlalchemy.orm import Session
-from .models import TMOperator, CertificationRecord, EvaluationDocument, PDFOPT
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import TMOperator, CertificationRecord, EvaluationDocument, PDFOPT, DossierCache, Blob, PHOTO_GROUP, FILES_GROUP
 from datetime import datetime
-from PyPDF2 import PdfMerger
-from sqlalchemy import or_, asc, desc
+from sqlalchemy import or_, and_, asc, desc, select, func, case, bindparam, event, literal
+from sqlalchemy import column, literal_column, table, text, inspect
+from sqlalchemy.orm import undefer, undefer_group, aliased, object_session
+from collections import OrderedDict
 from io import BytesIO
 import base64
-from . import models, schemas
+import json
+import re
+import threading
+import time
+from . import models, schemas, documents, settings, operator_index, roster, merge_engine, dossier
+from .blobstore import sha256_hex
 
 # -------------------- Operator List with Pagination and Search --------------------
 def list_operator(
@@ -16,6 +24,25 @@ def list_operator(
     page: int = 1,
     page_size: int = 20,
 ):
+    # Query multi-kata: full-text, urut relevansi
+    provider, terms = _fulltext_search(db, q)
+    if provider is not None and _run_steps(db, _check_provider(provider)):
+        stmt, relevance = provider.search_stmt(terms)
+        stmt = stmt.with_only_columns(TMOperator.nik, TMOperator.name)
+        total = db.execute(_count_stmt(stmt)).scalar_one()
+        items = db.execute(
+            stmt.order_by(*relevance, TMOperator.name, TMOperator.nik)
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        ).all()
+        return total, items
+
+    check_operator_index(db)
+    served = _search_operator_index(q or "", (page - 1) * page_size, page_size, order_col=1)
+    if served is not None:
+        _, filtered, items = served
+        return filtered, items
+
     query = db.query(TMOperator.nik, TMOperator.name).order_by(TMOperator.name.asc())
     if q:
         query = query.filter(
@@ -35,6 +62,17 @@ def list_operator(
     return total, items
 
 def list_operators(db: Session, search: str = "", limit: int = None):
+    if limit:
+        check_operator_index(db)
+    served = _search_operator_index(search, 0, limit) if limit else None
+    if served is not None:
+        niks = [row.nik for row in served[2]]
+        if not niks:
+            return []
+        # IN (...) tidak menjamin urutan: kembalikan sesuai urutan dari index
+        by_nik = {op.nik: op for op in db.query(models.TMOperator).filter(models.TMOperator.nik.in_(niks))}
+        return [by_nik[nik] for nik in niks if nik in by_nik]
+
     query = db.query(models.TMOperator)
     if search:
         search = f"%{search}%"
@@ -46,39 +84,527 @@ def list_operators(db: Session, search: str = "", limit: int = None):
         query = query.limit(limit)
     return query.all()
 
-def get_operators(db: Session, search: str = "", start: int = 0, length: int = 10, order_col: int = 0, order_dir: str = "asc"):
-    query = db.query(TMOperator)
 
-    # Total sebelum filter
-    total = query.count()
+# Alur query yang dipakai versi sync dan async ditulis sekali sebagai generator:
+# setiap statement di-yield, hasil db.execute dikirim balik lewat send(), return
+# value generator = hasil akhirnya. _run_steps / _run_steps_async yang menjalankannya.
+def _run_steps(db: Session, steps):
+    try:
+        stmt = next(steps)
+        while True:
+            stmt = steps.send(db.execute(stmt))
+    except StopIteration as done:
+        return done.value
+
+
+async def _run_steps_async(db: AsyncSession, steps):
+    try:
+        stmt = next(steps)
+        while True:
+            stmt = steps.send(await db.execute(stmt))
+    except StopIteration as done:
+        return done.value
+
+
+def _check_operator_index():
+    """Step: cek index in-memory masih sama dengan TM_Operator (lihat operator_index.check_version)."""
+    if operator_index.needs_check() and not operator_index.check_version((yield operator_index.version_stmt()).one()):
+        invalidate_operator_caches()
+
+
+def check_operator_index(db: Session):
+    _run_steps(db, _check_operator_index())
+
+
+async def check_operator_index_async(db: AsyncSession):
+    await _run_steps_async(db, _check_operator_index())
 
+
+def _search_operator_index(search: str, start: int, length: int, order_col: int = 0, order_dir: str = "asc"):
+    """(total, filtered, rows) dari index in-memory, atau None kalau harus lewat SQL."""
+    index = operator_index.get_index()
+    if index is None or not index.can_serve(search):
+        return None
+    return index.search(search, start, length, order_col, order_dir)
+
+
+def get_operators_fuzzy(search: str, start: int = 0, length: int = 10):
+    """
+    Fuzzy search nama operator dari index in-memory, urut kemiripan.
+    Return (total, filtered, partial, rows) atau None kalau index belum siap.
+    Hanya OPERATOR_FUZZY_LIMIT hasil teratas yang bisa di-page.
+    """
+    index = operator_index.get_index()
+    if index is None:
+        return None
+    rows, _, partial = index.fuzzy(search, settings.OPERATOR_FUZZY_LIMIT, settings.OPERATOR_FUZZY_BUDGET_MS)
+    if partial:
+        print(f"[operator_index] fuzzy {search!r} melewati budget {settings.OPERATOR_FUZZY_BUDGET_MS} ms, hasil partial")
+    return len(index), len(rows), partial, rows[start:start + length]
+
+
+def _operators_filter_stmt(search: str = ""):
+    stmt = select(TMOperator)
     if search:
-        query = query.filter(
+        stmt = stmt.where(
             (TMOperator.nik.ilike(f"%{search}%")) |
             (TMOperator.name.ilike(f"%{search}%"))
         )
+    return stmt
 
-    # Total setelah filter
-    filtered = query.count()
+
+
+# -------------------- Operator Full-Text Search --------------------
+def search_terms(search: str) -> list:
+    """Kata-kata di query pencarian (huruf/angka saja, aman dipakai di sintaks full-text)."""
+    return re.findall(r"\w+", search or "")
+
+
+class OperatorSearchProvider:
+    """Full-text search TM_Operator untuk satu dialect database."""
+
+    dialect = None
+
+    def availability_stmt(self):
+        """Query yang mengembalikan baris kalau index full-text sudah ada (lihat migrasi 5)."""
+        raise NotImplementedError
+
+    def search_stmt(self, terms: list):
+        """(select(TMOperator) yang cocok dengan semua kata sebagai prefix, ORDER BY relevansi)."""
+        raise NotImplementedError
+
+
+class SqliteFts5Provider(OperatorSearchProvider):
+    dialect = "sqlite"
+    fts = table("TM_Operator_FTS", column("rowid"), column("rank"))
+
+    def availability_stmt(self):
+        return text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'TM_Operator_FTS'")
+
+    def search_stmt(self, terms: list):
+        match = " AND ".join(f'"{term}"*' for term in terms)
+        stmt = (
+            select(TMOperator)
+            .join(self.fts, self.fts.c.rowid == literal_column("TM_Operator.rowid"))
+            .where(literal_column("TM_Operator_FTS").op("MATCH")(match))
+        )
+        # rank FTS5 = bm25(), makin kecil makin relevan
+        return stmt, [self.fts.c.rank.asc()]
+
+
+class SqlServerFullTextProvider(OperatorSearchProvider):
+    dialect = "mssql"
+
+    def availability_stmt(self):
+        return text("SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('TM_Operator')")
+
+    def search_stmt(self, terms: list):
+        condition = " AND ".join(f'"{term}*"' for term in terms)
+        ft = (
+            func.containstable(literal_column("TM_Operator"), literal_column("Name"), condition)
+            .table_valued(column("KEY"), column("RANK"))
+            .alias("ft")
+        )
+        stmt = select(TMOperator).join(ft, ft.c.KEY == TMOperator.nik)
+        return stmt, [ft.c.RANK.desc()]
+
+
+SEARCH_PROVIDERS = {
+    provider.dialect: provider
+    for provider in (SqliteFts5Provider(), SqlServerFullTextProvider())
+}
+# dialect -> (index full-text tersedia?, waktu cek). Dicek ulang setelah TTL supaya
+# `python -m app.migrate upgrade` (migrasi 5) saat app jalan langsung terpakai tanpa restart
+SEARCH_PROVIDER_RECHECK = 60
+_search_provider_available = {}
+
+
+def _provider_available(dialect: str) -> Optional[bool]:
+    """Hasil cek yang masih berlaku, atau None kalau perlu dicek (lagi)."""
+    cached = _search_provider_available.get(dialect)
+    if cached is None or time.monotonic() - cached[1] >= SEARCH_PROVIDER_RECHECK:
+        return None
+    return cached[0]
+
+
+def _dialect_name(db) -> str:
+    return getattr(db, "sync_session", db).get_bind().dialect.name
+
+
+def _fulltext_search(db, search: str):
+    """(provider, terms) kalau query multi-kata bisa dilayani full-text, selain itu (None, terms)."""
+    terms = search_terms(search)
+    provider = SEARCH_PROVIDERS.get(_dialect_name(db)) if len(terms) > 1 else None
+    if provider is None or _provider_available(provider.dialect) is False:
+        return None, terms
+    return provider, terms
+
+
+def _check_provider(provider):
+    """Step: index full-text untuk provider ini ada? (di-cache SEARCH_PROVIDER_RECHECK detik)"""
+    available = _provider_available(provider.dialect)
+    if available is None:
+        available = (yield provider.availability_stmt()).first() is not None
+        _search_provider_available[provider.dialect] = (available, time.monotonic())
+    return available
+
+
+def _fulltext_page_stmt(stmt, relevance, start: int, length: int, order_col: int, order_dir: str):
+    # Relevansi dulu, kolom sort DataTables sebagai tie-breaker
+    columns = _sort_key(order_col)
+    tie_break = [desc(c) if order_dir == "desc" else asc(c) for c in columns]
+    return stmt.order_by(*relevance, *tie_break).offset(start).limit(length)
+
+# Kolom sort DataTables -> kolom keyset (selalu diakhiri NIK supaya urutan unik)
+OPERATOR_SORT_KEYS = [
+    (TMOperator.nik,),
+    (TMOperator.name, TMOperator.nik),
+]
+
+
+def _sort_key(order_col: int):
+    return OPERATOR_SORT_KEYS[order_col] if order_col < len(OPERATOR_SORT_KEYS) else OPERATOR_SORT_KEYS[0]
+
+
+def encode_operator_cursor(item, search: str, order_col: int, order_dir: str) -> str:
+    """Cursor opaque: posisi baris terakhir + parameter query yang menghasilkannya."""
+    values = [getattr(item, col.key) for col in _sort_key(order_col)]
+    raw = json.dumps([search, order_col, order_dir, values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_operator_cursor(cursor: Optional[str], search: str, order_col: int, order_dir: str) -> Optional[list]:
+    """Nilai keyset dari cursor, atau None kalau cursor kosong/rusak/milik query lain."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        c_search, c_col, c_dir, values = json.loads(raw)
+    except Exception:
+        return None
+    if [c_search, c_col, c_dir] != [search, order_col, order_dir]:
+        return None
+    if len(values) != len(_sort_key(order_col)):
+        return None
+    return values
+
+
+def _seek_condition(columns, values, descending: bool):
+    """(a, b) > (x, y) tanpa row-value comparison (tidak didukung SQL Server)."""
+    conditions = []
+    for i, col in enumerate(columns):
+        step = col < values[i] if descending else col > values[i]
+        conditions.append(and_(*[columns[j] == values[j] for j in range(i)], step))
+    # batas kolom pertama yang redundan supaya optimizer bisa range-scan index
+    lead = columns[0] <= values[0] if descending else columns[0] >= values[0]
+    return and_(lead, or_(*conditions))
+
+
+def _operators_page_stmt(stmt, start: int, length: int, order_col: int, order_dir: str, after: Optional[list] = None):
     # Ordering
-    columns = [TMOperator.nik, TMOperator.name]
-    order_column = columns[order_col] if order_col < len(columns) else TMOperator.nik
+    columns = _sort_key(order_col)
+    descending = order_dir == "desc"
+    stmt = stmt.order_by(*[desc(c) if descending else asc(c) for c in columns])
 
-    if order_dir == "desc":
-         query = query.order_by(desc(order_column))
-    else:
-        query = query.order_by(asc(order_column))
+    # Keyset: lanjut setelah baris terakhir halaman sebelumnya (tanpa OFFSET)
+    if after is not None:
+        return stmt.where(_seek_condition(columns, after, descending)).limit(length)
 
     # Pagination
-    items = query.offset(start).limit(length).all()
+    return stmt.offset(start).limit(length)
+
+
+def _count_stmt(stmt):
+    return select(func.count()).select_from(stmt.order_by(None).subquery())
+
+
+def _capped_count_stmt(stmt, cap: int):
+    # Berhenti memindai setelah cap + 1 baris; cukup untuk tahu "lebih dari cap"
+    limited = stmt.with_only_columns(literal(1)).order_by(None).limit(cap + 1)
+    return select(func.count()).select_from(limited.subquery())
+
+
+def _next_cursor(items, length: int, search: str, order_col: int, order_dir: str) -> Optional[str]:
+    if len(items) < length:
+        return None
+    return encode_operator_cursor(items[-1], search, order_col, order_dir)
+
+
+# -------------------- Operator Count Cache --------------------
+class OperatorCountCache:
+    """recordsTotal TM_Operator; di-invalidate oleh commit yang mengubah operator, plus TTL."""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self) -> Optional[int]:
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires_at:
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            return None
+
+    def generation(self) -> int:
+        return self._generation
+
+    def set(self, value: int, generation: int):
+        with self._lock:
+            # hasil count yang dimulai sebelum invalidate tidak boleh disimpan
+            if generation == self._generation:
+                self._value = value
+                self._expires_at = time.monotonic() + self.ttl
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._value = None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"value": self._value, "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+operator_count_cache = OperatorCountCache(settings.OPERATOR_COUNT_TTL)
+
+
+# -------------------- Operator Page Cache --------------------
+class OperatorPageCache:
+    """
+    Hasil get_operators per kombinasi parameter DataTables (TTL + LRU).
+    Di-invalidate oleh commit yang mengubah TM_Operator; TTL untuk perubahan dari luar aplikasi.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, result)
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() < entry[0]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def generation(self) -> int:
+        return self._generation
+
+    def set(self, key, result, generation: int):
+        with self._lock:
+            # halaman yang dibaca sebelum invalidate bisa sudah basi, jangan disimpan
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries), "max_entries": self.max_entries, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "invalidations": self.invalidations,
+            }
+
+
+operator_page_cache = OperatorPageCache(settings.OPERATOR_PAGE_CACHE_TTL, settings.OPERATOR_PAGE_CACHE_SIZE)
+
+
+def invalidate_operator_caches():
+    """Buang count, halaman list dan roster snapshot operator. Dipanggil hook ORM di
+    bawah, dan untuk perubahan TM_Operator di luar ORM (sinkronisasi HR, SQL langsung)."""
+    operator_count_cache.invalidate()
+    operator_page_cache.invalidate()
+    roster.invalidate()
+
+
+# -------------------- Invalidate dari ORM --------------------
+_OPERATORS_DIRTY = "operators_dirty"
+
+
+@event.listens_for(TMOperator, "after_update")
+def _mark_operators_dirty_on_update(mapper, connection, target):
+    # update foto/kontrak tidak mengubah count, list maupun roster
+    attrs = inspect(target).attrs
+    if any(getattr(attrs, f).history.has_changes() for f in roster.FIELDS):
+        _mark_operators_dirty(mapper, connection, target)
+
+
+@event.listens_for(TMOperator, "after_insert")
+@event.listens_for(TMOperator, "after_delete")
+def _mark_operators_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info[_OPERATORS_DIRTY] = True
+    else:
+        invalidate_operator_caches()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_operators_after_commit(session):
+    # Setelah commit supaya request lain tidak sempat meng-cache data lama
+    if session.info.pop(_OPERATORS_DIRTY, False):
+        invalidate_operator_caches()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_operators_flag(session):
+    session.info.pop(_OPERATORS_DIRTY, None)
+
+
+def _page_cache_key(search, start, length, order_col, order_dir, cursor, count_mode):
+    return (search, start, length, order_col, order_dir, cursor, count_mode)
+
+
+def _cacheable(result):
+    # simpan nik/name saja, bukan objek ORM yang terikat ke session request ini
+    total, filtered, capped, items, next_cursor = result
+    items = tuple(operator_index.OperatorRow(item.nik, item.name) for item in items)
+    return total, filtered, capped, items, next_cursor
+
+
+def _operators_total():
+    """Step: recordsTotal dari operator_count_cache, COUNT kalau belum ada."""
+    total = operator_count_cache.get()
+    if total is None:
+        generation = operator_count_cache.generation()
+        total = (yield _count_stmt(select(TMOperator.nik))).scalar_one()
+        operator_count_cache.set(total, generation)
+    return total
+
 
-    return total, filtered, items
+def _filtered_from_page(items, start: int, length: int) -> Optional[int]:
+    # Halaman tidak penuh = halaman terakhir, jadi jumlahnya sudah pasti tanpa COUNT
+    if len(items) < length and (items or start == 0):
+        return start + len(items)
+    return None
+
+
+def _filtered_count_stmt(stmt, count_mode: str):
+    if count_mode == "capped" and settings.OPERATOR_COUNT_CAP > 0:
+        return _capped_count_stmt(stmt, settings.OPERATOR_COUNT_CAP)
+    return _count_stmt(stmt)
+
+
+def _capped(filtered: int, count_mode: str):
+    """(recordsFiltered, filtered_capped): di mode capped, > cap dilaporkan sebagai cap."""
+    cap = settings.OPERATOR_COUNT_CAP
+    if count_mode == "capped" and cap > 0 and filtered > cap:
+        return cap, True
+    return filtered, False
+
+
+def get_operators(db: Session, search: str = "", start: int = 0, length: int = 10, order_col: int = 0, order_dir: str = "asc", cursor: Optional[str] = None, count_mode: str = "exact"):
+    """
+    Data untuk DataTables server-side. Return (total, filtered, filtered_capped, items, next_cursor).
+    Kalau `cursor` valid dipakai keyset pagination, kalau tidak pakai start/length biasa.
+    Catatan: `cursor` hanya dipakai di jalur SQL LIKE. Di index in-memory (start/length,
+    sudah cepat) dan full-text (urut relevansi) cursor diabaikan tanpa error; next_cursor
+    dari index tetap valid untuk jalur SQL.
+    `count_mode="capped"` menghitung recordsFiltered paling banyak sampai OPERATOR_COUNT_CAP.
+    Query multi-kata memakai full-text search (urut relevansi) kalau index full-text ada;
+    selain itu, selama index in-memory siap, semua dijawab dari index (count selalu exact).
+    Hasil disimpan di operator_page_cache (lihat OperatorPageCache).
+    """
+    return _run_steps(db, _operators_page(db, search, start, length, order_col, order_dir, cursor, count_mode))
+
+
+async def get_operators_async(db: AsyncSession, search: str = "", start: int = 0, length: int = 10, order_col: int = 0, order_dir: str = "asc", cursor: Optional[str] = None, count_mode: str = "exact"):
+    return await _run_steps_async(db, _operators_page(db, search, start, length, order_col, order_dir, cursor, count_mode))
+
+
+def _operators_page(db, search: str, start: int, length: int, order_col: int, order_dir: str, cursor: Optional[str], count_mode: str):
+    """Step: isi get_operators / get_operators_async, lewat operator_page_cache."""
+    yield from _check_operator_index()
+    if not operator_page_cache.enabled:
+        return (yield from _get_operators(db, search, start, length, order_col, order_dir, cursor, count_mode))
+    key = _page_cache_key(search, start, length, order_col, order_dir, cursor, count_mode)
+    result = operator_page_cache.get(key)
+    if result is None:
+        generation = operator_page_cache.generation()
+        result = _cacheable((yield from _get_operators(db, search, start, length, order_col, order_dir, cursor, count_mode)))
+        operator_page_cache.set(key, result, generation)
+    return result
+
+
+def _get_operators(db, search: str, start: int, length: int, order_col: int, order_dir: str, cursor: Optional[str], count_mode: str):
+    """Step: isi get_operators / get_operators_async di luar cache (lihat _run_steps)."""
+    provider, terms = _fulltext_search(db, search)
+    fulltext = provider is not None and (yield from _check_provider(provider))
+    if not fulltext:
+        # index in-memory: cursor diabaikan, halaman dari start/length
+        served = _search_operator_index(search, start, length, order_col, order_dir)
+        if served is not None:
+            total, filtered, items = served
+            return total, filtered, False, items, _next_cursor(items, length, search, order_col, order_dir)
+
+    # Total sebelum filter (dari cache)
+    total = yield from _operators_total()
+
+    if fulltext:
+        # urut relevansi: cursor diabaikan, halaman dari start/length
+        stmt, relevance = provider.search_stmt(terms)
+        page_stmt = _fulltext_page_stmt(stmt, relevance, start, length, order_col, order_dir)
+    else:
+        stmt = _operators_filter_stmt(search)
+        after = decode_operator_cursor(cursor, search, order_col, order_dir)
+        page_stmt = _operators_page_stmt(stmt, start, length, order_col, order_dir, after)
+    items = (yield page_stmt).scalars().all()
+
+    # Total setelah filter
+    filtered = total if not search else _filtered_from_page(items, start, length)
+    if filtered is None:
+        filtered = (yield _filtered_count_stmt(stmt, count_mode)).scalar_one()
+    filtered, capped = _capped(filtered, count_mode)
+    # urutan relevansi tidak bisa dilanjutkan dengan keyset cursor
+    next_cursor = None if fulltext else _next_cursor(items, length, search, order_col, order_dir)
+    return total, filtered, capped, items, next_cursor
 
 
 # -------------------- Operator --------------------
-def get_operator(db: Session, nik: str) -> Optional[TMOperator]:
-    nik = nik.strip()
-    return db.query(TMOperator).filter(TMOperator.nik == nik).first()
+def _operator_stmt(nik: str, with_photo: bool = False):
+    stmt = select(TMOperator).where(TMOperator.nik == nik.strip())
+    if with_photo:
+        stmt = stmt.options(undefer_group(PHOTO_GROUP))
+    return stmt
+
+
+def get_operator(db: Session, nik: str, with_photo: bool = False) -> Optional[TMOperator]:
+    return db.execute(_operator_stmt(nik, with_photo)).scalars().first()
+
+
+async def get_operator_async(db: AsyncSession, nik: str, with_photo: bool = False) -> Optional[TMOperator]:
+    return (await db.execute(_operator_stmt(nik, with_photo))).scalars().first()
 
 
 def get_certification_record(db: Session, nik: str) -> Optional[CertificationRecord]:
@@ -86,7 +612,12 @@ def get_certification_record(db: Session, nik: str) -> Optional[CertificationRec
 
 
 def create_certification_record(db: Session, record_data: dict) -> CertificationRecord:
+    record_data = dict(record_data)
+    files = {attr: record_data.pop(attr, None) for attr in ("file_soldering", "file_screwing", "file_msa")}
     record = CertificationRecord(**record_data)
+    # PDF masuk blob store, record hanya menyimpan hash
+    for attr, value in files.items():
+        documents.set_document(db, record, attr, value)
     db.add(record)
     db.commit()
     db.refresh(record)
@@ -106,17 +637,17 @@ def update_certification_file_base64(
         raise ValueError("Certification record not found")
 
     if certification_type == "Soldering":
-        record.file_soldering = base64_str
+        documents.set_document(db, record, "file_soldering", base64_str)
         record.soldering_docno = docno
         record.soldering_traindate = traindate
         record.soldering_expdate = expdate
     elif certification_type == "Screwing":
-        record.file_screwing = base64_str
+        documents.set_document(db, record, "file_screwing", base64_str)
         record.screwing_docno = docno
         record.screwing_traindate = traindate
         record.screwing_expdate = expdate
     elif certification_type == "MSA":
-        record.file_msa = base64_str
+        documents.set_document(db, record, "file_msa", base64_str)
         record.msa_docno = docno
         record.msa_traindate = traindate
         record.msa_expdate = expdate
@@ -129,17 +660,66 @@ def update_certification_file_base64(
 
 
 def has_certification_record(db: Session, nik: str) -> bool:
-    return db.query(CertificationRecord).filter(CertificationRecord.nik == nik).first() is not None
+    stmt = select(CertificationRecord.id).where(CertificationRecord.nik == nik).limit(1)
+    return db.execute(stmt).first() is not None
 
 # -------------------- Certification --------------------
-def get_latest_certification(db: Session, nik: str) -> Optional[CertificationRecord]:
-    """Ambil certification record terakhir berdasarkan created_at (descending)."""
-    return (
-        db.query(CertificationRecord)
-        .filter(CertificationRecord.nik == nik)
-        .order_by(CertificationRecord.created_at.desc())
-        .first()
+def _latest_certification_stmt(nik: str, with_files: bool = False):
+    stmt = (
+        select(CertificationRecord)
+        .where(CertificationRecord.nik == nik)
+        .order_by(CertificationRecord.created_at.desc(), CertificationRecord.id.desc())
+        .limit(1)
     )
+    if with_files:
+        stmt = stmt.options(undefer_group(FILES_GROUP))
+    return stmt
+
+
+def get_latest_certification(db: Session, nik: str, with_files: bool = False) -> Optional[CertificationRecord]:
+    """Ambil certification record terakhir berdasarkan created_at (descending).
+    File PDF hanya ikut di-load kalau with_files=True."""
+    return db.execute(_latest_certification_stmt(nik, with_files)).scalars().first()
+
+
+async def get_latest_certification_async(db: AsyncSession, nik: str, with_files: bool = False) -> Optional[CertificationRecord]:
+    return (await db.execute(_latest_certification_stmt(nik, with_files))).scalars().first()
+
+CERTIFICATION_FILE_ATTRS = tuple(f.legacy_attr for f in documents.CERTIFICATION_FILES.values())
+EVALUATION_FILE_ATTRS = tuple(f.legacy_attr for f in documents.EVALUATION_FILES.values())
+DOSSIER_INPUT_ATTRS = CERTIFICATION_FILE_ATTRS + EVALUATION_FILE_ATTRS  # urutan merge
+
+
+def _record_file_shas(db: Session, record, attrs) -> dict:
+    """attr -> SHA-256 file pada record; file lama yang masih base64 disimpan ke blob store dulu (tanpa commit)."""
+    shas = {}
+    for attr in attrs:
+        sha = documents.document_sha256(record, attr) if record else None
+        if not sha and record is not None:
+            data = documents.read_document(record, attr)  # kolom legacy di-load hanya kalau perlu
+            sha = documents.store_pdf(db, data).sha256 if data else None
+        if sha:
+            shas[attr] = sha
+    return shas
+
+
+def certification_file_shas(db: Session, nik: str) -> dict:
+    """
+    attr -> SHA-256 ketiga file sertifikat dari certification terbaru, untuk merge di server.
+    ValueError kalau certification belum ada atau filenya belum lengkap.
+    """
+    shas = _record_file_shas(db, get_latest_certification(db, nik), CERTIFICATION_FILE_ATTRS)
+    if len(shas) < len(CERTIFICATION_FILE_ATTRS):
+        raise ValueError("3 Certification files are still missing in the system!")
+    return shas
+
+
+def evaluation_file_shas(db: Session, nik: str) -> dict:
+    """Seperti certification_file_shas, untuk evaluation document terbaru."""
+    shas = _record_file_shas(db, get_latest_evaluation_document(db, nik), EVALUATION_FILE_ATTRS)
+    if len(shas) < len(EVALUATION_FILE_ATTRS):
+        raise ValueError("Evaluation documents are not complete yet")
+    return shas
 
 # -------------------- Utils --------------------
 def as_pdf_data_uri(base64_str: Optional[str]) -> Optional[str]:
@@ -151,91 +731,451 @@ def as_pdf_data_uri(base64_str: Optional[str]) -> Optional[str]:
 
 # -------------------- Evaluation Document --------------------
 def save_evaluation_document(db: Session, data: dict) -> EvaluationDocument:
-    mapped_data = {
-        "nik": data["nik"],
-        "op_train_eval": data["op_train_eval"],
-        "op_skills_eval": data["op_skills_eval"],
-        "train_eval": data["train_eval"],
-        "upload_date": data.get("upload_date"),
-    }
-
-    record = EvaluationDocument(**mapped_data)
+    record = EvaluationDocument(nik=data["nik"], upload_date=data.get("upload_date"))
+    for attr in ("op_train_eval", "op_skills_eval", "train_eval"):
+        documents.set_document(db, record, attr, data[attr])
     db.add(record)
     db.commit()
     db.refresh(record)
     print("Saved document ID:", record.id)
     return record
 
-# -------------------- Certification --------------------
-def get_latest_certification(db: Session, nik: str) -> Optional[CertificationRecord]:
-    return (
-        db.query(CertificationRecord)
-        .filter(CertificationRecord.nik == nik)
-        .order_by(CertificationRecord.created_at.desc())
-        .first()
+# -------------------- Evaluation Document --------------------
+def _latest_evaluation_stmt(nik: str, with_files: bool = False):
+    stmt = (
+        select(EvaluationDocument)
+        .where(EvaluationDocument.nik == nik)
+        .order_by(EvaluationDocument.upload_date.desc(), EvaluationDocument.id.desc())
+        .limit(1)
     )
+    if with_files:
+        stmt = stmt.options(undefer_group(FILES_GROUP))
+    return stmt
 
-# -------------------- Evaluation Document --------------------
-def get_latest_evaluation_document(db: Session, nik: str) -> Optional[EvaluationDocument]:
+
+def get_latest_evaluation_document(db: Session, nik: str, with_files: bool = False) -> Optional[EvaluationDocument]:
+    return db.execute(_latest_evaluation_stmt(nik, with_files)).scalars().first()
+
+
+async def get_latest_evaluation_document_async(db: AsyncSession, nik: str, with_files: bool = False) -> Optional[EvaluationDocument]:
+    return (await db.execute(_latest_evaluation_stmt(nik, with_files))).scalars().first()
+
+
+def _has_content(column):
+    # LIKE '_%' = tidak kosong, tanpa membaca seluruh isi kolom text/varchar(max)
+    return column.like("_%")
+
+
+def _evaluation_complete():
+    """1 kalau ketiga file evaluasi ada (blob store atau kolom legacy), tanpa membaca isinya."""
+    complete = and_(*[
+        or_(getattr(EvaluationDocument, f.sha_attr).isnot(None), _has_content(getattr(EvaluationDocument, f.legacy_attr)))
+        for f in documents.EVALUATION_FILES.values()
+    ])
+    return case((complete, 1), else_=0)
+
+
+def _latest_evaluation_summary_stmt(nik: str):
     return (
-        db.query(EvaluationDocument)
-        .filter(EvaluationDocument.nik == nik)
-        .order_by(EvaluationDocument.upload_date.desc())
-        .first()
+        select(
+            EvaluationDocument.id,
+            EvaluationDocument.nik,
+            EvaluationDocument.upload_date,
+            _evaluation_complete().label("complete"),
+        )
+        .where(EvaluationDocument.nik == nik)
+        .order_by(EvaluationDocument.upload_date.desc(), EvaluationDocument.id.desc())
+        .limit(1)
     )
 
+
+def get_latest_evaluation_summary(db: Session, nik: str):
+    """Evaluation terakhir tanpa file: (id, nik, upload_date, complete)."""
+    return db.execute(_latest_evaluation_summary_stmt(nik)).first()
+
+
+async def get_latest_evaluation_summary_async(db: AsyncSession, nik: str):
+    return (await db.execute(_latest_evaluation_summary_stmt(nik))).first()
+
+# -------------------- Operator Dossier (satu query) --------------------
+def _scalar_columns(model):
+    """Kolom tabel tanpa kolom blob yang di-defer."""
+    deferred_keys = {prop.key for prop in model.__mapper__.column_attrs if prop.deferred}
+    return [col for col in model.__table__.c if col.key not in deferred_keys]
+
+
+_dossier_stmts = {}
+
+
+def _dossier_stmt(with_photo: bool = True):
+    """
+    Operator + certification terbaru + evaluation terbaru dalam satu SELECT.
+    "Terbaru" dipilih dengan ROW_NUMBER() per NIK (jalan di SQL Server dan SQLite),
+    subquery sudah difilter NIK supaya memakai index (NIK, tanggal DESC).
+    Statement dibangun sekali dengan bindparam :nik karena membangun aliased()
+    jauh lebih mahal daripada eksekusinya.
+    """
+    if with_photo in _dossier_stmts:
+        return _dossier_stmts[with_photo]
+
+    nik = bindparam("nik")
+    cert_rn = func.row_number().over(
+        partition_by=CertificationRecord.nik,
+        order_by=(CertificationRecord.created_at.desc(), CertificationRecord.id.desc()),
+    ).label("rn")
+    cert_sq = select(*_scalar_columns(CertificationRecord), cert_rn).where(CertificationRecord.nik == nik).subquery("latest_cert")
+    LatestCert = aliased(CertificationRecord, cert_sq)
+
+    eval_rn = func.row_number().over(
+        partition_by=EvaluationDocument.nik,
+        order_by=(EvaluationDocument.upload_date.desc(), EvaluationDocument.id.desc()),
+    ).label("rn")
+    eval_sq = select(*_scalar_columns(EvaluationDocument), eval_rn).where(EvaluationDocument.nik == nik).subquery("latest_eval")
+    LatestEval = aliased(EvaluationDocument, eval_sq)
+
+    stmt = (
+        select(TMOperator, LatestCert, LatestEval)
+        .outerjoin(LatestCert, and_(LatestCert.nik == TMOperator.nik, cert_sq.c.rn == 1))
+        .outerjoin(LatestEval, and_(LatestEval.nik == TMOperator.nik, eval_sq.c.rn == 1))
+        .where(TMOperator.nik == nik)
+    )
+    if with_photo:
+        stmt = stmt.options(undefer(TMOperator.photo))
+    _dossier_stmts[with_photo] = stmt
+    return stmt
+
+
+def get_operator_dossier(db: Session, nik: str, with_photo: bool = True):
+    """Return (operator, certification|None, evaluation|None), atau None kalau operator tidak ada."""
+    row = db.execute(_dossier_stmt(with_photo), {"nik": nik.strip()}).first()
+    return tuple(row) if row else None
+
+
+async def get_operator_dossier_async(db: AsyncSession, nik: str, with_photo: bool = True):
+    row = (await db.execute(_dossier_stmt(with_photo), {"nik": nik.strip()})).first()
+    return tuple(row) if row else None
+
+
+# -------------------- Operator Batch --------------------
+_batch_stmts = {}
+
+
+def _operator_batch_stmt(with_photo: bool, with_certification: bool, with_evaluation: bool):
+    """
+    Operator untuk sekumpulan NIK (bindparam :niks expanding) + certification terbaru
+    + ringkasan evaluation terbaru (id, upload_date, complete), satu SELECT per chunk.
+    Join yang tidak diminta tidak ikut di statement.
+    """
+    key = (with_photo, with_certification, with_evaluation)
+    if key in _batch_stmts:
+        return _batch_stmts[key]
+
+    niks = bindparam("niks", expanding=True)
+    entities = [TMOperator]
+    stmt_joins = []
+    if with_certification:
+        cert_rn = func.row_number().over(
+            partition_by=CertificationRecord.nik,
+            order_by=(CertificationRecord.created_at.desc(), CertificationRecord.id.desc()),
+        ).label("rn")
+        cert_sq = select(*_scalar_columns(CertificationRecord), cert_rn).where(CertificationRecord.nik.in_(niks)).subquery("latest_cert")
+        LatestCert = aliased(CertificationRecord, cert_sq)
+        entities.append(LatestCert)
+        stmt_joins.append((LatestCert, and_(LatestCert.nik == TMOperator.nik, cert_sq.c.rn == 1)))
+    if with_evaluation:
+        eval_rn = func.row_number().over(
+            partition_by=EvaluationDocument.nik,
+            order_by=(EvaluationDocument.upload_date.desc(), EvaluationDocument.id.desc()),
+        ).label("rn")
+        eval_sq = select(
+            EvaluationDocument.id, EvaluationDocument.nik, EvaluationDocument.upload_date,
+            _evaluation_complete().label("complete"), eval_rn,
+        ).where(EvaluationDocument.nik.in_(niks)).subquery("latest_eval")
+        entities += [eval_sq.c.id.label("eval_id"), eval_sq.c.upload_date.label("eval_upload_date"), eval_sq.c.complete.label("eval_complete")]
+        stmt_joins.append((eval_sq, and_(eval_sq.c.nik == TMOperator.nik, eval_sq.c.rn == 1)))
+
+    stmt = select(*entities)
+    for target, onclause in stmt_joins:
+        stmt = stmt.outerjoin(target, onclause)
+    stmt = stmt.where(TMOperator.nik.in_(niks))
+    if with_photo:
+        stmt = stmt.options(undefer(TMOperator.photo))
+    _batch_stmts[key] = stmt
+    return stmt
+
+
+async def iter_operator_batch_async(
+    db: AsyncSession,
+    niks: list,
+    with_photo: bool = False,
+    with_certification: bool = True,
+    with_evaluation: bool = True,
+    chunk_size: int = None,
+):
+    """
+    Yield (nik, operator|None, certification|None, evaluation|None) sesuai urutan `niks`.
+    evaluation = (id, upload_date, complete). NIK dipecah per `chunk_size` untuk IN-list
+    (SQL Server maksimal 2100 parameter, dan :niks muncul sampai 3x di statement).
+    """
+    chunk_size = chunk_size or settings.OPERATOR_BATCH_CHUNK
+    stmt = _operator_batch_stmt(with_photo, with_certification, with_evaluation)
+    for i in range(0, len(niks), chunk_size):
+        chunk = niks[i:i + chunk_size]
+        rows = (await db.execute(stmt, {"niks": chunk})).all()
+        found = {row[0].nik.strip(): row for row in rows}
+        for nik in chunk:
+            row = found.get(nik)
+            if row is None:
+                yield nik, None, None, None
+                continue
+            cert = row[1] if with_certification else None
+            evaluation = None
+            if with_evaluation and row[-3] is not None:
+                evaluation = (row[-3], row[-2], row[-1])
+            yield nik, row[0], cert, evaluation
+
+
+# -------------------- PDFOPT (merged dossier) --------------------
+def _latest_pdfopt_stmt(nik: str, with_files: bool = False):
+    stmt = (
+        select(PDFOPT)
+        .where(PDFOPT.nik == nik)
+        .order_by(PDFOPT.created_at.desc(), PDFOPT.id.desc())
+        .limit(1)
+    )
+    if with_files:
+        stmt = stmt.options(undefer_group(FILES_GROUP))
+    return stmt
+
+
+def get_latest_pdfopt(db: Session, nik: str, with_files: bool = False) -> Optional[PDFOPT]:
+    return db.execute(_latest_pdfopt_stmt(nik, with_files)).scalars().first()
+
+
+def get_document_record(db: Session, nik: str, kind: str):
+    """Record terbaru yang memegang dokumen `kind` (lihat documents.DOCUMENT_KINDS)."""
+    model = documents.DOCUMENT_KINDS[kind].model
+    if model is CertificationRecord:
+        return get_latest_certification(db, nik)
+    if model is EvaluationDocument:
+        return get_latest_evaluation_document(db, nik)
+    return get_latest_pdfopt(db, nik)
+
+
+# -------------------- Document metadata (T_Blob) --------------------
+def blob_metadata(blob: Optional[Blob]) -> Optional[dict]:
+    if blob is None:
+        return None
+    return {
+        "sha256": blob.sha256,
+        "size": blob.size,
+        "page_count": blob.page_count,
+        "pdf_version": blob.pdf_version,
+        "producer": blob.producer,
+        "uploaded_at": blob.created_at.isoformat() if blob.created_at else None,
+    }
+
+
+def get_blob(db: Session, sha256: str) -> Optional[Blob]:
+    """Cek dedup: metadata file dengan hash ini kalau sudah pernah di-upload."""
+    return db.get(Blob, (sha256 or "").lower())
+
+
+def list_operator_documents(db: Session, nik: str) -> dict:
+    """
+    kind -> metadata dokumen terbaru operator, hanya dari kolom hash + T_Blob
+    (tidak ada file yang dibaca). Record lama yang belum di-backfill tidak punya
+    hash: muncul dengan "sha256": None dan tanpa ukuran.
+    """
+    records = {
+        CertificationRecord: get_latest_certification(db, nik),
+        EvaluationDocument: get_latest_evaluation_document(db, nik),
+    }
+    if settings.DOSSIER_MODE != "lazy":
+        records[PDFOPT] = get_latest_pdfopt(db, nik)
+
+    shas = {}
+    for kind, field in documents.DOCUMENT_KINDS.items():
+        record = records.get(field.model)
+        if record is not None and documents.has_document(record, field.legacy_attr):
+            shas[kind] = documents.document_sha256(record, field.legacy_attr)
+
+    if settings.DOSSIER_MODE == "lazy" and len(shas) == len(DOSSIER_INPUT_ATTRS) and all(shas.values()):
+        # dossier on demand: ada kalau kombinasi input ini sudah pernah di-merge
+        key = dossier.input_key([shas[documents.KIND_BY_ATTR[attr]] for attr in DOSSIER_INPUT_ATTRS])
+        entry = db.get(DossierCache, key)
+        if entry is not None:
+            shas["dossier"] = entry.merged_sha256
+
+    wanted = [sha for sha in shas.values() if sha]
+    blobs = {b.sha256: b for b in db.execute(select(Blob).where(Blob.sha256.in_(wanted))).scalars()} if wanted else {}
+    return {kind: blob_metadata(blobs.get(sha)) or {"sha256": None} for kind, sha in shas.items()}
+
+
 # -------------------- Save and Merge PDFOPT --------------------
-def save_evaluation_and_merge(db: Session, data: dict):
-    
+def save_evaluation_and_merge(db: Session, data: dict, progress=None, merge_wait: float = 0):
+    """
+    Simpan evaluation + merge 6 PDF ke T_PDFOPT dalam satu transaksi.
+    File boleh string base64, bytes (dari blob store, lihat app/jobs.py) atau
+    file-like (upload multipart, lihat app/uploads.py).
+    `progress(percent, message)` dipanggil di setiap tahap kalau diisi. Merge
+    dikerjakan sebelum transaksi dibuka supaya progress (ditulis lewat koneksi
+    lain) tidak menunggu lock transaksi ini.
+    Merge jalan di app/merge_engine.py; `merge_wait` = detik menunggu slot
+    sebelum MergeBusy. File sertifikat boleh tidak dikirim: server memakai
+    file certification terbaru yang sudah tersimpan.
+    Kalau input yang sama sudah pernah di-merge (app/dossier.py), hasilnya dipakai
+    ulang. Dengan DOSSIER_MODE=lazy tidak ada merge dan tidak ada baris T_PDFOPT;
+    dossier dibuat saat pertama diunduh (get_or_build_dossier).
+    """
+    report = progress or (lambda percent, message: None)
+    lazy = settings.DOSSIER_MODE == "lazy"
     try:
-        # 1. Simpan Evaluation Document
+        # File sertifikat yang tidak dikirim client diambil dari certification terbaru
+        missing = [attr for attr in CERTIFICATION_FILE_ATTRS if not data.get(attr)]
+        if missing:
+            report(5, "Loading certification files")
+            store = documents.get_blob_store()
+            shas = certification_file_shas(db, data["nik"])
+            data = {**data, **{attr: store.get(shas[attr]) for attr in missing}}
+
+        # 1. Merge semua PDF di process pool (belum menyentuh database)
+        report(10, "Decoding files")
+        files = [documents.pdf_bytes(data[attr]) for attr in DOSSIER_INPUT_ATTRS if data.get(attr)]  # ✅ skip kalau kosong
+        key = dossier.input_key([sha256_hex(f) for f in files])
+        cached = None if lazy else dossier.lookup(db, key)
+        merged = None
+        if not lazy and cached is None:
+            report(20, "Merging PDFs")
+            merged = merge_engine.merge(files, wait=merge_wait)
+            log_merge_size(data["nik"], merged)
+
+        # 2. Simpan Evaluation Document
+        report(85, "Saving documents")
         eval_doc = EvaluationDocument(
             nik=data["nik"],
-            op_train_eval=data["op_train_eval"],
-            op_skills_eval=data["op_skills_eval"],
-            train_eval=data["train_eval"],
             upload_date=data.get("upload_date") or datetime.utcnow().date()
         )
+        for attr in EVALUATION_FILE_ATTRS:
+            documents.set_document(db, eval_doc, attr, data[attr])
         db.add(eval_doc)
         db.flush()
 
-        merger = PdfMerger()
-        files = [
-            data["file_soldering"],
-            data["file_screwing"],
-            data["file_msa"],
-            data["op_train_eval"],
-            data["op_skills_eval"],
-            data["train_eval"],
-        ]
-        for f in files:
-            if not f:
-                continue  # ✅ skip kalau kosong
-            base64_str = f.split(",")[-1] if "," in f else f
-            pdf_bytes = base64.b64decode(base64_str)
-            merger.append(BytesIO(pdf_bytes))
-
-        output = BytesIO()
-        merger.write(output)
-        merger.close()
-
-        merged_bytes = output.getvalue()
-        merged_b64 = base64.b64encode(merged_bytes).decode("utf-8")
-
-        # 3. Simpan ke T_PDFOPT
-        pdfopt = PDFOPT(
-            nik=data["nik"],
-            merged_pdf=merged_b64
-        )
-        db.add(pdfopt)
+        # 3. Simpan ke T_PDFOPT (isi PDF di blob store)
+        pdfopt = None
+        if not lazy:
+            pdfopt = PDFOPT(nik=data["nik"])
+            if cached is not None:
+                pdfopt.merged_pdf_sha256, pdfopt.merged_pdf = cached.merged_sha256, ""
+            else:
+                blob = documents.set_document(db, pdfopt, "merged_pdf", merged.data)
+                dossier.remember(db, key, data["nik"], blob)
+            db.add(pdfopt)
 
         # 4. Commit transaksi
         db.commit()
         db.refresh(eval_doc)
-        db.refresh(pdfopt)
-
-        return {"eval_id": eval_doc.id, "pdf_id": pdfopt.id}
+        result = {
+            "eval_id": eval_doc.id,
+            "pdf_id": pdfopt.id if pdfopt is not None else None,
+            "dossier": "deferred" if lazy else ("cached" if cached is not None else "merged"),
+        }
+        if merged is not None:
+            result.update(size_before=merged.size_before, size=len(merged.data))
+            dossier.evict(db, keep=key)
+        return result
 
     except Exception as e:
         db.rollback()
-        raise e
\ No newline at end of file
+        raise e
+
+
+# -------------------- Merged dossier (on demand) --------------------
+def log_merge_size(nik: str, merged: merge_engine.MergeResult):
+    before, after = merged.size_before, len(merged.data)
+    saved = (before - after) * 100 / before if before else 0
+    print(f"🗜️ Dossier {nik.strip()}: {before} -> {after} bytes ({saved:.0f}% smaller)")
+
+
+def dossier_input_shas(db: Session, nik: str) -> list:
+    """SHA-256 keenam file input dossier (certification + evaluation terbaru) sesuai urutan merge."""
+    shas = {**certification_file_shas(db, nik), **evaluation_file_shas(db, nik)}
+    return [shas[attr] for attr in DOSSIER_INPUT_ATTRS]
+
+
+def get_or_build_dossier(db: Session, nik: str, merge_wait: float = 0) -> DossierCache:
+    """
+    Merged dossier dari file certification + evaluation terbaru. Kalau kombinasi
+    input ini sudah pernah di-merge, hasil dari cache; kalau belum, merge sekarang
+    dan simpan di cache (commit). ValueError kalau file input belum lengkap.
+    """
+    shas = dossier_input_shas(db, nik)
+    key = dossier.input_key(shas)
+    entry = dossier.lookup(db, key)
+    if entry is not None:
+        db.commit()  # LastAccessAt
+        return entry
+    started = time.perf_counter()
+    store = documents.get_blob_store()
+    merged = merge_engine.merge([store.get(sha) for sha in shas], wait=merge_wait)
+    log_merge_size(nik, merged)
+    try:
+        entry = dossier.remember(db, key, nik, documents.store_pdf(db, merged.data))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    print(f"📎 Dossier {nik.strip()} merged on demand in {(time.perf_counter() - started) * 1000:.0f} ms ({entry.size} bytes)")
+    dossier.evict(db, keep=key)
+    return entry
+
+
+# -------------------- Bulk re-merge (app/remerge.py) --------------------
+def list_dossier_niks(db: Session) -> list:
+    """NIK yang punya certification dan evaluation document, urut."""
+    return db.execute(
+        select(CertificationRecord.nik)
+        .where(CertificationRecord.nik.in_(select(EvaluationDocument.nik)))
+        .distinct()
+        .order_by(CertificationRecord.nik)
+    ).scalars().all()
+
+
+def remerge_dossier(db: Session, nik: str, force: bool = False, merge_wait: float = 0) -> dict:
+    """
+    Buat ulang merged dossier dari certification + evaluation terbaru yang sudah
+    tersimpan. Beda dengan save_evaluation_and_merge: tidak ada evaluation baru,
+    hanya baris T_PDFOPT baru (atau entry cache saja kalau DOSSIER_MODE=lazy).
+    Kalau input sama dengan dossier terakhir, tidak ada yang ditulis ("unchanged");
+    `force` = merge ulang walaupun ada di cache. ValueError kalau input belum lengkap.
+    """
+    lazy = settings.DOSSIER_MODE == "lazy"
+    try:
+        shas = dossier_input_shas(db, nik)
+        key = dossier.input_key(shas)
+        cached = None if force else dossier.lookup(db, key)
+        if cached is not None and (lazy or getattr(get_latest_pdfopt(db, nik), "merged_pdf_sha256", None) == cached.merged_sha256):
+            db.commit()  # LastAccessAt / file lama yang baru dipindah ke blob store
+            return {"pdf_id": None, "dossier": "unchanged"}
+
+        merged = None
+        if cached is None:
+            store = documents.get_blob_store()
+            merged = merge_engine.merge([store.get(sha) for sha in shas], wait=merge_wait)
+            log_merge_size(nik, merged)
+            cached = dossier.remember(db, key, nik, documents.store_pdf(db, merged.data))
+
+        pdfopt = None
+        if not lazy:
+            pdfopt = PDFOPT(nik=nik, merged_pdf="", merged_pdf_sha256=cached.merged_sha256)
+            db.add(pdfopt)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    result = {"pdf_id": pdfopt.id if pdfopt is not None else None, "dossier": "cached" if merged is None else "merged"}
+    if merged is not None:
+        result.update(size_before=merged.size_before, size=len(merged.data))
+        dossier.evict(db, keep=key)
+    return result
@@ -1,13 +1,222 @@
-from dotenv import load_dotenv
+from bisect import bisect_left
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+import threading
+import time
 
-load_dotenv()
+from . import settings
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL)
+# -------------------- Pool Statistics --------------------
+# Batas atas bucket histogram waktu tunggu checkout (milidetik)
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolStats:
+    """Counter sederhana untuk checkout koneksi dari pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.peak_checked_out = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+            # satu slot ekstra untuk "> bucket terakhir"
+            self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            # koneksi baru yang dibuka saat checkout, terpisah dari waktu tunggu
+            self.connects = 0
+            self.connect_total_ms = 0.0
+            self.connect_max_ms = 0.0
+
+    def record_wait(self, wait_ms: float, checked_out: int):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            self.wait_histogram[bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def record_connect(self, connect_ms: float):
+        with self._lock:
+            self.connects += 1
+            self.connect_total_ms += connect_ms
+            self.connect_max_ms = max(self.connect_max_ms, connect_ms)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            labels = [f"<={b}ms" for b in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "peak_checked_out": self.peak_checked_out,
+                "wait_avg_ms": round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+                "wait_histogram": dict(zip(labels, self.wait_histogram)),
+                "connects": self.connects,
+                "connect_avg_ms": round(self.connect_total_ms / self.connects, 3) if self.connects else 0.0,
+                "connect_max_ms": round(self.connect_max_ms, 3),
+            }
+
+
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+class _InstrumentedPoolMixin:
+    """
+    Mencatat lama menunggu setiap checkout koneksi ke PoolStats milik kelas. Kalau
+    checkout membuka koneksi baru (pool belum penuh / overflow), lama connect dicatat
+    terpisah (record_connect) dan tidak dihitung sebagai waktu tunggu pool.
+    """
+
+    stats = pool_stats
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        record = super()._create_connection()
+        record._connect_ms = (time.perf_counter() - started) * 1000
+        return record
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_timeout()
+            raise
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        connect_ms = conn.__dict__.pop("_connect_ms", None)
+        if connect_ms is not None:
+            self.stats.record_connect(connect_ms)
+            elapsed_ms = max(elapsed_ms - connect_ms, 0.0)
+        self.stats.record_wait(elapsed_ms, self.checkedout())
+        return conn
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    stats = async_pool_stats
+
+
+def _engine_kwargs(url: str, poolclass=InstrumentedQueuePool) -> dict:
+    # SQLite in-memory butuh SingletonThreadPool, jadi biarkan default SQLAlchemy
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
+# -------------------- Async Engine --------------------
+# Driver async yang dipakai untuk setiap driver sync
+ASYNC_DRIVERS = {
+    "mssql": "aioodbc",
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Tidak ada driver async untuk database '{backend}'")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or (to_async_url(DATABASE_URL) if DATABASE_URL else None)
+
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    # Dibuat saat pertama dipakai supaya app tetap bisa start walau driver async belum terpasang
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL, **_engine_kwargs(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool)
+        )
+        _async_session_factory = async_sessionmaker(
+            _async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _async_session_factory()
+
+
+def get_pool_status() -> dict:
+    pool = engine.pool
+    status = {
+        "pool_class": type(pool).__name__,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    if _async_engine is not None:
+        async_pool = _async_engine.pool
+        status["async_pool"] = {"pool_class": type(async_pool).__name__}
+        if isinstance(async_pool, QueuePool):
+            status["async_pool"].update({
+                "checked_out": async_pool.checkedout(),
+                "overflow": max(async_pool.overflow(), 0),
+            })
+        status["async_pool"].update(async_pool_stats.snapshot())
+    status.update(pool_stats.snapshot())
+    return status
+
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+
+# Dependency untuk ambil session DB
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Dependency untuk endpoint async (AsyncSession)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
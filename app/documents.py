@@ -0,0 +1,271 @@
+"""
+Akses file PDF operator (sertifikat, evaluasi, dossier gabungan).
+
+Isi file disimpan di blob store (app/blobstore.py) dan record hanya memegang
+SHA-256-nya. Record lama yang belum di-backfill masih menyimpan base64 di
+kolom Text, jadi semua pembacaan lewat helper di sini supaya dua bentuk itu
+tetap terbaca.
+"""
+import base64
+import io
+from io import BytesIO
+from typing import BinaryIO, Callable, NamedTuple, Optional, Tuple
+
+from PyPDF2 import PdfReader
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .blobstore import get_blob_store
+from .uploads import decode_pdf_base64
+from .models import Blob, CertificationRecord, EvaluationDocument, PDFOPT
+
+
+class DocumentField(NamedTuple):
+    model: type
+    legacy_attr: str   # kolom base64 lama
+    sha_attr: str      # kolom SHA-256 baru
+
+    @property
+    def length_attr(self) -> str:
+        # column_property LEN(kolom legacy), lihat models.file_length
+        return f"{self.legacy_attr}_length"
+
+
+CERTIFICATION_FILES = {
+    "soldering": DocumentField(CertificationRecord, "file_soldering", "file_soldering_sha256"),
+    "screwing": DocumentField(CertificationRecord, "file_screwing", "file_screwing_sha256"),
+    "msa": DocumentField(CertificationRecord, "file_msa", "file_msa_sha256"),
+}
+
+EVALUATION_FILES = {
+    "op_train_eval": DocumentField(EvaluationDocument, "op_train_eval", "op_train_eval_sha256"),
+    "op_skills_eval": DocumentField(EvaluationDocument, "op_skills_eval", "op_skills_eval_sha256"),
+    "train_eval": DocumentField(EvaluationDocument, "train_eval", "train_eval_sha256"),
+}
+
+DOSSIER_FILE = DocumentField(PDFOPT, "merged_pdf", "merged_pdf_sha256")
+
+DOCUMENT_KINDS = {**CERTIFICATION_FILES, **EVALUATION_FILES, "dossier": DOSSIER_FILE}
+
+# nama atribut legacy -> DocumentField / kind
+FIELDS_BY_ATTR = {f.legacy_attr: f for f in DOCUMENT_KINDS.values()}
+KIND_BY_ATTR = {f.legacy_attr: kind for kind, f in DOCUMENT_KINDS.items()}
+
+
+def count_pages(data: bytes) -> Optional[int]:
+    try:
+        return len(PdfReader(BytesIO(data)).pages)
+    except Exception:
+        return None
+
+
+def pdf_metadata(f: BinaryIO) -> dict:
+    """Jumlah halaman, versi PDF dan producer dari file-like; field yang tidak terbaca = None."""
+    meta = {"page_count": None, "pdf_version": None, "producer": None}
+    try:
+        f.seek(0)
+        reader = PdfReader(f)
+        meta["page_count"] = len(reader.pages)
+    except Exception:
+        return meta
+    try:
+        version = reader.pdf_header[len("%PDF-"):].strip()
+        # /Version di catalog (PDF 1.4+) mengalahkan header kalau lebih baru
+        catalog_version = str(reader.trailer["/Root"].get("/Version", "")).lstrip("/")
+        meta["pdf_version"] = max(version, catalog_version)[:10] or None
+    except Exception:
+        pass
+    try:
+        producer = reader.metadata.producer if reader.metadata else None
+        meta["producer"] = str(producer)[:200] if producer else None
+    except Exception:
+        pass
+    return meta
+
+
+def _add_blob(db: Session, sha: str, size: int, f: BinaryIO) -> Blob:
+    """Baris T_Blob baru + metadata PDF (tanpa commit)."""
+    blob = db.get(Blob, sha)
+    if blob is None:
+        blob = Blob(sha256=sha, size=size, **pdf_metadata(f))
+        try:
+            # savepoint: request lain bisa saja menyimpan file yang sama bersamaan
+            with db.begin_nested():
+                db.add(blob)
+        except IntegrityError:
+            blob = db.get(Blob, sha)
+    return blob
+
+
+def store_pdf(db: Session, data: bytes) -> Blob:
+    """Simpan bytes PDF ke blob store dan pastikan ada baris T_Blob (tanpa commit)."""
+    sha = get_blob_store().put(data)
+    return _add_blob(db, sha, len(data), BytesIO(data))
+
+
+def store_pdf_file(db: Session, f: BinaryIO) -> Blob:
+    """Seperti store_pdf, tapi dari file-like (upload multipart) tanpa membaca semuanya ke memori."""
+    f.seek(0)
+    sha, size = get_blob_store().put_stream(f)
+    return _add_blob(db, sha, size, f)
+
+
+def store_upload(db: Session, value) -> Blob:
+    """Simpan file dari bytes, string base64 atau file-like ke blob store."""
+    if hasattr(value, "read"):
+        return store_pdf_file(db, value)
+    data = value if isinstance(value, (bytes, bytearray)) else decode_pdf_base64(value)
+    return store_pdf(db, bytes(data))
+
+
+def pdf_bytes(value) -> bytes:
+    """Bytes PDF dari bytes, string base64 atau file-like."""
+    if hasattr(value, "read"):
+        value.seek(0)
+        return value.read()
+    return bytes(value) if isinstance(value, (bytes, bytearray)) else decode_pdf_base64(value)
+
+
+def set_document(db: Session, record, attr: str, value) -> Optional[Blob]:
+    """Isi file pada record dari bytes, string base64 atau file-like; kolom legacy dikosongkan."""
+    field = FIELDS_BY_ATTR[attr]
+    if value is None or value == "" or value == b"":
+        setattr(record, field.sha_attr, None)
+        setattr(record, field.legacy_attr, "")
+        return None
+    blob = store_upload(db, value)
+    setattr(record, field.sha_attr, blob.sha256)
+    setattr(record, field.legacy_attr, "")
+    return blob
+
+
+def document_sha256(record, attr: str) -> Optional[str]:
+    return getattr(record, FIELDS_BY_ATTR[attr].sha_attr)
+
+
+def read_document(record, attr: str) -> Optional[bytes]:
+    """Bytes PDF dari blob store, atau decode kolom base64 lama.
+    Untuk record lama, kolom legacy harus sudah di-load (with_files=True)."""
+    field = FIELDS_BY_ATTR[attr]
+    sha = getattr(record, field.sha_attr)
+    if sha:
+        return get_blob_store().get(sha)
+    legacy = getattr(record, field.legacy_attr)
+    if not legacy:
+        return None
+    return decode_pdf_base64(legacy, max_bytes=0)  # data lama: tanpa batas ukuran upload
+
+
+def document_base64(record, attr: str) -> Optional[str]:
+    field = FIELDS_BY_ATTR[attr]
+    sha = getattr(record, field.sha_attr)
+    if sha:
+        return base64.b64encode(get_blob_store().get(sha)).decode("utf-8")
+    return getattr(record, field.legacy_attr) or None
+
+
+def has_document(record, attr: str) -> bool:
+    """True kalau record punya file ini. Untuk record lama dipakai panjang kolom
+    legacy yang ikut di-query (models.file_length), bukan isi base64-nya."""
+    field = FIELDS_BY_ATTR[attr]
+    if getattr(record, field.sha_attr):
+        return True
+    if field.legacy_attr in record.__dict__:
+        return bool(record.__dict__[field.legacy_attr])
+    return bool(getattr(record, field.length_attr))
+
+
+def open_document(session_factory, record, attr: str) -> Optional[Tuple[str, int, Callable[[], BinaryIO]]]:
+    """(key ETag, size, open_file) untuk streaming; None kalau file tidak ada.
+    Record lama dibaca per potongan lewat open_legacy_document."""
+    field = FIELDS_BY_ATTR[attr]
+    sha = getattr(record, field.sha_attr)
+    if sha:
+        store = get_blob_store()
+        return sha, store.size(sha), lambda: store.open(sha)
+    if not has_document(record, attr):
+        return None
+    return open_legacy_document(session_factory, record, attr)
+
+
+# -------------------- Kolom base64 lama, dibaca per potongan --------------------
+class LegacyBase64Reader(io.RawIOBase):
+    """
+    File-like read-only di atas kolom base64 lama. Setiap read() hanya mengambil
+    SUBSTRING yang dibutuhkan dari database lalu men-decode-nya, jadi file besar
+    tidak pernah dimuat utuh. Punya session sendiri (dipakai setelah request
+    selesai oleh StreamingResponse); ditutup lewat close().
+    """
+
+    def __init__(self, session_factory, column, where, offset: int, size: int):
+        self._db = session_factory()
+        self._column = column
+        self._where = where
+        self._offset = offset   # panjang prefix data URI (karakter)
+        self._size = size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = max(base + pos, 0)
+        return self._pos
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self._size - self._pos
+        n = min(n, self._size - self._pos)
+        if n <= 0:
+            return b""
+        # 3 byte = 4 karakter base64; ambil blok yang menutupi [pos, pos + n)
+        first, last = self._pos // 3, (self._pos + n + 2) // 3
+        chars = self._db.execute(
+            select(func.substring(self._column, self._offset + first * 4 + 1, (last - first) * 4)).where(self._where)
+        ).scalar()
+        data = base64.b64decode(chars or "")
+        skip = self._pos - first * 3
+        chunk = data[skip:skip + n]
+        self._pos += len(chunk)
+        return chunk
+
+    def close(self):
+        if not self.closed:
+            self._db.close()
+        super().close()
+
+
+def open_legacy_document(session_factory, record, attr: str) -> Optional[Tuple[str, int, Callable[[], BinaryIO]]]:
+    """
+    Seperti open_document untuk record yang belum di-backfill, tapi tanpa memuat
+    kolom base64: panjang, prefix dan padding diambil dengan satu query, isinya
+    dibaca per potongan oleh LegacyBase64Reader. Key ETag dari tabel + id record
+    (baris lama tidak pernah diubah isinya).
+    """
+    field = FIELDS_BY_ATTR[attr]
+    column = getattr(field.model, field.legacy_attr)
+    pk = field.model.__mapper__.primary_key[0]
+    record_id = getattr(record, field.model.__mapper__.get_property_by_column(pk).key)
+    where = pk == record_id
+    db = session_factory()
+    try:
+        row = db.execute(
+            select(func.length(column), func.substring(column, 1, 100), func.substring(column, func.length(column) - 1, 2)).where(where)
+        ).first()
+    finally:
+        db.close()
+    if row is None or not row[0]:
+        return None
+    length, head, tail = row
+    offset = head.index(",") + 1 if head.startswith("data:") and "," in head else 0
+    size = (length - offset) // 4 * 3 - tail.count("=")
+    key = f"{field.model.__tablename__}-{record_id}-{field.legacy_attr}"
+    return key, size, lambda: LegacyBase64Reader(session_factory, column, where, offset, size)
@@ -0,0 +1,156 @@
+"""
+Cache merged dossier (6 PDF operator digabung jadi satu).
+
+Merged PDF sepenuhnya ditentukan oleh keenam file input, jadi key cache adalah
+hash dari SHA-256 input (urutan merge ikut menentukan). Save dengan input yang
+sama tidak perlu merge lagi, dan dengan DOSSIER_MODE=lazy merge baru dikerjakan
+saat dossier pertama kali diunduh (lihat crud.get_or_build_dossier).
+
+Hasil merge disimpan di blob store; T_DossierCache mencatat key -> SHA-256
+hasil + ukuran + waktu akses terakhir. Kalau total ukuran melewati
+DOSSIER_CACHE_MAX_BYTES, entry yang paling lama tidak diakses dibuang. Blob yang
+tidak dipakai dokumen/entry lain hanya ditandai (T_Blob.OrphanedAt); filenya
+dihapus sweep_orphans setelah DOSSIER_BLOB_GRACE detik, jadi download yang sedang
+mengirim file itu tidak terputus.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+import hashlib
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import documents, settings
+from .blobstore import get_blob_store
+from .models import Blob, DossierCache
+
+# naikkan kalau cara merge berubah supaya hasil lama tidak dipakai lagi
+MERGE_VERSION = 1
+# LastAccessAt cukup diperbarui sekali per menit, bukan di setiap download
+TOUCH_INTERVAL = timedelta(seconds=60)
+
+
+def input_key(shas: List[str]) -> str:
+    """Key cache dari SHA-256 file input sesuai urutan merge."""
+    raw = f"v{MERGE_VERSION}:" + ",".join(shas)
+    return hashlib.sha256(raw.encode("ascii")).hexdigest()
+
+
+def lookup(db: Session, key: str) -> Optional[DossierCache]:
+    """Entry cache untuk key ini, atau None (juga kalau file blob-nya hilang). Tidak menulis
+    ke database sampai flush berikutnya, jadi aman dipanggil sebelum merge."""
+    entry = db.get(DossierCache, key)
+    if entry is None or not get_blob_store().exists(entry.merged_sha256):
+        return None
+    now = datetime.utcnow()
+    if entry.last_access_at is None or now - entry.last_access_at > TOUCH_INTERVAL:
+        entry.last_access_at = now
+    return entry
+
+
+def remember(db: Session, key: str, nik: str, blob: Blob) -> DossierCache:
+    """Catat hasil merge untuk key ini (tanpa commit)."""
+    blob.orphaned_at = None  # blob yang sudah ditandai untuk dihapus bisa dipakai lagi
+    entry = db.get(DossierCache, key)
+    if entry is not None:
+        # entry lama yang file blob-nya hilang
+        entry.merged_sha256, entry.size, entry.last_access_at = blob.sha256, blob.size, datetime.utcnow()
+        return entry
+    entry = DossierCache(input_key=key, nik=nik, merged_sha256=blob.sha256, size=blob.size)
+    try:
+        # savepoint: request lain bisa membuat dossier yang sama bersamaan
+        with db.begin_nested():
+            db.add(entry)
+    except IntegrityError:
+        entry = db.get(DossierCache, key)
+    return entry
+
+
+def _reference_columns() -> list:
+    """Semua kolom yang menyimpan SHA-256 blob: dokumen (documents.DOCUMENT_KINDS) + cache."""
+    seen = {}
+    for field in documents.DOCUMENT_KINDS.values():
+        seen[(field.model, field.sha_attr)] = getattr(field.model, field.sha_attr)
+    return list(seen.values()) + [DossierCache.merged_sha256]
+
+
+def _is_referenced(db: Session, sha: str) -> bool:
+    return any(
+        db.execute(select(column).where(column == sha).limit(1)).first() is not None
+        for column in _reference_columns()
+    )
+
+
+def evict(db: Session, max_bytes: int = None, keep: str = None) -> int:
+    """
+    Buang entry paling lama tidak diakses sampai total <= max_bytes (commit).
+    Entry `keep` (yang baru saja dibuat / akan dikirim) tidak ikut dibuang. Blob
+    yang tidak dipakai lagi hanya ditandai, lihat sweep_orphans. Return bytes dibuang.
+    """
+    max_bytes = settings.DOSSIER_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    total = db.execute(select(func.coalesce(func.sum(DossierCache.size), 0))).scalar()
+    if total <= max_bytes:
+        return 0
+    freed = 0
+    orphans = []
+    rows = db.execute(
+        select(DossierCache)
+        .where(DossierCache.input_key != keep)
+        .order_by(DossierCache.last_access_at, DossierCache.created_at)
+    ).scalars().all()
+    for entry in rows:
+        if total - freed <= max_bytes:
+            break
+        freed += entry.size
+        orphans.append(entry.merged_sha256)
+        db.delete(entry)
+    db.flush()
+    orphans = [sha for sha in set(orphans) if not _is_referenced(db, sha)]
+    now = datetime.utcnow()
+    for sha in orphans:
+        blob = db.get(Blob, sha)
+        if blob is not None and blob.orphaned_at is None:
+            blob.orphaned_at = now
+    db.commit()
+    print(f"🧹 Dossier cache: evicted {freed} bytes ({len(orphans)} blob(s) marked for deletion)")
+    sweep_orphans(db)
+    return freed
+
+
+def sweep_orphans(db: Session, grace: int = None) -> int:
+    """
+    Hapus blob yang ditandai lebih dari `grace` detik lalu (default DOSSIER_BLOB_GRACE)
+    dan masih tidak dipakai (commit). Blob yang ternyata dipakai lagi dilepas tandanya.
+    Return jumlah blob dihapus.
+    """
+    grace = settings.DOSSIER_BLOB_GRACE if grace is None else grace
+    limit = datetime.utcnow() - timedelta(seconds=grace)
+    blobs = db.execute(select(Blob).where(Blob.orphaned_at <= limit)).scalars().all()
+    removed = []
+    for blob in blobs:
+        if _is_referenced(db, blob.sha256):
+            blob.orphaned_at = None
+        else:
+            removed.append(blob.sha256)
+            db.delete(blob)
+    db.commit()
+    # file dihapus setelah commit; kalau commit gagal file masih utuh
+    store = get_blob_store()
+    for sha in removed:
+        store.delete(sha)
+    if removed:
+        print(f"🧹 Blob store: {len(removed)} orphaned blob(s) removed")
+    return len(removed)
+
+
+def stats(db: Session) -> dict:
+    count, total = db.execute(
+        select(func.count(), func.coalesce(func.sum(DossierCache.size), 0)).select_from(DossierCache)
+    ).one()
+    return {
+        "mode": settings.DOSSIER_MODE,
+        "entries": count,
+        "bytes": total,
+        "max_bytes": settings.DOSSIER_CACHE_MAX_BYTES,
+    }
@@ -0,0 +1,124 @@
+"""
+Response untuk mengirim file PDF: streaming per chunk dengan dukungan
+Range (206), ETag kuat + conditional GET (304) dan Cache-Control.
+Kalau file ada di disk (blob store lokal) dikirim lewat FileResponse, yang
+memakai sendfile/pathsend kalau server mendukung dan menangani Range sendiri.
+"""
+from typing import BinaryIO, Callable, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+# URL berversi (?v=<sha256>) isinya tidak akan pernah berubah
+CACHE_IMMUTABLE = "private, max-age=31536000, immutable"
+# URL "dokumen terbaru" harus divalidasi ulang, tapi 304 tetap murah
+CACHE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(sha256: str) -> str:
+    return f'"{sha256}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse header Range satu segmen ("bytes=a-b", "bytes=a-", "bytes=-n").
+    Return (start, end) inklusif, None kalau header tidak dipakai
+    (kosong, multi-range, atau bukan satuan bytes -> kirim file utuh).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    spec = header[len("bytes="):].strip()
+    start_s, sep, end_s = spec.partition("-")
+    if not sep:
+        return None
+    try:
+        if start_s == "":
+            suffix = int(end_s)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, min(end, size - 1)
+
+
+def iter_file_range(f: BinaryIO, start: int, length: int, chunk_size: int = CHUNK_SIZE):
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def pdf_response(
+    request: Request,
+    *,
+    sha256: str,
+    size: int,
+    open_file: Callable[[], BinaryIO],
+    filename: str,
+    immutable: bool = False,
+    as_attachment: bool = False,
+    path: Optional[str] = None,
+) -> Response:
+    etag = make_etag(sha256)
+    disposition = "attachment" if as_attachment else "inline"
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": CACHE_IMMUTABLE if immutable else CACHE_REVALIDATE,
+        "Content-Disposition": f'{disposition}; filename="{filename}"',
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={k: headers[k] for k in ("ETag", "Cache-Control")})
+
+    if path is not None:
+        # Range, If-Range (ETag di atas), HEAD dan Content-Length diurus FileResponse
+        return FileResponse(path, headers=headers, media_type="application/pdf")
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        byte_range = parse_range(request.headers.get("range"), size)
+
+    if byte_range is None:
+        start, length, status_code = 0, size, 200
+    else:
+        start, end = byte_range
+        length, status_code = end - start + 1, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type="application/pdf")
+    return StreamingResponse(
+        iter_file_range(open_file(), start, length),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/pdf",
+    )
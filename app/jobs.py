@@ -0,0 +1,198 @@
+"""
+Antrian job save+merge di tabel T_MergeJob.
+
+POST /api/savemerge hanya menyimpan file evaluasi ke blob store (file sertifikat
+cukup hash dari certification terbaru), membuat satu baris job (status "queued")
+lalu mengembalikan job id. Worker (`python -m app.worker`)
+mengambil job tertua, menjalankan crud.save_evaluation_and_merge dan menulis
+progress ke baris job; IAB page membacanya lewat endpoint status / SSE.
+
+Job diambil dengan UPDATE bersyarat (WHERE Status = 'queued'), jadi beberapa worker
+bisa jalan bersamaan tanpa mengambil job yang sama. Job "running" yang heartbeat-nya
+lewat SAVEMERGE_JOB_STALE detik (worker mati) dikembalikan ke antrian. Setiap worker
+juga menulis heartbeat-nya sendiri ke T_WorkerHeartbeat, terlepas dari job; kalau tidak
+ada yang lebih baru dari SAVEMERGE_WORKER_ALIVE detik, request tidak mengantrikan job
+(lihat worker_alive).
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+import json
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import crud, documents, settings
+from .models import MergeJob, WorkerHeartbeat
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+# file input save+merge, urutannya sama dengan urutan merge
+INPUT_ATTRS = ("file_soldering", "file_screwing", "file_msa", "op_train_eval", "op_skills_eval", "train_eval")
+
+
+def enqueue_savemerge(db: Session, data: dict) -> MergeJob:
+    """
+    Simpan file input ke blob store dan buat job baru (commit). File sertifikat yang
+    tidak dikirim client diambil dari certification terbaru (cukup hash-nya).
+    """
+    inputs = {}
+    if any(not data.get(attr) for attr in crud.CERTIFICATION_FILE_ATTRS):
+        inputs.update(crud.certification_file_shas(db, data["nik"]))
+    for attr in INPUT_ATTRS:
+        value = data.get(attr)
+        if value:
+            inputs[attr] = documents.store_upload(db, value).sha256
+    job = MergeJob(
+        kind="savemerge",
+        nik=data["nik"],
+        status=QUEUED,
+        progress=0,
+        message="Waiting for worker",
+        payload=json.dumps({"nik": data["nik"], "inputs": inputs}),
+        attempts=0,
+        created_at=datetime.utcnow(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def job_inputs(job: MergeJob) -> dict:
+    """Data untuk crud.save_evaluation_and_merge, file diambil dari blob store."""
+    payload = json.loads(job.payload)
+    store = documents.get_blob_store()
+    data = {"nik": payload["nik"]}
+    for attr in INPUT_ATTRS:
+        sha = payload["inputs"].get(attr)
+        data[attr] = store.get(sha) if sha else None
+    return data
+
+
+def claim_next(db: Session, worker: str) -> Optional[MergeJob]:
+    """Ambil job queued tertua untuk worker ini, atau None kalau antrian kosong."""
+    while True:
+        job_id = db.execute(
+            select(MergeJob.id).where(MergeJob.status == QUEUED).order_by(MergeJob.id).limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+        now = datetime.utcnow()
+        claimed = db.execute(
+            update(MergeJob)
+            .where(MergeJob.id == job_id, MergeJob.status == QUEUED)
+            .values(status=RUNNING, worker=worker, started_at=now, heartbeat_at=now,
+                    attempts=MergeJob.attempts + 1, progress=0, message="Started")
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(MergeJob, job_id)
+        # worker lain lebih dulu, coba job berikutnya
+
+
+def set_progress(db: Session, job_id: int, percent: int, message: str):
+    db.execute(
+        update(MergeJob)
+        .where(MergeJob.id == job_id, MergeJob.status == RUNNING)
+        .values(progress=percent, message=message[:200], heartbeat_at=datetime.utcnow())
+    )
+    db.commit()
+
+
+def finish(db: Session, job_id: int, result: dict):
+    db.execute(
+        update(MergeJob)
+        .where(MergeJob.id == job_id)
+        .values(status=DONE, progress=100, message="Done", result=json.dumps(result), finished_at=datetime.utcnow())
+    )
+    db.commit()
+
+
+def fail(db: Session, job_id: int, error: str):
+    db.execute(
+        update(MergeJob)
+        .where(MergeJob.id == job_id)
+        .values(status=FAILED, message="Failed", error=error, finished_at=datetime.utcnow())
+    )
+    db.commit()
+
+
+def requeue_stale(db: Session, stale_seconds: int = None) -> int:
+    """Job running tanpa heartbeat (worker mati) diantrikan lagi, atau failed kalau sudah terlalu sering."""
+    stale_seconds = stale_seconds or settings.SAVEMERGE_JOB_STALE
+    limit = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    stale = (MergeJob.status == RUNNING, MergeJob.heartbeat_at < limit)
+    failed = db.execute(
+        update(MergeJob)
+        .where(*stale, MergeJob.attempts >= settings.SAVEMERGE_JOB_ATTEMPTS)
+        .values(status=FAILED, message="Failed", error="Worker stopped responding", finished_at=datetime.utcnow())
+    ).rowcount
+    requeued = db.execute(
+        update(MergeJob)
+        .where(*stale)
+        .values(status=QUEUED, message="Requeued after worker timeout", worker=None)
+    ).rowcount
+    db.commit()
+    return failed + requeued
+
+
+def get_job(db: Session, job_id: int) -> Optional[MergeJob]:
+    return db.get(MergeJob, job_id)
+
+
+async def get_job_async(db: AsyncSession, job_id: int) -> Optional[MergeJob]:
+    return (await db.execute(select(MergeJob).where(MergeJob.id == job_id))).scalars().first()
+
+
+def job_to_dict(job: MergeJob) -> dict:
+    return {
+        "id": job.id,
+        "nik": job.nik,
+        "status": job.status,
+        "progress": job.progress,
+        "message": job.message,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+# -------------------- Worker heartbeat --------------------
+def beat(db: Session, worker: str):
+    """Tandai worker ini masih hidup (satu baris per worker di T_WorkerHeartbeat)."""
+    now = datetime.utcnow()
+    updated = db.execute(
+        update(WorkerHeartbeat).where(WorkerHeartbeat.worker == worker).values(heartbeat_at=now)
+    ).rowcount
+    if not updated:
+        db.add(WorkerHeartbeat(worker=worker, started_at=now, heartbeat_at=now))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # baris dibuat bersamaan (nama worker sama), heartbeat berikutnya meng-update
+
+
+def worker_stopped(db: Session, worker: str):
+    db.execute(delete(WorkerHeartbeat).where(WorkerHeartbeat.worker == worker))
+    db.commit()
+
+
+def _worker_alive_stmt(alive_seconds: int = None):
+    alive_seconds = alive_seconds or settings.SAVEMERGE_WORKER_ALIVE
+    limit = datetime.utcnow() - timedelta(seconds=alive_seconds)
+    return select(WorkerHeartbeat.worker).where(WorkerHeartbeat.heartbeat_at >= limit).limit(1)
+
+
+def worker_alive(db: Session, alive_seconds: int = None) -> bool:
+    """True kalau ada worker dengan heartbeat lebih baru dari SAVEMERGE_WORKER_ALIVE detik."""
+    return db.execute(_worker_alive_stmt(alive_seconds)).first() is not None
+
+
+async def worker_alive_async(db: AsyncSession, alive_seconds: int = None) -> bool:
+    return (await db.execute(_worker_alive_stmt(alive_seconds))).first() is not None
@@ -2,13 +2,14 @@ from dotenv import load_dotenv
 from fastapi import FastAPI, Request, Depends, HTTPException
 from fastapi import UploadFile, File, Form, Body, Query
 from fastapi.responses import RedirectResponse
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from app.schemas import CreateCertificationRecordSchema, UpdateCertificationRecordSchema, CertificationRecordSchema
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from .database import SessionLocal, engine, Base
-from app import models, crud, database
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import SessionLocal, engine, Base, get_db, get_async_db, get_pool_status
+from app import models, crud, database, documents, migrations, settings, operator_index, roster, jobs, worker, merge_engine, uploads, dossier
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List
 from datetime import date, datetime
@@ -19,19 +20,45 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from io import BytesIO
 from PyPDF2 import PdfMerger
+import asyncio
 import base64
 import os
 import shutil
 import json
 import traceback  
 from starlette.middleware.sessions import SessionMiddleware
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
 from .utils import verify_password
+from .downloads import pdf_response, etag_matches
+from .blobstore import BlobNotFound
 
 
 load_dotenv()
-models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema tidak lagi dibuat saat import; jalankan `python -m app.migrate upgrade`
+    if settings.DB_AUTO_MIGRATE:
+        migrations.upgrade(engine)
+    else:
+        current, head = migrations.current_revision(engine), migrations.head_revision()
+        if current < head:
+            print(f"⚠️ Database schema at revision {current}, latest is {head}. Run: python -m app.migrate upgrade")
+    # Index pencarian operator dimuat di background; sampai siap, /api/operators pakai SQL
+    operator_index.start(SessionLocal)
+    # SAVEMERGE_EMBEDDED_WORKER=1: antrian save+merge diproses di proses ini juga
+    worker.start_embedded()
+    if settings.SAVEMERGE_QUEUE and not settings.SAVEMERGE_EMBEDDED_WORKER:
+        print("⚠️ SAVEMERGE_QUEUE=1: save+merge jobs need a separate `python -m app.worker` process (without one, merges run in the request)")
+    yield
+    worker.stop_embedded()
+    merge_engine.shutdown()
+    operator_index.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Session Middleware (pakai SECRET_KEY dari .env)
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecret")
@@ -67,6 +94,69 @@ def as_pdf_data_uri(possible_data):
     # kalau isinya panjang base64 tanpa prefix
     return f"data:application/pdf;base64,{s}"
 
+def document_url(record, attr: str) -> Optional[str]:
+    """URL download PDF (lihat /api/operators/{nik}/documents/{kind}); ?v= membuatnya bisa di-cache permanen."""
+    if not documents.has_document(record, attr):
+        return None
+    url = f"/api/operators/{record.nik.strip()}/documents/{documents.KIND_BY_ATTR[attr]}"
+    sha = documents.document_sha256(record, attr)
+    return f"{url}?v={sha}" if sha else url
+
+def serialize_certification(cert) -> dict:
+    return {
+        "id": cert.id,
+        "nik": cert.nik,
+        "soldering_docno": cert.soldering_docno,
+        "soldering_traindate": safe_date_to_iso(cert.soldering_traindate),
+        "soldering_expdate": safe_date_to_iso(cert.soldering_expdate),
+
+        "screwing_docno": cert.screwing_docno,
+        "screwing_traindate": safe_date_to_iso(cert.screwing_traindate),
+        "screwing_expdate": safe_date_to_iso(cert.screwing_expdate),
+
+        "msa_docno": cert.msa_docno,
+        "msa_traindate": safe_date_to_iso(cert.msa_traindate),
+        "msa_expdate": safe_date_to_iso(cert.msa_expdate),
+
+        "file_soldering": document_url(cert, "file_soldering"),
+        "file_screwing": document_url(cert, "file_screwing"),
+        "file_msa": document_url(cert, "file_msa"),
+
+        "status": cert.status,
+
+        "soldering_written": cert.soldering_written,
+        "soldering_practical": cert.soldering_practical,
+        "soldering_result": cert.soldering_result,
+
+        "screwing_technique": cert.screwing_technique,
+        "screwing_work": cert.screwing_work,
+        "screwing_result": cert.screwing_result,
+
+        "ds_tiu": cert.ds_tiu,
+        "ds_accu": cert.ds_accu,
+        "ds_heco": cert.ds_heco,
+        "ds_mcc": cert.ds_mcc,
+        "ds_result": cert.ds_result,
+
+        "process": cert.process,
+        "ls_target": float(cert.ls_target) if cert.ls_target is not None else None,
+        "ls_actual": float(cert.ls_actual) if cert.ls_actual is not None else None,
+        "ls_achievement": float(cert.ls_achievement) if cert.ls_achievement is not None else None,
+        "ls_result": cert.ls_result,
+
+        "msaa_accuracy": cert.msaa_accuracy,
+        "msaa_missrate": cert.msaa_missrate,
+        "msaa_falsealarm": cert.msaa_falsealarm,
+        "msaa_confidence": cert.msaa_confidence,
+        "msaa_result": cert.msaa_result,
+    }
+
+def form_status(evaluation_complete, cert) -> str:
+    # logika lama: Closed kalau evaluasi lengkap atau sudah ada certification
+    if evaluation_complete or cert:
+        return "Closed"
+    return "New"
+
 def get_pdf_from_db(nama_file: str):
     try:
         with open(f"docs/{nama_file}", "rb") as f:
@@ -74,26 +164,6 @@ def get_pdf_from_db(nama_file: str):
     except:
         return None
 
-# helper to read UploadFile and return base64 string
-async def read_file_as_base64(upload_file: UploadFile) -> str:
-    data = await upload_file.read()
-    # optional: enforce file size limit on backend (e.g., 1MB)
-    max_bytes = 1 * 1024 * 1024
-    if len(data) > max_bytes:
-        raise HTTPException(status_code=400, detail=f"File {upload_file.filename} too large (max 1MB).")
-    # optional: check content-type
-    if upload_file.content_type != "application/pdf":
-        raise HTTPException(status_code=400, detail=f"File {upload_file.filename} must be a PDF.")
-    return base64.b64encode(data).decode("utf-8")
-
-# Dependency untuk ambil session DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # ----- Helper: Check Login -----
 def is_logged_in(request: Request):
     return request.session.get("logged_in") is True
@@ -101,6 +171,28 @@ def is_logged_in(request: Request):
 def get_current_role(request: Request):
     return request.session.get("role_id")
 
+# ----- Database pool statistics -----
+@app.get("/api/db/pool", response_class=JSONResponse)
+def api_pool_status():
+    return JSONResponse(content=get_pool_status())
+
+# ----- PDF merge engine statistics -----
+@app.get("/api/merge/engine", response_class=JSONResponse)
+def api_merge_engine_status():
+    return JSONResponse(content=merge_engine.get_engine().snapshot())
+
+# Status index pencarian operator in-memory + cache recordsTotal
+@app.get("/api/operators/search-index", response_class=JSONResponse)
+def api_operator_index_status():
+    index = operator_index.get_index()
+    return JSONResponse(content={
+        "enabled": operator_index.enabled(),
+        "ready": index is not None,
+        "index": index.stats() if index is not None else None,
+        "count_cache": crud.operator_count_cache.snapshot(),
+        "page_cache": crud.operator_page_cache.snapshot(),
+    })
+
 # ----- Root Redirect to Login -----
 @app.get("/", response_class=HTMLResponse)
 def root_redirect():
@@ -185,77 +277,21 @@ def IAB_page(request: Request):
 
 # ----------------- API: OPERATOR (HRD) -------------
 @app.get("/api/hrd/operator", response_class=JSONResponse)
-def api_get_operator_hrd(nik: str, db: Session = Depends(get_db)):
+async def api_get_operator_hrd(nik: str, db: AsyncSession = Depends(get_async_db)):
     """
     Return operator basic data + photo (base64) + certification (latest) + form_status
     """
-    op = crud.get_operator(db, nik)
+    op = await crud.get_operator_async(db, nik, with_photo=True)
     if not op:
         raise HTTPException(status_code=404, detail="Operator not found")
 
     photo_b64 = bytes_to_base64_str(op.photo)
 
-    cert = crud.get_latest_certification(db, nik)
-    cert_obj = None
-    if cert:
-        cert_obj = {
-            "id": cert.id,
-            "nik": cert.nik,
-            "soldering_docno": cert.soldering_docno,
-            "soldering_traindate": safe_date_to_iso(cert.soldering_traindate),
-            "soldering_expdate": safe_date_to_iso(cert.soldering_expdate),
-
-            "screwing_docno": cert.screwing_docno,
-            "screwing_traindate": safe_date_to_iso(cert.screwing_traindate),
-            "screwing_expdate": safe_date_to_iso(cert.screwing_expdate),
-
-            "msa_docno": cert.msa_docno,
-            "msa_traindate": safe_date_to_iso(cert.msa_traindate),
-            "msa_expdate": safe_date_to_iso(cert.msa_expdate),
-
-            "file_soldering": as_pdf_data_uri(cert.file_soldering),
-            "file_screwing": as_pdf_data_uri(cert.file_screwing),
-            "file_msa": as_pdf_data_uri(cert.file_msa),
-
-            "status": cert.status,
-
-            "soldering_written": cert.soldering_written,
-            "soldering_practical": cert.soldering_practical,
-            "soldering_result": cert.soldering_result,
-
-            "screwing_technique": cert.screwing_technique,
-            "screwing_work": cert.screwing_work,
-            "screwing_result": cert.screwing_result,
-
-            "ds_tiu": cert.ds_tiu,
-            "ds_accu": cert.ds_accu,
-            "ds_heco": cert.ds_heco,
-            "ds_mcc": cert.ds_mcc,
-            "ds_result": cert.ds_result,
-
-            "process": cert.process,
-            "ls_target": float(cert.ls_target) if cert.ls_target is not None else None,
-            "ls_actual": float(cert.ls_actual) if cert.ls_actual is not None else None,
-            "ls_achievement": float(cert.ls_achievement) if cert.ls_achievement is not None else None,
-            "ls_result": cert.ls_result,
-
-            "msaa_accuracy": cert.msaa_accuracy,
-            "msaa_missrate": cert.msaa_missrate,
-            "msaa_falsealarm": cert.msaa_falsealarm,
-            "msaa_confidence": cert.msaa_confidence,
-            "msaa_result": cert.msaa_result,
-        }
+    cert = await crud.get_latest_certification_async(db, nik)
+    cert_obj = serialize_certification(cert) if cert else None
 
-    eval_doc = crud.get_latest_evaluation_document(db, nik)
-
-    # Form status (logika lama dipertahankan)
-    form_status = "Waiting"
-    if eval_doc and eval_doc.op_train_eval and eval_doc.op_skills_eval and eval_doc.train_eval:
-        form_status = "Closed"
-    elif cert_obj:
-        form_status = "Closed"
-    else:
-        form_status = "New"
+    # cukup status kelengkapan file, isi PDF evaluasi tidak perlu di-load
+    eval_doc = await crud.get_latest_evaluation_summary_async(db, nik)
 
     return JSONResponse(content={
         "nik": op.nik,
@@ -265,76 +301,239 @@ def api_get_operator_hrd(nik: str, db: Session = Depends(get_db)):
         "contract_status": op.contract_status,
         "end_contract_date": safe_date_to_iso(op.end_contract_date),
         "Photo": photo_b64,
-        "form_status": form_status,
+        "form_status": form_status(eval_doc.complete if eval_doc else False, cert),
         "certification": cert_obj
     })
 
+# -------------------- API: operator roster snapshot --------------------
+@app.get("/api/operators/roster")
+def api_operator_roster(request: Request):
+    """
+    Seluruh roster (NIK, Name, Line, Level) sebagai satu JSON yang sudah dikompres,
+    untuk pencarian di browser. Revalidasi dengan If-None-Match -> 304.
+    """
+    snapshot = roster.get_snapshot(SessionLocal)
+    coding = roster.negotiate(request.headers.get("accept-encoding"), snapshot)
+    headers = {
+        "ETag": snapshot.etag(coding),
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    # ETag dari coding lain tetap berarti isi roster sama
+    if any(etag_matches(request.headers.get("if-none-match"), etag) for etag in snapshot.etags()):
+        return Response(status_code=304, headers=headers)
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(content=snapshot.bodies[coding], media_type="application/json", headers=headers)
+
+# -------------------- API: batch operator lookup (NDJSON) --------------------
+BATCH_FIELDS = (
+    "nik", "name", "line", "job_level", "contract_status", "end_contract_date",
+    "Photo", "form_status", "certification", "evaluation",
+)
+BATCH_DEFAULT_FIELDS = tuple(f for f in BATCH_FIELDS if f != "Photo")
+
+
+def serialize_batch_operator(op, cert, evaluation, fields) -> dict:
+    item = {
+        "nik": op.nik,
+        "name": op.name,
+        "line": op.line,
+        "job_level": op.level,
+        "contract_status": op.contract_status,
+        "end_contract_date": safe_date_to_iso(op.end_contract_date),
+    }
+    if "Photo" in fields:
+        item["Photo"] = bytes_to_base64_str(op.photo)
+    if "form_status" in fields:
+        item["form_status"] = form_status(evaluation[2] if evaluation else False, cert)
+    if "certification" in fields:
+        item["certification"] = serialize_certification(cert) if cert else None
+    if "evaluation" in fields:
+        item["evaluation"] = {
+            "id": evaluation[0],
+            "upload_date": safe_date_to_iso(evaluation[1]),
+            "complete": bool(evaluation[2]),
+        } if evaluation else None
+    return {key: value for key, value in item.items() if key in fields}
+
+
+@app.post("/api/operators/batch")
+async def api_operators_batch(payload: schemas.OperatorBatchIn):
+    """
+    Data banyak operator sekaligus (dashboard line, export), satu baris JSON per NIK
+    sesuai urutan input. NIK yang tidak ada -> {"nik": ..., "error": "not_found"}.
+    Query per chunk OPERATOR_BATCH_CHUNK NIK, jadi jumlah statement tetap kecil.
+    """
+    niks = list(dict.fromkeys(nik.strip() for nik in payload.niks if nik and nik.strip()))
+    if not niks:
+        raise HTTPException(status_code=400, detail="niks is required")
+    if len(niks) > settings.OPERATOR_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many NIKs (max {settings.OPERATOR_BATCH_MAX})")
+    fields = set(payload.fields or BATCH_DEFAULT_FIELDS)
+    unknown = fields.difference(BATCH_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    async def ndjson_lines():
+        # session sendiri: session dari Depends sudah ditutup sebelum body di-stream
+        async with database.AsyncSessionLocal() as db:
+            rows = crud.iter_operator_batch_async(
+                db, niks,
+                with_photo="Photo" in fields,
+                with_certification=bool(fields & {"certification", "form_status"}),
+                with_evaluation=bool(fields & {"evaluation", "form_status"}),
+            )
+            async for nik, op, cert, evaluation in rows:
+                if op is None:
+                    item = {"nik": nik, "error": "not_found"}
+                else:
+                    item = serialize_batch_operator(op, cert, evaluation, fields)
+                yield json.dumps(item) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 # -------------------- API: operator photo (binary) --------------------
 @app.get("/api/operator/photo")
 def api_get_photo(nik: str, db: Session = Depends(get_db)):
-    op = crud.get_operator(db, nik)
+    op = crud.get_operator(db, nik, with_photo=True)
     if not op or not op.photo:
         raise HTTPException(status_code=404, detail="Photo not found")
     return Response(content=op.photo, media_type="image/jpeg")
 
-# -------------------- API: certification (by nik) - HRD (GET) --------------------
-@app.get("/api/hrd/certification", response_class=JSONResponse)
-def api_get_certification_hrd(nik: str, db: Session = Depends(get_db)):
-    # gunakan kolom created_at yang benar (bukan CreatedAt)
-    cert = (
-        db.query(CertificationRecord)
-        .filter(CertificationRecord.nik == nik)
-        .order_by(CertificationRecord.created_at.desc())
-        .first()
-    )
-    if not cert:
-        raise HTTPException(status_code=404, detail="Certification record not found.")
+# -------------------- Merged dossier on demand (DOSSIER_MODE=lazy) --------------------
+def open_lazy_dossier(db: Session, nik: str):
+    """(sha256, size, open_file) dossier dari cache; merge dulu kalau belum ada."""
+    try:
+        entry = crud.get_or_build_dossier(db, nik)
+    except merge_engine.MergeBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except merge_engine.MergeTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except merge_engine.MergeTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ValueError as e:
+        # certification / evaluation belum lengkap
+        raise HTTPException(status_code=404, detail=str(e))
+    store = documents.get_blob_store()
+    sha = entry.merged_sha256
+    return sha, entry.size, lambda: store.open(sha)
+
+@app.get("/api/dossier/cache", response_class=JSONResponse)
+def api_dossier_cache_status(db: Session = Depends(get_db)):
+    return dossier.stats(db)
+
+# -------------------- API: document metadata (tanpa membaca file) --------------------
+@app.get("/api/operators/{nik}/documents")
+def api_list_operator_documents(nik: str, db: Session = Depends(get_db)):
+    docs = crud.list_operator_documents(db, nik)
+    items = []
+    for kind, meta in docs.items():
+        url = f"/api/operators/{nik.strip()}/documents/{kind}"
+        items.append({"kind": kind, **meta, "url": f"{url}?v={meta['sha256']}" if meta["sha256"] else url})
+    return {
+        "nik": nik,
+        "documents": items,
+        # file yang sama hanya disimpan sekali di blob store
+        "total_bytes": sum({item["sha256"]: item["size"] for item in items if item["sha256"]}.values()),
+    }
 
-    data = {
-        "id": cert.id,
-        "nik": cert.nik,
-        "soldering_docno": cert.soldering_docno,
-        "soldering_traindate": safe_date_to_iso(cert.soldering_traindate),
-        "soldering_expdate": safe_date_to_iso(cert.soldering_expdate),  
-        "screwing_docno": cert.screwing_docno,
-        "screwing_traindate": safe_date_to_iso(cert.screwing_traindate),
-        "screwing_expdate": safe_date_to_iso(cert.screwing_expdate),    
-        "msa_docno": cert.msa_docno,
-        "msa_traindate": safe_date_to_iso(cert.msa_traindate),
-        "msa_expdate": safe_date_to_iso(cert.msa_expdate),  
-      
-        "file_soldering":  as_pdf_data_uri(cert.file_soldering),
-        "file_screwing": as_pdf_data_uri(cert.file_screwing),
-        "file_msa": as_pdf_data_uri(cert.file_msa),
-        "status": cert.status,
+# Cek dedup: client menghitung SHA-256 file lalu bertanya apakah sudah ada di server
+@app.get("/api/blobs/{sha256}")
+def api_get_blob_metadata(sha256: str, db: Session = Depends(get_db)):
+    meta = crud.blob_metadata(crud.get_blob(db, sha256))
+    if not meta:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return meta
+
+# -------------------- API: operator document (binary PDF stream) --------------------
+@app.get("/api/operators/{nik}/documents/{kind}")
+def api_get_operator_document(
+    nik: str,
+    kind: str,
+    request: Request,
+    v: Optional[str] = None,
+    download: bool = False,
+    db: Session = Depends(get_db),
+):
+    if kind not in documents.DOCUMENT_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown document kind '{kind}'")
 
-        "soldering_written": cert.soldering_written,
-        "soldering_practical": cert.soldering_practical,
-        "soldering_result": cert.soldering_result,
+    if kind == "dossier" and settings.DOSSIER_MODE == "lazy":
+        sha, size, open_file = open_lazy_dossier(db, nik)
+    else:
+        record = crud.get_document_record(db, nik, kind)
+        if not record:
+            raise HTTPException(status_code=404, detail="Document not found")
+        doc = documents.open_document(database.SessionLocal, record, documents.DOCUMENT_KINDS[kind].legacy_attr)
+        if not doc:
+            raise HTTPException(status_code=404, detail="Document not found")
+        sha, size, open_file = doc
+
+    return pdf_response(
+        request,
+        sha256=sha,
+        size=size,
+        open_file=open_file,
+        filename=f"{nik.strip()}_{kind}.pdf",
+        immutable=(v == sha),
+        as_attachment=download,
+    )
 
-        "screwing_technique": cert.screwing_technique,
-        "screwing_work": cert.screwing_work,
-        "screwing_result": cert.screwing_result,
+# HEAD (ukuran / ETag tanpa isi) sebagai route sendiri supaya operation id OpenAPI tidak dobel
+app.add_api_route("/api/operators/{nik}/documents/{kind}", api_get_operator_document, methods=["HEAD"], operation_id="api_get_operator_document_head")
 
-        "ds_tiu": cert.ds_tiu,
-        "ds_accu": cert.ds_accu,
-        "ds_heco": cert.ds_heco,
-        "ds_mcc": cert.ds_mcc,
-        "ds_result": cert.ds_result,
+# -------------------- API: merged dossier download --------------------
+@app.get("/api/operators/{nik}/dossier")
+def api_download_operator_dossier(nik: str, request: Request, inline: bool = False, db: Session = Depends(get_db)):
+    """
+    Merged dossier terbaru sebagai file PDF. Dari blob store lokal dikirim langsung
+    dari disk (sendfile), dossier lama yang masih base64 di T_PDFOPT dibaca per
+    potongan dari database. Range dan If-None-Match didukung di kedua jalur.
+    """
+    store = documents.get_blob_store()
+    path = None
+    if settings.DOSSIER_MODE == "lazy":
+        sha, size, open_file = open_lazy_dossier(db, nik)
+        path = store.local_path(sha)
+    else:
+        record = crud.get_latest_pdfopt(db, nik)
+        if not record:
+            raise HTTPException(status_code=404, detail="Dossier not found")
+        sha = record.merged_pdf_sha256
+        if sha:
+            try:
+                size = store.size(sha)
+            except BlobNotFound:
+                raise HTTPException(status_code=404, detail="Dossier file missing from blob store")
+            open_file, path = (lambda: store.open(sha)), store.local_path(sha)
+        else:
+            doc = documents.open_legacy_document(database.SessionLocal, record, "merged_pdf")
+            if not doc:
+                raise HTTPException(status_code=404, detail="Dossier not found")
+            sha, size, open_file = doc
+
+    return pdf_response(
+        request,
+        sha256=sha,
+        size=size,
+        open_file=open_file,
+        path=path,
+        filename=f"{nik.strip()}_dossier.pdf",
+        as_attachment=not inline,
+    )
 
-        "process": cert.process,
-        "ls_target": float(cert.ls_target) if cert.ls_target is not None else None,
-        "ls_actual": float(cert.ls_actual) if cert.ls_actual is not None else None,
-        "ls_achievement": float(cert.ls_achievement) if cert.ls_achievement is not None else None,
-        "ls_result": cert.ls_result,
+# HEAD (ukuran / ETag tanpa isi) sebagai route sendiri supaya operation id OpenAPI tidak dobel
+app.add_api_route("/api/operators/{nik}/dossier", api_download_operator_dossier, methods=["HEAD"], operation_id="api_download_operator_dossier_head")
 
-        "msaa_accuracy": cert.msaa_accuracy,
-        "msaa_missrate": cert.msaa_missrate,
-        "msaa_falsealarm": cert.msaa_falsealarm,
-        "msaa_confidence": cert.msaa_confidence,
-        "msaa_result": cert.msaa_result,
-    }
-    return JSONResponse(content=data)
+# -------------------- API: certification (by nik) - HRD (GET) --------------------
+@app.get("/api/hrd/certification", response_class=JSONResponse)
+def api_get_certification_hrd(nik: str, db: Session = Depends(get_db)):
+    cert = crud.get_latest_certification(db, nik)
+    if not cert:
+        raise HTTPException(status_code=404, detail="Certification record not found.")
+
+    return JSONResponse(content=serialize_certification(cert))
 
 # -------------------- API: create certification (schema) --------------------
 @app.post("/api/certification")
@@ -364,44 +563,45 @@ def create_certification_hrd(data:CreateCertificationRecordSchema, db: Session =
     return {"message": "Certification record created successfully"}
 
 # -------------------- API: certification file upload - HRD --------------------
-@app.post("/api/hrd/certification/upload")
-def upload_certification_file_hrd(payload: dict = Body(...), db: Session = Depends(get_db)):
-    try:
-        nik = payload["nik"]
-    except KeyError:
+CERTIFICATION_UPLOAD_FIELDS = (
+    ("file_soldering", "Soldering", "soldering"),
+    ("file_screwing", "Screwing", "screwing"),
+    ("file_msa", "MSA", "msa"),
+)
+
+
+def _save_certification_upload(db: Session, values: dict, files: dict = None):
+    """values = field teks (JSON atau form); files = file multipart, kalau ada dipakai sebagai isi file_*."""
+    nik = values.get("nik")
+    if not nik:
         raise HTTPException(status_code=400, detail="Missing 'nik' in payload")
 
+    files = files or {}
+    values = dict(values)
+    for attr, _, _ in CERTIFICATION_UPLOAD_FIELDS:
+        if isinstance(values.get(attr), str) and values[attr] and attr not in files:
+            try:
+                values[attr] = uploads.decode_pdf_base64(values[attr])  # sekali decode, bytes ke crud
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"{attr}: {e}")
     cert_type = None
-    base64_str = None
+    file_value = None
     docno, traindate, expdate = None, None, None
-
-    if "file_soldering" in payload and payload["file_soldering"]:
-        cert_type = "Soldering"
-        base64_str = payload["file_soldering"]
-        docno = payload.get("soldering_docno")
-        traindate = payload.get("soldering_traindate")
-        expdate = payload.get("soldering_expdate")
-
-    elif "file_screwing" in payload and payload["file_screwing"]:
-        cert_type = "Screwing"
-        base64_str = payload["file_screwing"]
-        docno = payload.get("screwing_docno")
-        traindate = payload.get("screwing_traindate")
-        expdate = payload.get("screwing_expdate")
-
-    elif "file_msa" in payload and payload["file_msa"]:
-        cert_type = "MSA"
-        base64_str = payload["file_msa"]
-        docno = payload.get("msa_docno")
-        traindate = payload.get("msa_traindate")
-        expdate = payload.get("msa_expdate")
-
-    if not cert_type or not base64_str:
+    for attr, name, prefix in CERTIFICATION_UPLOAD_FIELDS:
+        value = files.get(attr) or values.get(attr)
+        if value:
+            cert_type, file_value = name, value
+            docno = values.get(f"{prefix}_docno")
+            traindate = values.get(f"{prefix}_traindate")
+            expdate = values.get(f"{prefix}_expdate")
+            break
+
+    if not cert_type or not file_value:
         raise HTTPException(status_code=400, detail="No valid file_* field found in payload")
 
     try:
         crud.update_certification_file_base64(
-            db, nik, cert_type, base64_str,
+            db, nik, cert_type, file_value,
             docno=docno,
             traindate=traindate,
             expdate=expdate,
@@ -410,10 +610,26 @@ def upload_certification_file_hrd(payload: dict = Body(...), db: Session = Depen
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return cert_type
+
 
+@app.post("/api/hrd/certification/upload")
+def upload_certification_file_hrd(payload: dict = Body(...), db: Session = Depends(get_db)):
+    cert_type = _save_certification_upload(db, payload)
     return {"message": f"{cert_type} file saved to database as base64"}
 
 
+# Versi multipart: file dikirim apa adanya (tanpa base64) dan di-stream ke blob store
+@app.post("/api/hrd/certification/upload/multipart")
+async def upload_certification_file_hrd_multipart(request: Request, db: Session = Depends(get_db)):
+    form = await uploads.read_pdf_form(request, files=[attr for attr, _, _ in CERTIFICATION_UPLOAD_FIELDS])
+    try:
+        cert_type = await run_in_threadpool(_save_certification_upload, db, form.fields, form.files)
+    finally:
+        form.close()
+    return {"message": f"{cert_type} file saved"}
+
+
 # -------------------- API: view PDF from base64 in DB --------------------
 @app.get("/view-pdf/{file_name}")
 def view_pdf(file_name: str):
@@ -435,18 +651,17 @@ def view_pdf(file_name: str):
 # -------------------- API: evaluation save (schema umum) --------------------
 class EvaluationSaveIn(BaseModel):
     nik: str
-    op_train_eval: str  # base64
-    op_skills_eval: str  # base64
-    train_eval: str  # base64
+    # dikirim sebagai string base64, di-decode + dicek sekali di validator
+    op_train_eval: bytes = Field(description="PDF, base64")
+    op_skills_eval: bytes = Field(description="PDF, base64")
+    train_eval: bytes = Field(description="PDF, base64")
     upload_date: Optional[date] = Field(default_factory=lambda: datetime.utcnow().date())
 
-    @validator("op_train_eval", "op_skills_eval", "train_eval")
+    @validator("op_train_eval", "op_skills_eval", "train_eval", pre=True)
     def validate_base64(cls, v):
-        try:
-            base64.b64decode(v)
-        except Exception:
-            raise ValueError("Invalid base64 file input")
-        return v
+        if not isinstance(v, str):
+            raise ValueError("File must be a base64 string")
+        return uploads.decode_pdf_base64(v)
 
 # -------------------- API: evaluation save - HRD --------------------
 @app.post("/api/hrd/evaluation/save")
@@ -458,102 +673,92 @@ def save_evaluation_document_hrd(data: EvaluationSaveIn, db: Session = Depends(g
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Versi multipart dari /api/hrd/evaluation/save (field: nik, upload_date opsional, 3 file PDF)
+@app.post("/api/hrd/evaluation/save/multipart")
+async def save_evaluation_document_hrd_multipart(request: Request, db: Session = Depends(get_db)):
+    form = await uploads.read_pdf_form(request, files=crud.EVALUATION_FILE_ATTRS)
+    try:
+        missing = [attr for attr in ("nik", *crud.EVALUATION_FILE_ATTRS) if not (form.fields.get(attr) or form.files.get(attr))]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Missing field(s): {', '.join(missing)}")
+        try:
+            upload_date = date.fromisoformat(form.fields["upload_date"]) if form.fields.get("upload_date") else datetime.utcnow().date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="upload_date must be YYYY-MM-DD")
+        payload = {"nik": form.fields["nik"], "upload_date": upload_date, **form.files}
+        try:
+            result = await run_in_threadpool(crud.save_evaluation_document, db, payload)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return {"message": "Evaluation document saved successfully", "id": getattr(result, "id", None)}
+    finally:
+        form.close()
+
 # ==============================
 # ====== BAGIAN IAB PAGE =======
 # ==============================
 
 # ----------------- API: list operators (NIK + Name) -----------------
 @app.get("/api/operators", response_model=OperatorServerSideResponse)
-def get_operators_server_side(
+async def get_operators_server_side(
    search: str = Query("", description="Search keyword"),
     start: int = Query(0, ge=0),
     length: int = Query(10, ge=1),
     order_col: int = Query(0, ge=0),
     order_dir: str = Query("asc"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque keyset cursor (next_cursor dari halaman sebelumnya); hanya dipakai di jalur SQL, diabaikan saat index in-memory / full-text melayani query"),
+    count: str = Query(settings.OPERATOR_COUNT_MODE, pattern="^(exact|capped)$", description="capped = recordsFiltered maksimal OPERATOR_COUNT_CAP"),
+    mode: str = Query("contains", pattern="^(contains|fuzzy|auto)$", description="fuzzy = toleran salah ketik, auto = fuzzy kalau contains kosong"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    total, filtered, items = crud.get_operators(
-        db, search=search, start=start, length=length,
-        order_col=order_col, order_dir=order_dir
-    )
+    fuzzy, partial = None, False
+    await crud.check_operator_index_async(db)
+    if mode == "fuzzy" and search.strip():
+        fuzzy = crud.get_operators_fuzzy(search, start, length)
+    if fuzzy is None:
+        total, filtered, capped, items, next_cursor = await crud.get_operators_async(
+            db, search=search, start=start, length=length,
+            order_col=order_col, order_dir=order_dir, cursor=cursor, count_mode=count
+        )
+        # auto: coba fuzzy hanya kalau pencarian biasa tidak menemukan apa-apa
+        if mode == "auto" and not filtered and len(search.strip()) >= 3:
+            fuzzy = crud.get_operators_fuzzy(search, start, length)
+    if fuzzy is not None:
+        # urut kemiripan, jadi tidak ada keyset cursor
+        (total, filtered, partial, items), capped, next_cursor = fuzzy, False, None
 
     return {
-        "recordsTotal": total,       # total semua data
+        "recordsTotal": total,       # total semua data (cache)
         "recordsFiltered": filtered, # hasil filter
-        "data": items
+        "filtered_capped": capped,   # True = hasil filter lebih dari recordsFiltered ("1000+")
+        "data": items,
+        "next_cursor": next_cursor,  # untuk halaman berikutnya (keyset)
+        "partial": partial,          # True = fuzzy search kena batas waktu
     }
 
     
 # API to get operator data (IAB_Page)
 @app.get("/api/operator/iab")
-def api_get_operator_iab(nik: Optional[str] = None, db: Session = Depends(get_db)):
+async def api_get_operator_iab(nik: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
     if not nik:
         raise HTTPException(status_code=400, detail="NIK is required")
 
-    op = crud.get_operator(db, nik)
-    if not op:
+    # Operator + certification + evaluation terbaru dalam satu query
+    dossier = await crud.get_operator_dossier_async(db, nik)
+    if not dossier:
         raise HTTPException(status_code=404, detail="Operator not found")
+    op, cert, eval_doc = dossier
 
     # Certification
-    cert = crud.get_latest_certification(db, nik)
-    cert_obj = None
-    if cert:
-        cert_obj = {
-            "id": cert.id,
-            "nik": cert.nik,
-            "soldering_docno": cert.soldering_docno,
-            "soldering_traindate": safe_date_to_iso(cert.soldering_traindate),
-            "soldering_expdate": safe_date_to_iso(cert.soldering_expdate),
-
-            "screwing_docno": cert.screwing_docno,
-            "screwing_traindate": safe_date_to_iso(cert.screwing_traindate),
-            "screwing_expdate": safe_date_to_iso(cert.screwing_expdate),
-
-            "msa_docno": cert.msa_docno,
-            "msa_traindate": safe_date_to_iso(cert.msa_traindate),
-            "msa_expdate": safe_date_to_iso(cert.msa_expdate),
-
-            "file_soldering": as_pdf_data_uri(cert.file_soldering),
-            "file_screwing": as_pdf_data_uri(cert.file_screwing),
-            "file_msa": as_pdf_data_uri(cert.file_msa),
-
-            "status": cert.status,
-
-            "soldering_written": cert.soldering_written,
-            "soldering_practical": cert.soldering_practical,
-            "soldering_result": cert.soldering_result,
-
-            "screwing_technique": cert.screwing_technique,
-            "screwing_work": cert.screwing_work,
-            "screwing_result": cert.screwing_result,
-
-            "ds_tiu": cert.ds_tiu,
-            "ds_accu": cert.ds_accu,
-            "ds_heco": cert.ds_heco,
-            "ds_mcc": cert.ds_mcc,
-            "ds_result": cert.ds_result,
-
-            "process": cert.process,
-            "ls_target": float(cert.ls_target) if cert.ls_target is not None else None,
-            "ls_actual": float(cert.ls_actual) if cert.ls_actual is not None else None,
-            "ls_achievement": float(cert.ls_achievement) if cert.ls_achievement is not None else None,
-            "ls_result": cert.ls_result,
-
-            "msaa_accuracy": cert.msaa_accuracy,
-            "msaa_missrate": cert.msaa_missrate,
-            "msaa_falsealarm": cert.msaa_falsealarm,
-            "msaa_confidence": cert.msaa_confidence,
-            "msaa_result": cert.msaa_result,
-        }
+    cert_obj = serialize_certification(cert) if cert else None
 
     # Evaluation Document
-    eval_doc = crud.get_latest_evaluation_document(db, nik)
     eval_data = None  
     if eval_doc:
         eval_data = {
-            "op_train_eval": as_pdf_data_uri(eval_doc.op_train_eval) if eval_doc.op_train_eval else None,
-            "op_skills_eval": as_pdf_data_uri(eval_doc.op_skills_eval) if eval_doc.op_skills_eval else None,
-            "train_eval": as_pdf_data_uri(eval_doc.train_eval)  if eval_doc.train_eval else None,
+            "op_train_eval": document_url(eval_doc, "op_train_eval"),
+            "op_skills_eval": document_url(eval_doc, "op_skills_eval"),
+            "train_eval": document_url(eval_doc, "train_eval"),
             "upload_date": eval_doc.upload_date.isoformat() if eval_doc.upload_date else None,
         }
 
@@ -585,87 +790,128 @@ def api_get_operator_iab(nik: Optional[str] = None, db: Session = Depends(get_db
 
 # API to get certification data by NIK (IAB_Page)
 @app.get("/api/certification", response_class=JSONResponse)
-def api_get_certification(nik: str, db: Session = Depends(get_db)):
-    cert = (db.query(models.CertificationRecord)
-        .filter(models.CertificationRecord.nik == nik)
-        .order_by(models.CertificationRecord.created_at.desc())
-        .first()
-    )
+async def api_get_certification(nik: str, db: AsyncSession = Depends(get_async_db)):
+    cert = await crud.get_latest_certification_async(db, nik)
     if not cert:
         raise HTTPException(status_code=404, detail="Certification record not found.")
 
-    data = {
-        # Screwing
-        "screwing_technique": cert.screwing_technique,
-        "screwing_work": cert.screwing_work,
-        "screwing_result": cert.screwing_result,
-
-        # Soldering
-        "soldering_written": cert.soldering_written,
-        "soldering_practical": cert.soldering_practical,
-        "soldering_result": cert.soldering_result,
-
-        # Line Simulation
-        "process": cert.process,
-        "ls_target": float(cert.ls_target),
-        "ls_actual": float(cert.ls_actual),
-        "ls_achievement": float(cert.ls_achievement),
-        "ls_result": cert.ls_result,
-
-        # Data Screening
-        "ds_tiu": cert.ds_tiu,
-        "ds_accu": cert.ds_accu,
-        "ds_heco": cert.ds_heco,
-        "ds_mcc": cert.ds_mcc,
-        "ds_result": cert.ds_result,
-
-        # MSA Assessment
-        "msaa_accuracy": cert.msaa_accuracy,
-        "msaa_missrate": cert.msaa_missrate,
-        "msaa_falsealarm": cert.msaa_falsealarm,
-        "msaa_confidence": cert.msaa_confidence,
-        "msaa_result": cert.msaa_result,
-
-        # Certification Skills
-        "soldering_docno": cert.soldering_docno,
-        "soldering_traindate": safe_date_to_iso(cert.soldering_traindate),
-        "soldering_expdate": safe_date_to_iso(cert.soldering_expdate),  
-        "file_soldering": as_pdf_data_uri(cert.file_soldering),
-        
-        "screwing_docno": cert.screwing_docno,
-        "screwing_traindate": safe_date_to_iso(cert.screwing_traindate),
-        "screwing_expdate": safe_date_to_iso(cert.screwing_expdate),    
-        "file_screwing":  as_pdf_data_uri(cert.file_screwing),
-
-        "msa_docno": cert.msa_docno,
-        "msa_traindate": safe_date_to_iso(cert.msa_traindate),
-        "msa_expdate": safe_date_to_iso(cert.msa_expdate),  
-        "file_msa": as_pdf_data_uri(cert.file_msa),
-        "status": cert.status,
-    }
-
-    return JSONResponse(content=data)
+    return JSONResponse(content=serialize_certification(cert))
 
 
 @app.get("/api/evaluation", response_model=EvaluationDocumentSchema | None)
-def get_evaluation_document(nik: str, db: Session = Depends(get_db)):
-    record = (
-        db.query(EvaluationDocument)
-        .filter(EvaluationDocument.nik == nik)
-        .order_by(EvaluationDocument.upload_date.desc())
-        .first()
-    )
+async def get_evaluation_document(nik: str, db: AsyncSession = Depends(get_async_db)):
+    record = await crud.get_latest_evaluation_document_async(db, nik)
     if not record:
         return Response(status_code=204)  # Biar frontend tahu kosong
-    return record
+    return {
+        "id": record.id,
+        "nik": record.nik,
+        "op_train_eval": document_url(record, "op_train_eval"),
+        "op_skills_eval": document_url(record, "op_skills_eval"),
+        "train_eval": document_url(record, "train_eval"),
+        "upload_date": record.upload_date,
+    }
 
-@app.post("/api/savemerge")
-def save_merge(data: SaveMergeIn, db: Session = Depends(get_db)):
+def _run_savemerge(db: Session, payload: dict):
+    """Antrikan (SAVEMERGE_QUEUE) atau langsung jalankan save+merge; dipakai versi JSON dan multipart."""
     try:
-        print("📩 Payload diterima:", data.dict())  # debug isi body
-        result = crud.save_evaluation_and_merge(db, data.dict())
+        if settings.SAVEMERGE_QUEUE:
+            # merge dikerjakan worker; request cukup menyimpan file input
+            if jobs.worker_alive(db):
+                job = jobs.enqueue_savemerge(db, payload)
+                return JSONResponse(status_code=202, content={
+                    "message": "Evaluation data queued",
+                    "job_id": job.id,
+                    "status_url": f"/api/savemerge/jobs/{job.id}",
+                    "events_url": f"/api/savemerge/jobs/{job.id}/events",
+                })
+            # tidak ada worker yang hidup: jangan antrikan job yang tidak akan diproses
+            print("⚠️ No save+merge worker alive, merging in the request: start `python -m app.worker` or set SAVEMERGE_EMBEDDED_WORKER=1")
+        result = crud.save_evaluation_and_merge(db, payload)
         return {"message": "Evaluation data saved successfully", "data": result}
+    except merge_engine.MergeBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except merge_engine.MergeTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except merge_engine.MergeTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # mis. file certification belum lengkap, base64 tidak valid
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Save+Merge failed: {str(e)}")
+
+@app.post("/api/savemerge")
+def save_merge(data: SaveMergeIn, db: Session = Depends(get_db)):
+    return _run_savemerge(db, data.dict())
+
+# Versi multipart: field nik + file PDF (file sertifikat opsional, default dari certification terbaru)
+@app.post("/api/savemerge/multipart")
+async def save_merge_multipart(request: Request, db: Session = Depends(get_db)):
+    form = await uploads.read_pdf_form(request, files=jobs.INPUT_ATTRS)
+    try:
+        if not form.fields.get("nik"):
+            raise HTTPException(status_code=400, detail="Missing field(s): nik")
+        missing = [attr for attr in crud.EVALUATION_FILE_ATTRS if attr not in form.files]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Missing file(s): {', '.join(missing)}")
+        return await run_in_threadpool(_run_savemerge, db, {"nik": form.fields["nik"], **form.files})
+    finally:
+        form.close()
+
+# Status job save+merge (polling)
+@app.get("/api/savemerge/jobs/{job_id}")
+async def save_merge_job_status(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    job = await jobs.get_job_async(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.job_to_dict(job)
+
+# Progress job save+merge sebagai Server-Sent Events; stream selesai saat job done/failed
+SSE_POLL_SECONDS = 0.5
+SSE_KEEPALIVE_SECONDS = 15
+SSE_WORKER_CHECK_SECONDS = 5  # selama job queued, cek T_WorkerHeartbeat tiap N detik
+
+@app.get("/api/savemerge/jobs/{job_id}/events")
+async def save_merge_job_events(job_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    if not await jobs.get_job_async(db, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last, idle, waited, next_check = None, 0.0, 0.0, 0.0
+        while not await request.is_disconnected():
+            # session baru per polling: session Depends sudah ditutup saat body di-stream
+            async with database.AsyncSessionLocal() as poll_db:
+                job = await jobs.get_job_async(poll_db, job_id)
+                state = jobs.job_to_dict(job) if job else None
+                alive = True
+                if state and state["status"] == jobs.QUEUED and waited >= next_check:
+                    alive = await jobs.worker_alive_async(poll_db)
+                    next_check = waited + SSE_WORKER_CHECK_SECONDS
+            if state is None:
+                yield "event: error\ndata: {\"detail\": \"Job not found\"}\n\n"
+                return
+            if state != last:
+                yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+                last, idle = state, 0.0
+            elif idle >= SSE_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            if state["status"] in jobs.FINISHED:
+                return
+            if not alive:
+                # tidak ada worker yang akan mengambil job; jangan biarkan halaman menunggu
+                yield "event: error\ndata: {\"detail\": \"Save+merge worker is not running\"}\n\n"
+                return
+            await asyncio.sleep(SSE_POLL_SECONDS)
+            waited += SSE_POLL_SECONDS
+            idle += SSE_POLL_SECONDS
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # jangan di-buffer reverse proxy
+    })
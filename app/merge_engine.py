@@ -0,0 +1,271 @@
+"""
+Merge PDF di process pool supaya merge (CPU-bound, pure Python) tidak memegang GIL
+proses web.
+
+    pdf_bytes = merge_engine.merge([soldering, screwing, msa, ...])
+
+- MERGE_WORKERS proses anak (0 = merge di thread pemanggil, seperti dulu).
+- Slot dibatasi MERGE_WORKERS + MERGE_QUEUE; kalau penuh langsung MergeBusy
+  (endpoint menjawab 503 + Retry-After) daripada menumpuk request.
+- MERGE_TIMEOUT detik per task, dihitung sejak task mulai jalan (task baru dikirim
+  ke pool kalau ada proses anak yang kosong, antri slot tidak ikut dihitung). Di Unix
+  task dihentikan di proses anak dengan SIGALRM; kalau anak tetap tidak menjawab,
+  pool di-restart.
+- MERGE_WORKERS=0: di main thread (CLI) timeout juga lewat SIGALRM; di thread
+  request merge jalan di thread terpisah dan request dijawab MergeTimeout setelah
+  MERGE_TIMEOUT, tapi merge-nya tidak bisa dihentikan: CPU tetap terpakai dan slot
+  baru kembali setelah merge selesai.
+- MERGE_MAX_PAGES membatasi total halaman input; dicek sebelum merge.
+- MERGE_COMPRESSION_LEVEL: hasil merge dioptimasi (app/pdf_optimize.py) di proses
+  anak yang sama; 0 = tanpa optimasi, 1-9 = level zlib (CPU vs ukuran).
+
+Modul ini sengaja hanya bergantung pada PyPDF2, settings dan pdf_optimize karena
+di-import ulang oleh setiap proses anak.
+"""
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import NamedTuple, Optional
+import signal
+import threading
+
+from PyPDF2 import PdfMerger, PdfReader
+
+from . import settings
+from .pdf_optimize import optimize_pdf
+
+
+class MergeError(Exception):
+    """Merge gagal karena batasan engine (bukan karena PDF rusak)."""
+
+
+class MergeBusy(MergeError):
+    def __init__(self, retry_after: int = 5):
+        super().__init__("PDF merge engine is busy, try again later")
+        self.retry_after = retry_after
+
+
+class MergeTimeout(MergeError):
+    pass
+
+
+class MergeTooLarge(MergeError):
+    pass
+
+
+class MergeResult(NamedTuple):
+    data: bytes        # PDF akhir (sudah dioptimasi kalau MERGE_COMPRESSION_LEVEL > 0)
+    size_before: int   # ukuran output PdfMerger sebelum optimasi
+
+
+# -------------------- Dijalankan di proses anak --------------------
+def _on_alarm(signum, frame):
+    raise MergeTimeout("PDF merge took too long")
+
+
+def merge_pdfs(files: list, max_pages: int = 0, timeout: float = 0, compression_level: int = 0) -> MergeResult:
+    """Gabungkan PDF (bytes) sesuai urutan; file kosong dilewati."""
+    alarm = timeout and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        readers = [PdfReader(BytesIO(data)) for data in files if data]
+        pages = sum(len(reader.pages) for reader in readers)
+        if max_pages and pages > max_pages:
+            raise MergeTooLarge(f"Input has {pages} pages, maximum is {max_pages}")
+        merger = PdfMerger()
+        for reader in readers:
+            merger.append(reader)
+        output = BytesIO()
+        merger.write(output)
+        merger.close()
+        data = output.getvalue()
+        if not compression_level:
+            return MergeResult(data, len(data))
+        try:
+            optimized, _ = optimize_pdf(data, compression_level)
+        except MergeTimeout:
+            raise
+        except Exception as e:
+            # optimasi hanya bonus; PDF hasil merge tetap valid
+            print(f"⚠️ PDF optimize failed, storing unoptimized output: {e}")
+            return MergeResult(data, len(data))
+        return MergeResult(min(optimized, data, key=len), len(data))
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# -------------------- Dijalankan di proses web --------------------
+class MergeEngine:
+    def __init__(self, workers: int, queue_size: int, timeout: float, max_pages: int, compression_level: int = 0):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.compression_level = compression_level
+        self.slots = max(workers, 1) + queue_size
+        self._slots = threading.BoundedSemaphore(self.slots)
+        # task hanya dikirim ke pool kalau ada proses anak kosong
+        self._free_workers = threading.BoundedSemaphore(max(workers, 1))
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _restart_pool(self, pool: ProcessPoolExecutor):
+        """Matikan proses anak yang macet; task lain di pool yang sama ikut gagal."""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self.restarts += 1
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def merge(self, files: list, wait: float = 0) -> MergeResult:
+        """
+        Merge di process pool. `wait` = detik menunggu slot kosong sebelum MergeBusy
+        (worker antrian boleh menunggu, request HTTP sebaiknya tidak).
+        """
+        acquired = self._slots.acquire(timeout=wait) if wait else self._slots.acquire(blocking=False)
+        if not acquired:
+            self._count("rejected")
+            raise MergeBusy()
+        self._count("active")
+        release = True
+        try:
+            if self.workers <= 0:
+                result = self._merge_inline(files)
+            else:
+                result = self._merge_in_pool(files)
+            self._count("completed")
+            self._count("bytes_before", result.size_before)
+            self._count("bytes_after", len(result.data))
+            return result
+        except MergeTimeout as e:
+            # merge inline yang ditinggal: slot dilepas thread-nya sendiri setelah selesai
+            release = not getattr(e, "abandoned", False)
+            raise
+        finally:
+            if release:
+                self._count("active", -1)
+                self._slots.release()
+
+    def _merge_inline(self, files: list) -> MergeResult:
+        if not self.timeout or threading.current_thread() is threading.main_thread():
+            # SIGALRM di merge_pdfs hanya bisa dipakai di main thread
+            return merge_pdfs(files, self.max_pages, self.timeout, self.compression_level)
+        state = {}
+        lock = threading.Lock()
+
+        def run():
+            try:
+                state["result"] = merge_pdfs(files, self.max_pages, 0, self.compression_level)
+            except BaseException as e:
+                state["error"] = e
+            finally:
+                with lock:
+                    state["done"] = True
+                    abandoned = state.get("abandoned")
+                if abandoned:
+                    self._count("active", -1)
+                    self._slots.release()
+
+        thread = threading.Thread(target=run, name="merge-inline", daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        with lock:
+            if not state.get("done"):
+                state["abandoned"] = True
+        if state.get("abandoned"):
+            self._count("timeouts")
+            error = MergeTimeout("PDF merge took too long")
+            error.abandoned = True
+            raise error
+        if "error" in state:
+            raise state["error"]
+        return state["result"]
+
+    def _merge_in_pool(self, files: list) -> MergeResult:
+        # tunggu proses anak kosong dulu, jadi timeout di bawah tidak termasuk waktu antri
+        self._free_workers.acquire()
+        try:
+            return self._run_in_pool(files)
+        finally:
+            self._free_workers.release()
+
+    def _run_in_pool(self, files: list) -> MergeResult:
+        pool = self._get_pool()
+        # anak dihentikan sendiri oleh alarm; sisa waktu untuk kirim data
+        future = pool.submit(merge_pdfs, files, self.max_pages, self.timeout, self.compression_level)
+        try:
+            return future.result(timeout=self.timeout * 2 if self.timeout else None)
+        except FutureTimeout:
+            self._count("timeouts")
+            self._restart_pool(pool)
+            raise MergeTimeout("PDF merge took too long")
+        except MergeTimeout:
+            self._count("timeouts")
+            raise
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            raise MergeError("PDF merge worker crashed")
+
+    def _count(self, name: str, delta: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def snapshot(self) -> dict:
+        return {
+            "workers": self.workers, "slots": self.slots, "active": self.active,
+            "completed": self.completed, "rejected": self.rejected,
+            "timeouts": self.timeouts, "restarts": self.restarts,
+            "compression_level": self.compression_level,
+            "bytes_before": self.bytes_before, "bytes_after": self.bytes_after,
+        }
+
+
+_engine: Optional[MergeEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> MergeEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = MergeEngine(
+                settings.MERGE_WORKERS, settings.MERGE_QUEUE, settings.MERGE_TIMEOUT, settings.MERGE_MAX_PAGES,
+                settings.MERGE_COMPRESSION_LEVEL,
+            )
+        return _engine
+
+
+def merge(files: list, wait: float = 0) -> MergeResult:
+    return get_engine().merge(files, wait)
+
+
+def shutdown():
+    global _engine
+    with _engine_lock:
+        engine, _engine = _engine, None
+    if engine is not None:
+        engine.shutdown()
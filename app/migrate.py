@@ -0,0 +1,42 @@
+"""
+CLI migrasi schema.
+
+    python -m app.migrate upgrade          # jalankan semua revisi yang belum ada
+    python -m app.migrate upgrade --to 2   # berhenti di revisi 2
+    python -m app.migrate current          # revisi yang sedang terpasang
+    python -m app.migrate history          # daftar semua revisi
+"""
+import argparse
+import sys
+
+from .database import engine
+from . import migrations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.migrate", description="Schema migrations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    up = sub.add_parser("upgrade", help="apply pending migrations")
+    up.add_argument("--to", type=int, default=None, help="target revision (default: head)")
+    sub.add_parser("current", help="show applied revision")
+    sub.add_parser("history", help="list known revisions")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        done = migrations.upgrade(engine, target=args.to)
+        if not done:
+            print("Database already up to date.")
+        print(f"Current revision: {migrations.current_revision(engine)}")
+    elif args.command == "current":
+        print(f"Current revision: {migrations.current_revision(engine)} (head: {migrations.head_revision()})")
+    elif args.command == "history":
+        with engine.connect() as conn:
+            applied = migrations.applied_revisions(conn)
+        for module in migrations.load_revisions():
+            mark = "x" if module.revision in applied else " "
+            print(f"[{mark}] {module.revision:04d}  {module.description}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
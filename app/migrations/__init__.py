@@ -0,0 +1,133 @@
+"""
+Migrasi schema berversi.
+
+Setiap file `vNNNN_nama.py` di folder ini adalah satu revisi dengan atribut
+`revision` (int), `description` (str) dan fungsi `upgrade(conn)`. Revisi yang
+sudah dijalankan dicatat di tabel T_SchemaVersion, jadi `upgrade` hanya
+menjalankan revisi yang belum tercatat, berurutan, masing-masing dalam
+transaksinya sendiri.
+
+Revisi dengan `transactional = False` dijalankan dalam mode autocommit, untuk DDL
+yang tidak boleh ada di dalam transaksi (mis. full-text index SQL Server). Revisi
+seperti itu harus idempoten karena bisa gagal di tengah jalan.
+
+Jalankan lewat CLI:  python -m app.migrate upgrade
+"""
+from datetime import datetime
+import importlib
+import pkgutil
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+
+_version_metadata = MetaData()
+
+schema_version = Table(
+    "T_SchemaVersion",
+    _version_metadata,
+    Column("Version", Integer, primary_key=True, autoincrement=False),
+    Column("Description", String(200), nullable=False),
+    Column("AppliedAt", DateTime, nullable=False),
+)
+
+
+def load_revisions():
+    revisions = []
+    for info in pkgutil.iter_modules(__path__):
+        if not info.name.startswith("v"):
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        revisions.append(module)
+    revisions.sort(key=lambda m: m.revision)
+    numbers = [m.revision for m in revisions]
+    if len(numbers) != len(set(numbers)):
+        raise RuntimeError(f"Nomor revisi migrasi duplikat: {numbers}")
+    return revisions
+
+
+def applied_revisions(conn) -> set:
+    if not inspect(conn).has_table(schema_version.name):
+        return set()
+    return set(conn.execute(select(schema_version.c.Version)).scalars())
+
+
+def current_revision(engine) -> int:
+    with engine.connect() as conn:
+        applied = applied_revisions(conn)
+    return max(applied) if applied else 0
+
+
+def head_revision() -> int:
+    revisions = load_revisions()
+    return revisions[-1].revision if revisions else 0
+
+
+def pending_revisions(engine, target: int = None):
+    with engine.connect() as conn:
+        applied = applied_revisions(conn)
+    return [
+        m for m in load_revisions()
+        if m.revision not in applied and (target is None or m.revision <= target)
+    ]
+
+
+def upgrade(engine, target: int = None, echo=print) -> list:
+    """Jalankan semua revisi yang belum diterapkan (sampai target kalau diisi)."""
+    with engine.begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+
+    done = []
+    for module in pending_revisions(engine, target):
+        echo(f"Applying migration {module.revision:04d}: {module.description}")
+        if not getattr(module, "transactional", True):
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                module.upgrade(conn)
+        with engine.begin() as conn:
+            if getattr(module, "transactional", True):
+                module.upgrade(conn)
+            conn.execute(schema_version.insert().values(
+                Version=module.revision,
+                Description=module.description[:200],
+                AppliedAt=datetime.utcnow(),
+            ))
+        done.append(module.revision)
+    return done
+
+
+# -------------------- Helper untuk file revisi --------------------
+def has_table(conn, table_name: str) -> bool:
+    return inspect(conn).has_table(table_name)
+
+
+def has_column(conn, table_name: str, column_name: str) -> bool:
+    return any(c["name"].lower() == column_name.lower() for c in inspect(conn).get_columns(table_name))
+
+
+def has_index(conn, table_name: str, index_name: str) -> bool:
+    return any(i["name"] == index_name for i in inspect(conn).get_indexes(table_name))
+
+
+def create_index(conn, index):
+    if not has_index(conn, index.table.name, index.name):
+        index.create(conn)
+
+
+def drop_index(conn, table_name: str, index_name: str):
+    if not has_index(conn, table_name, index_name):
+        return
+    preparer = conn.dialect.identifier_preparer
+    if conn.dialect.name == "mssql":
+        conn.exec_driver_sql(f"DROP INDEX {preparer.quote(index_name)} ON {preparer.quote(table_name)}")
+    else:
+        conn.exec_driver_sql(f"DROP INDEX {preparer.quote(index_name)}")
+
+
+def add_column(conn, table_name: str, column: Column):
+    """ALTER TABLE ... ADD kolom kalau belum ada (tabel baru dari revisi 1 bisa sudah punya)."""
+    if has_column(conn, table_name, column.name):
+        return
+    col_type = column.type.compile(dialect=conn.dialect)
+    nullable = "" if column.nullable else " NOT NULL"
+    preparer = conn.dialect.identifier_preparer
+    conn.exec_driver_sql(
+        f"ALTER TABLE {preparer.quote(table_name)} ADD {preparer.quote(column.name)} {col_type}{nullable}"
+    )
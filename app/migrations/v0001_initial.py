@@ -0,0 +1,17 @@
+"""Tabel awal aplikasi (pengganti create_all saat import)."""
+from app import models
+
+revision = 1
+description = "Initial schema: T_user, TM_Operator, T_CertificationRecord, T_EvaluationDocument, T_PDFOPT"
+
+TABLES = [
+    models.User.__table__,
+    models.TMOperator.__table__,
+    models.CertificationRecord.__table__,
+    models.EvaluationDocument.__table__,
+    models.PDFOPT.__table__,
+]
+
+
+def upgrade(conn):
+    models.Base.metadata.create_all(bind=conn, tables=TABLES, checkfirst=True)
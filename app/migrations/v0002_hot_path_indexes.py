@@ -0,0 +1,24 @@
+"""Index komposit untuk query yang paling sering dijalankan."""
+from sqlalchemy import Column, Index, MetaData, String, Table
+
+from app import models
+from app.migrations import create_index
+
+revision = 2
+description = "Hot-path indexes: latest certification/evaluation/PDF per NIK, operator name, login name"
+
+
+# IX_Operator_Name diganti (Name, NIK) di revisi 4, jadi definisinya disimpan di sini
+_operator = Table("TM_Operator", MetaData(), Column("Name", String(50)))
+
+
+def _index(table, name):
+    return next(ix for ix in table.indexes if ix.name == name)
+
+
+def upgrade(conn):
+    create_index(conn, _index(models.CertificationRecord.__table__, "IX_CertificationRecord_NIK_CreatedAt"))
+    create_index(conn, _index(models.EvaluationDocument.__table__, "IX_EvaluationDocument_NIK_UploadDate"))
+    create_index(conn, _index(models.PDFOPT.__table__, "IX_PDFOPT_NIK_CreatedAt"))
+    create_index(conn, Index("IX_Operator_Name", _operator.c.Name))
+    create_index(conn, _index(models.User.__table__, "IX_user_name"))
@@ -0,0 +1,21 @@
+"""T_Blob + kolom hash untuk file PDF yang dipindah ke blob store."""
+from sqlalchemy import Column, String
+
+from app import models
+from app.migrations import add_column
+
+revision = 3
+description = "Content-addressed blob store: T_Blob and *SHA256 columns"
+
+HASH_COLUMNS = {
+    "T_CertificationRecord": ["FileSolderingSHA256", "FileScrewingSHA256", "FileMSASHA256"],
+    "T_EvaluationDocument": ["OpTrainEvalSHA256", "OpSkillsEvalSHA256", "TrainEvalSHA256"],
+    "T_PDFOPT": ["MergedPDFSHA256"],
+}
+
+
+def upgrade(conn):
+    models.Blob.__table__.create(conn, checkfirst=True)
+    for table_name, columns in HASH_COLUMNS.items():
+        for name in columns:
+            add_column(conn, table_name, Column(name, String(64), nullable=True))
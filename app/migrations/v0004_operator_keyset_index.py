@@ -0,0 +1,12 @@
+"""Index (Name, NIK) untuk keyset pagination daftar operator."""
+from app import models
+from app.migrations import create_index, drop_index
+
+revision = 4
+description = "TM_Operator (Name, NIK) index for keyset pagination, replaces IX_Operator_Name"
+
+
+def upgrade(conn):
+    index = next(ix for ix in models.TMOperator.__table__.indexes if ix.name == "IX_Operator_Name_NIK")
+    create_index(conn, index)
+    drop_index(conn, "TM_Operator", "IX_Operator_Name")
@@ -0,0 +1,69 @@
+"""
+Full-text search nama operator.
+
+- SQLite : tabel virtual FTS5 TM_Operator_FTS (external content) + trigger sinkronisasi
+- SQL Server : full-text catalog + full-text index di TM_Operator(Name), hanya kalau
+  fitur Full-Text Search terpasang; kalau tidak, pencarian tetap lewat LIKE
+"""
+revision = 5
+description = "Full-text search on TM_Operator (FTS5 on SQLite, full-text index on SQL Server)"
+# CREATE FULLTEXT CATALOG/INDEX tidak boleh di dalam transaksi
+transactional = False
+
+FTS_TABLE = "TM_Operator_FTS"
+FULLTEXT_CATALOG = "IAB_FullTextCatalog"
+
+SQLITE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        NIK, Name,
+        content='TM_Operator', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON TM_Operator BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, NIK, Name) VALUES (new.rowid, new.NIK, new.Name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON TM_Operator BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, NIK, Name) VALUES ('delete', old.rowid, old.NIK, old.Name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF NIK, Name ON TM_Operator BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, NIK, Name) VALUES ('delete', old.rowid, old.NIK, old.Name);
+        INSERT INTO {FTS_TABLE}(rowid, NIK, Name) VALUES (new.rowid, new.NIK, new.Name);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def _upgrade_sqlite(conn):
+    # semua statement idempoten, jadi aman diulang kalau sempat gagal di tengah
+    for statement in SQLITE_STATEMENTS:
+        conn.exec_driver_sql(statement)
+
+
+def _upgrade_mssql(conn):
+    installed = conn.exec_driver_sql("SELECT FULLTEXTSERVICEPROPERTY('IsFullTextInstalled')").scalar()
+    if not installed:
+        print("⚠️ SQL Server Full-Text Search tidak terpasang; pencarian operator tetap memakai LIKE")
+        return
+    if not conn.exec_driver_sql(
+        "SELECT 1 FROM sys.fulltext_catalogs WHERE name = ?", (FULLTEXT_CATALOG,)
+    ).scalar():
+        conn.exec_driver_sql(f"CREATE FULLTEXT CATALOG [{FULLTEXT_CATALOG}]")
+    if conn.exec_driver_sql(
+        "SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('TM_Operator')"
+    ).scalar():
+        return
+    # full-text index butuh KEY INDEX unik satu kolom: primary key NIK
+    key_index = conn.exec_driver_sql(
+        "SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID('TM_Operator') AND is_primary_key = 1"
+    ).scalar()
+    conn.exec_driver_sql(
+        f"CREATE FULLTEXT INDEX ON [TM_Operator] ([Name]) KEY INDEX [{key_index}] "
+        f"ON [{FULLTEXT_CATALOG}] WITH CHANGE_TRACKING AUTO"
+    )
+
+
+def upgrade(conn):
+    if conn.dialect.name == "sqlite":
+        _upgrade_sqlite(conn)
+    elif conn.dialect.name == "mssql":
+        _upgrade_mssql(conn)
@@ -0,0 +1,10 @@
+"""T_MergeJob: antrian job save+merge yang diproses `python -m app.worker`."""
+from app import models
+
+revision = 6
+description = "Durable save+merge job queue: T_MergeJob"
+
+
+def upgrade(conn):
+    # index IX_MergeJob_* ikut dibuat bersama tabel
+    models.MergeJob.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,10 @@
+"""T_DossierCache: merged dossier yang dibuat saat pertama diunduh (DOSSIER_MODE=lazy)."""
+from app import models
+
+revision = 7
+description = "Merged dossier cache keyed by input hashes: T_DossierCache"
+
+
+def upgrade(conn):
+    # index IX_DossierCache_* ikut dibuat bersama tabel
+    models.DossierCache.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,15 @@
+"""Metadata PDF di T_Blob (versi PDF, producer) + index untuk listing upload terbaru."""
+from sqlalchemy import Column, String
+
+from app import models
+from app.migrations import add_column, create_index
+
+revision = 8
+description = "PDF metadata on T_Blob: PdfVersion, Producer, IX_Blob_CreatedAt"
+
+
+def upgrade(conn):
+    add_column(conn, "T_Blob", Column("PdfVersion", String(10), nullable=True))
+    add_column(conn, "T_Blob", Column("Producer", String(200), nullable=True))
+    index = next(ix for ix in models.Blob.__table__.indexes if ix.name == "IX_Blob_CreatedAt")
+    create_index(conn, index)
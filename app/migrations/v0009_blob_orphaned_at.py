@@ -0,0 +1,14 @@
+"""Tanda blob tanpa referensi (T_Blob.OrphanedAt) untuk penghapusan tertunda, lihat app/dossier.py."""
+from sqlalchemy import Column, DateTime
+
+from app import models
+from app.migrations import add_column, create_index
+
+revision = 9
+description = "T_Blob.OrphanedAt + IX_Blob_OrphanedAt for delayed blob deletion"
+
+
+def upgrade(conn):
+    add_column(conn, "T_Blob", Column("OrphanedAt", DateTime, nullable=True))
+    index = next(ix for ix in models.Blob.__table__.indexes if ix.name == "IX_Blob_OrphanedAt")
+    create_index(conn, index)
@@ -0,0 +1,9 @@
+"""T_WorkerHeartbeat: worker save+merge yang hidup, supaya request tahu ada yang memproses antrian."""
+from app import models
+
+revision = 10
+description = "Save+merge worker liveness: T_WorkerHeartbeat"
+
+
+def upgrade(conn):
+    models.WorkerHeartbeat.__table__.create(conn, checkfirst=True)
@@ -1,13 +1,23 @@
-from sqlalchemy import Column, String, Integer, Date, Numeric, DateTime, LargeBinary, ForeignKey
+from sqlalchemy import Column, String, Integer, BigInteger, Date, Numeric, DateTime, LargeBinary, ForeignKey, Index
 from sqlalchemy import func
 from datetime import datetime
 from .database import Base
 from pydantic import BaseModel, Field
 from sqlalchemy import Column, Text
 from sqlalchemy.dialects.mssql import CHAR
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred, column_property
 from typing import Optional
 
+# Grup kolom blob yang di-defer. Query biasa hanya mengambil kolom skalar;
+# endpoint yang memang mengembalikan blob memakai undefer_group(...).
+PHOTO_GROUP = "photo"
+FILES_GROUP = "files"
+
+
+def file_length(prop):
+    """Panjang kolom file lama (0 kalau kosong), dihitung di database tanpa memuat isinya."""
+    return column_property(func.coalesce(func.length(prop.columns[0]), 0))
+
 class User(Base):
     __tablename__ = "T_user"
 
@@ -32,7 +42,7 @@ class TMOperator(Base):
     contract_status = Column("ContractStatus", String(10))
     end_contract_date = Column("EndContractDate", Date)
     level = Column("Level", String(50))
-    photo = Column("Photo", LargeBinary)  # image column
+    photo = deferred(Column("Photo", LargeBinary), group=PHOTO_GROUP)  # image column
 
 class CertificationRecord(Base):
     __tablename__ = "T_CertificationRecord"
@@ -78,9 +88,18 @@ class CertificationRecord(Base):
     msa_traindate = Column("MSATrainDate", Date, nullable=False)
     msa_expdate = Column("MSAExpDate", Date, nullable=False)
     
-    file_soldering = Column("FileSoldering", Text, nullable=False)
-    file_screwing = Column("FileScrewing", Text, nullable=False)
-    file_msa = Column("FileMSA", Text, nullable=False)
+    file_soldering = deferred(Column("FileSoldering", Text, nullable=False), group=FILES_GROUP)
+    file_screwing = deferred(Column("FileScrewing", Text, nullable=False), group=FILES_GROUP)
+    file_msa = deferred(Column("FileMSA", Text, nullable=False), group=FILES_GROUP)
+    # untuk documents.has_document: ada/tidaknya file tanpa menarik base64
+    file_soldering_length = file_length(file_soldering)
+    file_screwing_length = file_length(file_screwing)
+    file_msa_length = file_length(file_msa)
+
+    # SHA-256 file di blob store; kolom File* lama dikosongkan setelah backfill
+    file_soldering_sha256 = Column("FileSolderingSHA256", String(64))
+    file_screwing_sha256 = Column("FileScrewingSHA256", String(64))
+    file_msa_sha256 = Column("FileMSASHA256", String(64))
     
     status = Column("Status", String(20), nullable=False)
 
@@ -92,14 +111,95 @@ class EvaluationDocument(Base):
     id = Column("ID", Integer, primary_key=True, autoincrement=True, index=True)
     nik = Column("NIK", CHAR(8), ForeignKey("TM_Operator.NIK"), nullable=False)
     upload_date = Column("UploadDate", Date, nullable=False, default=datetime.utcnow)
-    op_train_eval = Column("OpTrainEval", Text, nullable=False)
-    op_skills_eval = Column("OpSkillsEval", Text, nullable=False)
-    train_eval = Column("TrainEval", Text, nullable=False)
+    op_train_eval = deferred(Column("OpTrainEval", Text, nullable=False), group=FILES_GROUP)
+    op_skills_eval = deferred(Column("OpSkillsEval", Text, nullable=False), group=FILES_GROUP)
+    train_eval = deferred(Column("TrainEval", Text, nullable=False), group=FILES_GROUP)
+    op_train_eval_length = file_length(op_train_eval)
+    op_skills_eval_length = file_length(op_skills_eval)
+    train_eval_length = file_length(train_eval)
+
+    op_train_eval_sha256 = Column("OpTrainEvalSHA256", String(64))
+    op_skills_eval_sha256 = Column("OpSkillsEvalSHA256", String(64))
+    train_eval_sha256 = Column("TrainEvalSHA256", String(64))
 
 class PDFOPT(Base):
     __tablename__ = "T_PDFOPT"
 
     id = Column("Id", Integer, primary_key=True, index=True)
     nik = Column("NIK", String(8), index=True, nullable=False)
-    merged_pdf = Column("MergedPDF", Text, nullable=False)
+    merged_pdf = deferred(Column("MergedPDF", Text, nullable=False), group=FILES_GROUP)
+    merged_pdf_length = file_length(merged_pdf)
+    merged_pdf_sha256 = Column("MergedPDFSHA256", String(64))
     created_at = Column("CreatedAt", DateTime, server_default=func.now())
+
+
+class Blob(Base):
+    """Satu baris per isi file unik di blob store (key = SHA-256)."""
+    __tablename__ = "T_Blob"
+
+    sha256 = Column("SHA256", String(64), primary_key=True)
+    size = Column("Size", BigInteger, nullable=False)
+    page_count = Column("PageCount", Integer)
+    content_type = Column("ContentType", String(100), nullable=False, default="application/pdf")
+    created_at = Column("CreatedAt", DateTime, nullable=False, default=datetime.utcnow)
+    # metadata PDF, diisi saat upload (lihat documents.pdf_metadata)
+    pdf_version = Column("PdfVersion", String(10))
+    producer = Column("Producer", String(200))
+    # diisi saat tidak dipakai lagi (evict cache dossier); file dihapus setelah masa tunggu
+    orphaned_at = Column("OrphanedAt", DateTime)
+
+
+class MergeJob(Base):
+    """Antrian job save+merge; file input sudah ada di blob store (lihat app/jobs.py)."""
+    __tablename__ = "T_MergeJob"
+
+    id = Column("Id", Integer, primary_key=True, autoincrement=True)
+    kind = Column("Kind", String(20), nullable=False, default="savemerge")
+    nik = Column("NIK", String(8), nullable=False)
+    status = Column("Status", String(20), nullable=False, default="queued")  # queued/running/done/failed
+    progress = Column("Progress", Integer, nullable=False, default=0)         # 0-100
+    message = Column("Message", String(200))
+    payload = Column("Payload", Text, nullable=False)   # JSON: attr -> SHA-256 file input
+    result = Column("Result", Text)                     # JSON hasil (eval_id, pdf_id)
+    error = Column("Error", Text)
+    attempts = Column("Attempts", Integer, nullable=False, default=0)
+    worker = Column("Worker", String(100))
+    created_at = Column("CreatedAt", DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column("StartedAt", DateTime)
+    heartbeat_at = Column("HeartbeatAt", DateTime)
+    finished_at = Column("FinishedAt", DateTime)
+
+
+class WorkerHeartbeat(Base):
+    """Satu baris per worker save+merge yang hidup; HeartbeatAt diperbarui tiap beberapa detik (lihat app/jobs.py)."""
+    __tablename__ = "T_WorkerHeartbeat"
+
+    worker = Column("Worker", String(100), primary_key=True)
+    started_at = Column("StartedAt", DateTime, nullable=False, default=datetime.utcnow)
+    heartbeat_at = Column("HeartbeatAt", DateTime, nullable=False, default=datetime.utcnow)
+
+
+class DossierCache(Base):
+    """Merged dossier yang sudah pernah dibuat, key = hash dari SHA-256 keenam file input (lihat app/dossier.py)."""
+    __tablename__ = "T_DossierCache"
+
+    input_key = Column("InputKey", String(64), primary_key=True)
+    nik = Column("NIK", String(8), nullable=False)
+    merged_sha256 = Column("MergedSHA256", String(64), nullable=False)
+    size = Column("Size", BigInteger, nullable=False)
+    created_at = Column("CreatedAt", DateTime, nullable=False, default=datetime.utcnow)
+    last_access_at = Column("LastAccessAt", DateTime, nullable=False, default=datetime.utcnow)
+
+
+# -------------------- Index (dibuat lewat app/migrations) --------------------
+Index("IX_user_name", User.name)
+Index("IX_Operator_Name_NIK", TMOperator.name, TMOperator.nik)
+Index("IX_CertificationRecord_NIK_CreatedAt", CertificationRecord.nik, CertificationRecord.created_at.desc())
+Index("IX_EvaluationDocument_NIK_UploadDate", EvaluationDocument.nik, EvaluationDocument.upload_date.desc())
+Index("IX_PDFOPT_NIK_CreatedAt", PDFOPT.nik, PDFOPT.created_at)
+Index("IX_MergeJob_Status_Id", MergeJob.status, MergeJob.id)
+Index("IX_MergeJob_NIK", MergeJob.nik)
+Index("IX_DossierCache_LastAccessAt", DossierCache.last_access_at)
+Index("IX_DossierCache_MergedSHA256", DossierCache.merged_sha256)
+Index("IX_Blob_CreatedAt", Blob.created_at)
+Index("IX_Blob_OrphanedAt", Blob.orphaned_at)
@@ -0,0 +1,666 @@
+"""
+Index pencarian operator (NIK + Name) di memori proses.
+
+Search popup DataTables memakai `ILIKE '%q%'` yang tidak bisa dilayani index B-tree,
+jadi setiap ketikan memindai TM_Operator. Index ini menyimpan n-gram NIK/Name
+sehingga pencarian dengan semantik yang sama (substring, case-insensitive) dijawab
+tanpa ke database:
+
+- query sepanjang gram yang diindeks: posting list-nya langsung jadi hasil
+- query lebih panjang: ambil posting list trigram paling selektif, lalu cek substring
+
+Mode (OPERATOR_INDEX):
+- "full"    : unigram + bigram + trigram, posting list Python, teks lowercase per baris
+- "compact" : trigram saja dalam array('I'), tanpa salinan lowercase; trigram yang
+              terlalu umum (> OPERATOR_INDEX_STOP_RATIO roster) tidak disimpan.
+              Query 1-2 karakter memindai roster di memori
+- "off"     : tidak dipakai, semua pencarian lewat SQL
+
+Index dimuat di background saat startup, diperbarui langsung oleh commit ORM yang
+mengubah TM_Operator, dan dibangun ulang tiap OPERATOR_INDEX_REFRESH detik untuk
+perubahan dari luar aplikasi. Karena TM_Operator diisi sistem HR, sebelum index
+dipakai COUNT(*)/MAX(NIK) dibandingkan dengan saat index dibangun (paling sering tiap
+OPERATOR_INDEX_CHECK detik, lihat check_version); kalau beda, index dianggap basi,
+pencarian lewat SQL dan index langsung dibangun ulang di background. Perubahan nama
+saja tidak terdeteksi cek ini, hanya oleh refresh berkala.
+"""
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict, namedtuple
+from itertools import compress, islice, repeat
+from operator import add, contains, itemgetter
+from typing import Optional
+import heapq
+import re
+import sys
+import threading
+import time
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from . import settings
+from .models import TMOperator
+
+# Panjang gram yang diindeks per mode. Query sepanjang <= gram terpanjang dijawab
+# langsung dari posting list (exact); query lebih panjang dicek substring-nya.
+FULL_GRAMS = (1, 2, 3)
+COMPACT_GRAMS = (3,)
+# Karakter wildcard LIKE; query yang memakainya dilempar ke SQL supaya hasilnya sama
+LIKE_WILDCARDS = ("%", "_")
+SEPARATOR = "\x1f"
+# Hasil query terakhir disimpan; ketikan berikutnya ("bud" -> "budi") cukup menyaring hasil itu
+RECENT_QUERIES = 64
+# Fuzzy: varian hapus-huruf yang disimpan per kata (1 = semua kata tanpa satu huruf)
+FUZZY_INDEX_DELETES = 1
+# Kata yang diketik terakhir juga dicocokkan sebagai prefix (search-as-you-type)
+FUZZY_PREFIX_WORDS = 200
+# Kata query yang cocok ke lebih dari sekian nama tidak diekspansi, cukup dicek di kandidat
+FUZZY_EXPAND_NAMES = 2000
+
+OperatorRow = namedtuple("OperatorRow", ["nik", "name"])
+
+
+def ngrams(text: str, sizes=FULL_GRAMS) -> set:
+    return {text[i:i + n] for n in sizes for i in range(len(text) - n + 1)}
+
+
+def name_words(text: str) -> list:
+    return re.findall(r"\w+", text.lower())
+
+
+def deletes(word: str, distance: int) -> set:
+    """Semua varian word tanpa 1..distance huruf (delete neighbourhood ala SymSpell)."""
+    variants, frontier = set(), {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+def max_edits(word: str) -> int:
+    # kata pendek hanya boleh 1 salah ketik supaya tidak cocok ke mana-mana
+    return 0 if len(word) < 3 else 1 if len(word) < 6 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Damerau-Levenshtein (optimal string alignment), hanya pita |i - j| <= limit.
+    Hasil > limit dilaporkan sebagai limit + 1.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    before, previous = None, [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        for j in range(low, high + 1):
+            cost = a[i - 1] != b[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if cost and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current[low - 1:high + 1]) > limit:
+            return over
+        before, previous = previous, current
+    return min(previous[-1], over)
+
+
+class OperatorSearchIndex:
+    """N-gram index NIK/Name. Thread-safe (satu lock; search hanya butuh mikro/milidetik)."""
+
+    def __init__(self, compact: bool = False, stop_ratio: float = 0.0):
+        self.compact = compact
+        self.sizes = COMPACT_GRAMS if compact else FULL_GRAMS
+        self.stop_ratio = stop_ratio if compact else 0.0
+        self._lock = threading.RLock()
+        self._rows = []         # id -> OperatorRow | None (dihapus)
+        self._texts = []        # id -> "nik<sep>name" lowercase (mode full)
+        self._by_nik = {}       # nik -> id
+        self._postings = {}     # gram -> list/array id (urut naik)
+        self._stop = set()      # gram yang tidak disimpan (mode compact)
+        self._dead = 0
+        self._nik_ordered = False  # id == urutan NIK (benar setelah load, sebelum ada update)
+        self._orders = None     # cache urutan (lihat _ordered)
+        self._recent = OrderedDict()  # query -> id hasil (dibuang setiap ada perubahan)
+        # Fuzzy: kosakata kata-kata nama + varian hapus-huruf, per nama unik
+        self._fuzzy_ids = {}       # nama lowercase -> name id
+        self._fuzzy_names = []     # name id -> nama lowercase
+        self._fuzzy_rows = []      # name id -> [row id]
+        self._vocab = {}           # kata -> word id
+        self._vocab_words = []     # word id -> kata
+        self._word_names = []      # word id -> [name id]
+        self._deletes = {}         # kata tanpa satu huruf -> [word id]
+        self._vocab_sorted = []    # kosakata terurut untuk pencocokan prefix
+        self.loaded_at = None
+        self.version = None        # (COUNT(*), MAX(NIK)) TM_Operator saat dibangun
+        self.stale = False         # True = database sudah berubah, tunggu refresh
+
+    # -------------------- Build / Update --------------------
+    def load(self, rows):
+        """Bangun ulang dari iterable (nik, name)."""
+        with self._lock:
+            # id dibagikan urut NIK, jadi posting list sudah terurut NIK
+            self._rows = [OperatorRow(nik, name or "") for nik, name in sorted(rows, key=lambda r: r[0])]
+            self._by_nik = {row.nik: row_id for row_id, row in enumerate(self._rows)}
+            self._texts = [] if self.compact else [self._text(row) for row in self._rows]
+            self._stop, self._dead, self._orders = set(), 0, None
+            self._recent.clear()
+            self._fuzzy_ids, self._fuzzy_names, self._fuzzy_rows = {}, [], []
+            self._vocab, self._vocab_words, self._word_names = {}, [], []
+            self._deletes = {}
+
+            postings = defaultdict(list)
+            name_grams = {}  # nama yang sama (umum di roster) cukup dipecah sekali
+            for row_id, row in enumerate(self._rows):
+                grams = name_grams.get(row.name)
+                if grams is None:
+                    grams = name_grams[row.name] = ngrams(row.name.lower(), self.sizes)
+                for gram in grams.union(ngrams(row.nik.lower(), self.sizes)):
+                    postings[gram].append(row_id)
+                self._fuzzy_rows[self._fuzzy_name_id(row.name)].append(row_id)
+            self._postings = dict(postings)
+            if self.compact:
+                self._drop_stop_grams()
+                self._postings = {g: array("I", ids) for g, ids in self._postings.items()}
+                self._word_names = [array("I", ids) for ids in self._word_names]
+            self._vocab_sorted = sorted(self._vocab)
+            self._nik_ordered = True
+            self.loaded_at = time.time()
+        return self
+
+    def _append(self, nik: str, name: str):
+        row_id = len(self._rows)
+        row = OperatorRow(nik, name or "")
+        self._rows.append(row)
+        self._by_nik[nik] = row_id
+        if not self.compact:
+            self._texts.append(self._text(row))
+        # NIK dan Name dipecah terpisah; query tidak pernah melintasi pemisah
+        for gram in ngrams(row.nik.lower(), self.sizes) | ngrams(row.name.lower(), self.sizes):
+            if gram in self._stop:
+                continue
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = []
+            postings.append(row_id)
+        self._fuzzy_rows[self._fuzzy_name_id(row.name)].append(row_id)
+
+    def _fuzzy_name_id(self, name: str) -> int:
+        key = name.lower()
+        name_id = self._fuzzy_ids.get(key)
+        if name_id is None:
+            name_id = self._fuzzy_ids[key] = len(self._fuzzy_names)
+            self._fuzzy_names.append(key)
+            self._fuzzy_rows.append([])
+            for word in set(name_words(key)):
+                self._word_names[self._word_id(word)].append(name_id)
+        return name_id
+
+    def _word_id(self, word: str) -> int:
+        word_id = self._vocab.get(word)
+        if word_id is None:
+            word_id = self._vocab[word] = len(self._vocab_words)
+            self._vocab_words.append(word)
+            self._word_names.append([])
+            if self.loaded_at is not None:
+                insort(self._vocab_sorted, word)
+            for variant in deletes(word, FUZZY_INDEX_DELETES):
+                ids = self._deletes.get(variant)
+                if ids is None:
+                    self._deletes[variant] = [word_id]
+                else:
+                    ids.append(word_id)
+        return word_id
+
+    def _drop_stop_grams(self):
+        if not self.stop_ratio:
+            return
+        limit = max(1, int(len(self._rows) * self.stop_ratio))
+        self._stop = {g for g, ids in self._postings.items() if len(ids) > limit}
+        for gram in self._stop:
+            del self._postings[gram]
+
+    @staticmethod
+    def _text(row) -> str:
+        return f"{row.nik}{SEPARATOR}{row.name}".lower()
+
+    def upsert(self, nik: str, name: str):
+        with self._lock:
+            row_id = self._by_nik.get(nik)
+            if row_id is not None and self._rows[row_id].name == name:
+                return
+            self._remove(nik)
+            self._append(nik, name)
+            self._nik_ordered = False
+            self._changed()
+
+    def remove(self, nik: str):
+        with self._lock:
+            if self._remove(nik):
+                self._changed()
+
+    def _remove(self, nik: str) -> bool:
+        row_id = self._by_nik.pop(nik, None)
+        if row_id is None:
+            return False
+        # posting list lama dibiarkan; id mati disaring saat search
+        self._rows[row_id] = None
+        if not self.compact:
+            self._texts[row_id] = ""
+        self._dead += 1
+        return True
+
+    def _changed(self):
+        self._orders = None
+        self._recent.clear()
+        if self._dead > 1000 and self._dead > len(self._rows) // 5:
+            self.load([(r.nik, r.name) for r in self._rows if r is not None])
+
+    # -------------------- Search --------------------
+    @staticmethod
+    def can_serve(query: str) -> bool:
+        return not any(w in query for w in LIKE_WILDCARDS) and SEPARATOR not in query
+
+    def __len__(self):
+        return len(self._by_nik)
+
+    def _ordered(self, order_col: int):
+        """(urutan id, rank per id) untuk kolom sort; dihitung ulang setelah ada perubahan."""
+        orders = self._orders
+        if orders is None:
+            rows = self._rows
+            alive = [i for i, r in enumerate(rows) if r is not None]
+            by_nik = alive if self._nik_ordered else sorted(alive, key=lambda i: rows[i].nik)
+            # Name case-insensitive seperti collation default SQL Server (CI_AS)
+            by_name = sorted(alive, key=lambda i: (rows[i].name.lower(), rows[i].nik))
+            orders = []
+            for order in (by_nik, by_name):
+                rank = array("I", bytes(4 * len(rows)))
+                for pos, row_id in enumerate(order):
+                    rank[row_id] = pos
+                orders.append((order, rank))
+            self._orders = orders
+        return orders[1 if order_col == 1 else 0]
+
+    def _verify(self, candidates, query: str) -> list:
+        """Saring id yang teksnya benar-benar mengandung query."""
+        if self.compact:
+            rows, text = self._rows, self._text
+            return [i for i in candidates if rows[i] is not None and query in text(rows[i])]
+        # teks baris yang dihapus dikosongkan, jadi tidak perlu cek _rows
+        texts = map(self._texts.__getitem__, candidates)
+        return list(compress(candidates, map(contains, texts, repeat(query))))
+
+    def _matches(self, query: str):
+        """Id baris yang mengandung query, urut naik."""
+        rows = self._rows
+        postings = self._postings.get(query)
+        if postings is not None or (len(query) in self.sizes and query not in self._stop):
+            # query = satu gram yang diindeks: posting list sudah jawaban pasti
+            if postings is None:
+                return ()
+            return [i for i in postings if rows[i] is not None] if self._dead else postings
+
+        matches = self._recent.get(query)
+        if matches is not None:
+            self._recent.move_to_end(query)
+            return matches
+
+        grams = [g for g in ngrams(query, self.sizes[-1:]) if g not in self._stop]
+        if grams:
+            candidates = min((self._postings.get(g, ()) for g in grams), key=len)
+        else:
+            # query pendek, atau semua gram terlalu umum: scan seluruh roster
+            candidates = range(len(rows))
+        for previous, ids in self._recent.items():
+            if previous in query and len(ids) < len(candidates):
+                candidates = ids
+        matches = self._verify(candidates, query)
+
+        self._recent[query] = matches
+        if len(self._recent) > RECENT_QUERIES:
+            self._recent.popitem(last=False)
+        return matches
+
+    def _walk(self, order, query: str, need: int, descending: bool, budget: int):
+        """`need` id pertama di urutan sort yang cocok, atau None kalau budget langkah habis."""
+        ids = []
+        if self.compact:
+            rows, text = self._rows, self._text
+            matches = lambda i: query in text(rows[i])
+        else:
+            texts = self._texts
+            matches = lambda i: query in texts[i]
+        for step, row_id in enumerate(reversed(order) if descending else order):
+            if step >= budget:
+                return None
+            if matches(row_id):
+                ids.append(row_id)
+                if len(ids) >= need:
+                    break
+        return ids
+
+    def search(self, query: str = "", start: int = 0, length: int = 10, order_col: int = 0, order_dir: str = "asc"):
+        """Return (total, filtered, rows) dengan semantik sama seperti ILIKE '%query%' di NIK/Name."""
+        with self._lock:
+            order, rank = self._ordered(order_col)
+            descending = order_dir == "desc"
+            total = len(order)
+            query = query.lower()
+            matches = self._matches(query) if query else order
+            found = len(matches)
+            need = start + length
+
+            if matches is order or (order_col != 1 and self._nik_ordered):
+                # sudah urut sesuai kolom sort
+                if descending:
+                    ids = matches[max(found - need, 0):max(found - start, 0)][::-1]
+                else:
+                    ids = matches[start:need]
+            else:
+                ids = None
+                if found * found > need * total:
+                    # hasil padat: coba jalan di urutan sort; kalau gagal dalam budget
+                    # (nama mirip berkumpul di urutan Name) baru urutkan semua hasil
+                    ids = self._walk(order, query, need, descending, max(4 * need * total // found, found // 8))
+                if ids is None:
+                    # urutkan hasilnya saja lewat rank (rank -> id = order[rank])
+                    pick = heapq.nlargest if descending else heapq.nsmallest
+                    ids = [order[r] for r in pick(need, map(rank.__getitem__, matches))]
+                ids = ids[start:]
+            return total, found, [self._rows[i] for i in ids]
+
+    def _similar_words(self, word: str, prefix: bool, deadline: float) -> dict:
+        """word id -> skor 0..1 untuk kata kosakata yang berjarak edit <= max_edits(word)."""
+        limit = max_edits(word)
+        # Pasangan (hapusan di query, hapusan di kosakata) yang dicari: (0|1, 0|1) dan
+        # (2, 0). Mencakup semua salah ketik tunggal dan sebagian besar yang ganda.
+        candidates, vocab, indexed = set(), self._vocab, self._deletes
+        for variant in deletes(word, min(limit, 1)) | {word}:
+            if variant in vocab:
+                candidates.add(vocab[variant])
+            candidates.update(indexed.get(variant, ()))
+        if limit >= 2:
+            candidates.update(vocab[v] for v in deletes(word, 2) if v in vocab)
+        words, scores = self._vocab_words, {}
+        for n, word_id in enumerate(candidates):
+            if n % 64 == 0 and time.perf_counter() > deadline:
+                break
+            distance = edit_distance(word, words[word_id], limit)
+            if distance <= limit:
+                scores[word_id] = 1 - distance / max(len(word), len(words[word_id]))
+
+        if prefix and len(word) >= 3:
+            # kata terakhir mungkin belum selesai diketik
+            vocab = self._vocab_sorted
+            i = bisect_left(vocab, word)
+            for candidate in vocab[i:i + FUZZY_PREFIX_WORDS]:
+                if not candidate.startswith(word):
+                    break
+                word_id = self._vocab[candidate]
+                score = 0.5 + 0.5 * len(word) / len(candidate)
+                if score > scores.get(word_id, 0):
+                    scores[word_id] = score
+        return scores
+
+    def fuzzy(self, query: str, limit: int = 50, budget_ms: float = 5.0):
+        """
+        Operator dengan nama paling mirip query, toleran salah ketik (jarak edit per kata).
+        Return (rows, scores, partial). Kalau `budget_ms` habis, kata query yang belum
+        diproses dilewati dan hasilnya partial=True (diurutkan dari yang sudah dihitung).
+        """
+        deadline = time.perf_counter() + budget_ms / 1000.0
+        words = list(dict.fromkeys(name_words(query)))
+        if not words:
+            return [], [], False
+        with self._lock:
+            # per kata query: word id -> skor kata kosakata yang mirip
+            matched, partial = [], False
+            for i, word in enumerate(words):
+                if time.perf_counter() > deadline:
+                    partial = True
+                    break
+                matched.append(self._similar_words(word, i == len(words) - 1, deadline))
+            if not matched:
+                return [], [], True
+
+            # Kata paling selektif (paling sedikit nama) dijadikan kandidat: name id -> skor.
+            # Kata lain yang umum (mis. marga) cukup dicek di nama kandidat, tidak diekspansi.
+            word_names = self._word_names
+            matched.sort(key=lambda scores: sum(len(word_names[w]) for w in scores))
+            per_word = []
+            for n, scores in enumerate(matched):
+                if n and sum(len(word_names[w]) for w in scores) > FUZZY_EXPAND_NAMES:
+                    break
+                best = {}
+                # skor naik, jadi skor tertinggi yang menimpa terakhir (dict.update di C)
+                for word_id, score in sorted(scores.items(), key=itemgetter(1)):
+                    best.update(dict.fromkeys(word_names[word_id], score))
+                per_word.append(best)
+                if time.perf_counter() > deadline:
+                    partial = n + 1 < len(matched) or partial
+                    break
+            checked = matched[len(per_word):] if not partial else []
+
+            # nama yang cocok dengan semua kata dulu; kalau kurang, tambah nama dengan
+            # skor terbaik per kata
+            names = set(per_word[0]).intersection(*per_word[1:])
+            if len(names) < limit and len(per_word) > 1 and time.perf_counter() <= deadline:
+                for best in per_word:
+                    names.update(name_id for name_id, _ in heapq.nlargest(limit, best.items(), key=itemgetter(1)))
+            names = list(names)
+            if checked and len(names) > FUZZY_EXPAND_NAMES:
+                # terlalu banyak kandidat untuk dicek per nama: ambil yang terbaik dulu
+                names = [n for _, n in heapq.nlargest(FUZZY_EXPAND_NAMES, zip(map(per_word[0].get, names), names))]
+            # jumlah skor per nama lewat map (C) karena bisa ribuan nama
+            sums = list(map(per_word[0].get, names, repeat(0.0)))
+            for best in per_word[1:]:
+                sums = list(map(add, sums, map(best.get, names, repeat(0.0))))
+            if checked:
+                vocab, all_names = self._vocab, self._fuzzy_names
+                for scores in checked:
+                    sums = [
+                        total + max((scores.get(vocab.get(w), 0.0) for w in name_words(all_names[n])), default=0.0)
+                        for total, n in zip(sums, names)
+                    ]
+            top = []
+            if sums:
+                cutoff = sorted(sums, reverse=True)[min(limit, len(sums)) - 1]
+                above = list(compress(zip(sums, names), map(cutoff.__lt__, sums)))
+                tied = islice(compress(names, map(cutoff.__eq__, sums)), limit - len(above))
+                top = above + [(cutoff, n) for n in tied]
+            all_names, total = self._fuzzy_names, len(words)
+            scored = sorted(((score / total, n) for score, n in top), key=lambda item: (-item[0], all_names[item[1]]))
+
+            rows, scores = [], []
+            for score, name_id in scored:
+                for row_id in self._fuzzy_rows[name_id]:
+                    row = self._rows[row_id]
+                    if row is not None and len(rows) < limit:
+                        rows.append(row)
+                        scores.append(round(score, 3))
+            return rows, scores, partial
+
+    def stats(self) -> dict:
+        with self._lock:
+            postings = sum(len(ids) for ids in self._postings.values())
+            approx = sys.getsizeof(self._postings) + sum(sys.getsizeof(ids) for ids in self._postings.values())
+            approx += sum(sys.getsizeof(t) for t in self._texts)
+            return {
+                "mode": "compact" if self.compact else "full",
+                "operators": len(self),
+                "dead_rows": self._dead,
+                "grams": len(self._postings),
+                "stop_grams": len(self._stop),
+                "postings": postings,
+                "fuzzy_names": len(self._fuzzy_names),
+                "fuzzy_words": len(self._vocab_words),
+                "fuzzy_deletes": len(self._deletes),
+                "approx_index_bytes": approx,
+                "loaded_at": self.loaded_at,
+                "version": list(self.version) if self.version else None,
+                "stale": self.stale,
+            }
+
+
+# -------------------- Process-wide index --------------------
+_index: Optional[OperatorSearchIndex] = None
+_stop_event = threading.Event()
+_wake_event = threading.Event()   # minta refresh sekarang (index basi)
+_thread: Optional[threading.Thread] = None
+_checked_at = 0.0
+
+
+def enabled() -> bool:
+    return settings.OPERATOR_INDEX in ("full", "compact")
+
+
+def get_index() -> Optional[OperatorSearchIndex]:
+    """Index yang siap dipakai, atau None (belum dimuat / dimatikan / roster terlalu besar / basi)."""
+    index = _index
+    return None if index is None or index.stale else index
+
+
+# -------------------- Cek index masih sesuai database --------------------
+def version_stmt():
+    return select(func.count(), func.max(TMOperator.nik)).select_from(TMOperator)
+
+
+def needs_check() -> bool:
+    """True kalau index ada dan cek versi terakhir sudah lewat OPERATOR_INDEX_CHECK detik."""
+    index = _index
+    return index is not None and not index.stale and time.monotonic() - _checked_at >= settings.OPERATOR_INDEX_CHECK
+
+
+def check_version(version) -> bool:
+    """
+    Bandingkan hasil version_stmt() dengan versi index. Kalau beda, index ditandai
+    basi (get_index() None) dan refresh di background dimulai. Return True kalau sama.
+    """
+    global _checked_at
+    _checked_at = time.monotonic()
+    index = _index
+    if index is None or index.stale:
+        return False
+    if tuple(version) == index.version:
+        return True
+    index.stale = True
+    print(f"🔎 Operator index stale ({index.version} -> {tuple(version)}), rebuilding; searching via SQL meanwhile")
+    _wake_event.set()
+    return False
+
+
+def build_index(session_factory) -> Optional[OperatorSearchIndex]:
+    db = session_factory()
+    try:
+        # versi diambil sebelum baris dibaca: perubahan di antaranya terdeteksi cek berikutnya
+        version = tuple(db.execute(version_stmt()).one())
+        if settings.OPERATOR_INDEX_MAX_ROWS:
+            # ambil satu baris lebih untuk tahu roster melebihi batas
+            rows = db.execute(
+                select(TMOperator.nik, TMOperator.name).limit(settings.OPERATOR_INDEX_MAX_ROWS + 1)
+            ).all()
+            if len(rows) > settings.OPERATOR_INDEX_MAX_ROWS:
+                print(f"⚠️ Operator index dimatikan: roster > OPERATOR_INDEX_MAX_ROWS ({settings.OPERATOR_INDEX_MAX_ROWS})")
+                return None
+        else:
+            rows = db.execute(select(TMOperator.nik, TMOperator.name)).all()
+    finally:
+        db.close()
+    index = OperatorSearchIndex(
+        compact=settings.OPERATOR_INDEX == "compact",
+        stop_ratio=settings.OPERATOR_INDEX_STOP_RATIO,
+    )
+    index.load(rows)
+    index.version = version
+    return index
+
+
+def refresh(session_factory):
+    global _index
+    started = time.perf_counter()
+    _index = build_index(session_factory)
+    if _index is not None:
+        print(f"🔎 Operator index: {len(_index)} operators in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def _refresh_loop(session_factory):
+    while not _stop_event.is_set():
+        try:
+            refresh(session_factory)
+        except Exception as e:
+            print(f"⚠️ Operator index refresh gagal: {e}")
+        _wake_event.wait(settings.OPERATOR_INDEX_REFRESH or None)
+        _wake_event.clear()
+
+
+def start(session_factory):
+    """Muat index di background lalu refresh berkala; dipanggil dari lifespan."""
+    global _thread
+    if not enabled() or _thread is not None:
+        return
+    _stop_event.clear()
+    _wake_event.clear()
+    _thread = threading.Thread(target=_refresh_loop, args=(session_factory,), name="operator-index", daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread, _index
+    _stop_event.set()
+    _wake_event.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+    _thread, _index = None, None
+
+
+# -------------------- Incremental update dari ORM --------------------
+_PENDING = "operator_index_changes"
+
+
+def _pending(target) -> Optional[dict]:
+    session = object_session(target)
+    return session.info.setdefault(_PENDING, {}) if session is not None else None
+
+
+@event.listens_for(TMOperator, "after_insert")
+@event.listens_for(TMOperator, "after_update")
+def _track_upsert(mapper, connection, target):
+    pending = _pending(target)
+    if pending is None:
+        return
+    # NIK berubah (primary key diganti): hapus entri lama
+    for old_nik in inspect(target).attrs.nik.history.deleted:
+        pending[old_nik] = None
+    pending[target.nik] = target.name
+
+
+@event.listens_for(TMOperator, "after_delete")
+def _track_delete(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending[target.nik] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    changes = session.info.pop(_PENDING, None)
+    index = _index
+    if not changes or index is None:
+        return
+    for nik, name in changes.items():
+        if name is None:
+            index.remove(nik)
+        else:
+            index.upsert(nik, name)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,208 @@
+"""
+Optimasi PDF hasil merge sebelum disimpan.
+
+PdfMerger menulis setiap file input apa adanya: font/gambar yang sama dari
+beberapa input tersimpan berkali-kali, content stream hasil scan sering tidak
+dikompres, dan object yang sudah tidak dipakai ikut tertulis. optimize_pdf():
+
+1. hanya menyimpan object yang masih terjangkau dari /Root dan /Info;
+2. mengompres stream tanpa filter (dan stream FlateDecode tanpa /DecodeParms
+   kalau hasil kompres ulangnya lebih kecil) dengan zlib `level`;
+3. menggabungkan object yang isinya identik (font, gambar, resource), diulang
+   sampai tidak ada duplikat baru karena parent-nya bisa ikut menjadi identik;
+4. menomori ulang object dan menulis PDF baru (xref klasik).
+
+Hanya bergantung pada PyPDF2 dan zlib karena dijalankan di proses anak merge engine.
+"""
+from io import BytesIO
+from typing import Dict, NamedTuple, Tuple
+import hashlib
+import zlib
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (
+    ArrayObject,
+    DictionaryObject,
+    EncodedStreamObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
+
+# object ini tidak boleh digabung walaupun isinya sama (struktur halaman)
+_UNIQUE_TYPES = {"/Page", "/Pages", "/Catalog"}
+_MAX_DEDUP_PASSES = 10
+
+
+class OptimizeReport(NamedTuple):
+    size_before: int
+    size_after: int
+    objects_before: int
+    objects_after: int
+    streams_compressed: int
+    duplicates_removed: int
+
+
+def _walk_refs(obj, fn):
+    """Panggil fn(ref) untuk setiap IndirectObject di dalam obj, ganti dengan hasilnya."""
+    if isinstance(obj, DictionaryObject):  # termasuk StreamObject
+        for key, value in list(dict.items(obj)):
+            if isinstance(value, IndirectObject):
+                dict.__setitem__(obj, key, fn(value))
+            elif isinstance(value, (DictionaryObject, ArrayObject)):
+                _walk_refs(value, fn)
+    elif isinstance(obj, ArrayObject):
+        for i, value in enumerate(list.__iter__(obj)):
+            if isinstance(value, IndirectObject):
+                list.__setitem__(obj, i, fn(value))
+            elif isinstance(value, (DictionaryObject, ArrayObject)):
+                _walk_refs(value, fn)
+
+
+def _collect(reader: PdfReader, roots) -> Dict[int, object]:
+    """Object yang terjangkau dari roots (idnum -> object). Object lain dibuang."""
+    objects = {}
+    stack = list(roots)
+    while stack:
+        ref = stack.pop()
+        if ref.idnum in objects:
+            continue
+        obj = reader.get_object(ref)
+        if obj is None:
+            continue
+        objects[ref.idnum] = obj
+        if isinstance(obj, StreamObject):
+            # /Length ditulis ulang saat write, object panjang terpisah tidak perlu
+            dict.pop(obj, "/Length", None)
+
+        def visit(child):
+            stack.append(child)
+            return child
+        _walk_refs(obj, visit)
+    return objects
+
+
+def _compress(obj, level: int):
+    """Stream terkompres (FlateDecode) kalau lebih kecil, selain itu None."""
+    filters = dict.get(obj, "/Filter")
+    if filters is None:
+        pass
+    elif filters == "/FlateDecode" and "/DecodeParms" not in obj:
+        pass  # kompres ulang, mungkin tadinya level rendah
+    else:
+        return None  # DCT/JBIG2/predictor dsb.: biarkan
+    try:
+        data = obj.get_data()
+    except Exception:
+        return None
+    if isinstance(data, str):
+        data = data.encode("latin-1")
+    compressed = zlib.compress(data, level)
+    if len(compressed) >= len(obj._data):
+        return None
+    stream = EncodedStreamObject()
+    for key, value in dict.items(obj):
+        if key not in ("/Length", "/Filter", "/DecodeParms"):
+            dict.__setitem__(stream, key, value)
+    stream[NameObject("/Filter")] = NameObject("/FlateDecode")
+    stream._data = compressed
+    return stream
+
+
+def _serialize(obj) -> bytes:
+    buf = BytesIO()
+    obj.write_to_stream(buf, None)
+    return buf.getvalue()
+
+
+def _dedup(objects: Dict[int, object], roots: list) -> int:
+    """Gabungkan object identik; return jumlah object yang dibuang."""
+    removed = 0
+    for _ in range(_MAX_DEDUP_PASSES):
+        canonical: Dict[bytes, int] = {}
+        replace: Dict[int, int] = {}
+        for idnum in sorted(objects):
+            obj = objects[idnum]
+            if isinstance(obj, DictionaryObject) and dict.get(obj, "/Type") in _UNIQUE_TYPES:
+                continue
+            digest = hashlib.sha256(type(obj).__name__.encode() + _serialize(obj)).digest()
+            if digest in canonical:
+                replace[idnum] = canonical[digest]
+            else:
+                canonical[digest] = idnum
+        if not replace:
+            break
+        for idnum in replace:
+            del objects[idnum]
+        removed += len(replace)
+
+        def redirect(ref):
+            return IndirectObject(replace[ref.idnum], 0, None) if ref.idnum in replace else ref
+        for obj in objects.values():
+            _walk_refs(obj, redirect)
+        roots[:] = [redirect(ref) for ref in roots]
+    return removed
+
+
+def optimize_pdf(data: bytes, level: int = 6) -> Tuple[bytes, OptimizeReport]:
+    """Optimasi PDF (bytes); `level` 1-9 = level zlib. Return (pdf baru, laporan)."""
+    reader = PdfReader(BytesIO(data))
+    trailer = reader.trailer
+    root = dict.get(trailer, "/Root")
+    info = dict.get(trailer, "/Info")
+    roots = [ref for ref in (root, info) if isinstance(ref, IndirectObject)]
+    objects_before = sum(1 for ids in reader.xref.values() for idnum in ids if idnum) + len(reader.xref_objStm)
+
+    objects = _collect(reader, roots)
+
+    compressed = 0
+    for idnum, obj in list(objects.items()):
+        if isinstance(obj, StreamObject):
+            stream = _compress(obj, level)
+            if stream is not None:
+                objects[idnum] = stream
+                compressed += 1
+
+    duplicates = _dedup(objects, roots)
+
+    # nomor object baru 1..N sesuai urutan lama
+    renumber = {old: new for new, old in enumerate(sorted(objects), start=1)}
+
+    def to_new(ref):
+        return IndirectObject(renumber[ref.idnum], 0, None)
+    for obj in objects.values():
+        _walk_refs(obj, to_new)
+    roots = [to_new(ref) for ref in roots]
+
+    out = BytesIO()
+    out.write(reader.pdf_header.encode("latin-1") + b"\n%\xE2\xE3\xCF\xD3\n")
+    offsets = []
+    for old in sorted(objects):
+        offsets.append(out.tell())
+        out.write(f"{renumber[old]} 0 obj\n".encode("ascii"))
+        objects[old].write_to_stream(out, None)
+        out.write(b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(offsets) + 1}\n".encode("ascii"))
+    out.write(b"0000000000 65535 f \n")
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode("ascii"))
+    new_trailer = DictionaryObject({NameObject("/Size"): NumberObject(len(offsets) + 1), NameObject("/Root"): roots[0]})
+    if info is not None and len(roots) > 1:
+        new_trailer[NameObject("/Info")] = roots[1]
+    if "/ID" in trailer:
+        new_trailer[NameObject("/ID")] = trailer["/ID"]
+    out.write(b"trailer\n")
+    new_trailer.write_to_stream(out, None)
+    out.write(f"\nstartxref\n{xref}\n%%EOF\n".encode("ascii"))
+
+    result = out.getvalue()
+    return result, OptimizeReport(
+        size_before=len(data),
+        size_after=len(result),
+        objects_before=objects_before,
+        objects_after=len(offsets),
+        streams_compressed=compressed,
+        duplicates_removed=duplicates,
+    )
@@ -0,0 +1,179 @@
+"""
+Re-merge massal: buat ulang merged dossier semua operator yang punya certification
+dan evaluation (misalnya setelah template sertifikat berubah), tanpa save satu per
+satu dari halaman IAB.
+
+    python -m app.remerge                          # maks. 4 proses, lanjut dari checkpoint
+    python -m app.remerge --workers 8
+    python -m app.remerge --force                  # merge ulang walaupun ada di cache
+    python -m app.remerge --restart                # abaikan checkpoint lama
+    python -m app.remerge --only 00012345,00012346
+
+Setiap NIK dikerjakan crud.remerge_dossier di salah satu proses worker (merge
+langsung di proses itu, MERGE_WORKERS tidak dipakai). Hasil per NIK ditulis ke
+file checkpoint (JSON per baris) begitu selesai; kalau proses dihentikan, jalankan
+ulang perintah yang sama dan NIK yang sudah selesai dilewati. NIK yang gagal
+dicoba lagi di run berikutnya.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+
+from . import crud, database, settings
+from .database import SessionLocal
+
+DEFAULT_CHECKPOINT = "remerge.checkpoint"
+FAILED, SKIPPED = "failed", "skipped"
+
+
+# -------------------- Dijalankan di proses worker --------------------
+def _init_worker():
+    # setiap proses worker = satu merge sekaligus, tanpa process pool lagi
+    settings.MERGE_WORKERS = 0
+    # koneksi pool dari proses induk (fork) tidak boleh dipakai bersama
+    database.engine.dispose(close=False)
+
+
+def _remerge_one(nik: str, force: bool) -> dict:
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        result = crud.remerge_dossier(db, nik, force=force, merge_wait=settings.MERGE_TIMEOUT)
+        status = result["dossier"]
+    except ValueError as e:
+        # certification / evaluation belum lengkap
+        result, status = {"error": str(e)}, SKIPPED
+    except Exception as e:
+        traceback.print_exc()
+        result, status = {"error": f"{type(e).__name__}: {e}"}, FAILED
+    finally:
+        db.close()
+    return {"nik": nik, "status": status, "ms": round((time.perf_counter() - started) * 1000), **result}
+
+
+# -------------------- Checkpoint --------------------
+def load_checkpoint(path: str) -> set:
+    """NIK yang sudah selesai (selain yang gagal) menurut file checkpoint."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # baris terakhir terpotong waktu proses dihentikan
+            if entry.get("status") == FAILED:
+                done.discard(entry["nik"])
+            else:
+                done.add(entry["nik"])
+    return done
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}h{rest // 60:02d}m" if hours else f"{rest // 60}m{rest % 60:02d}s"
+
+
+# -------------------- Run --------------------
+def run(niks: list, workers: int, checkpoint: str, force: bool = False, report_every: float = 5.0) -> dict:
+    """Re-merge `niks` dengan `workers` proses; return jumlah per status."""
+    counts = {}
+    total = len(niks)
+    started = last_report = time.perf_counter()
+
+    def report(final=False):
+        done = sum(counts.values())
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0
+        eta = format_duration((total - done) / rate) if rate and done < total else "-"
+        summary = ", ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+        print(f"{'✅' if final else '📈'} {done}/{total} ({done * 100 / total if total else 100:.1f}%) "
+              f"in {format_duration(elapsed)} · {rate:.2f} NIK/s · ETA {eta} · {summary}")
+
+    pending = iter(niks)
+    with open(checkpoint, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        running = set()
+        try:
+            while True:
+                # antrian dibatasi supaya Ctrl+C tidak menunggu ribuan task
+                while len(running) < workers * 2:
+                    nik = next(pending, None)
+                    if nik is None:
+                        break
+                    running.add(pool.submit(_remerge_one, nik, force))
+                if not running:
+                    break
+                finished, running = wait(running, timeout=report_every, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    entry = future.result()
+                    counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+                    out.write(json.dumps({**entry, "at": datetime.utcnow().isoformat(timespec="seconds")}) + "\n")
+                    if entry["status"] == FAILED:
+                        print(f"❌ {entry['nik'].strip()}: {entry['error']}")
+                out.flush()
+                if time.perf_counter() - last_report >= report_every:
+                    report()
+                    last_report = time.perf_counter()
+        except KeyboardInterrupt:
+            for future in running:
+                future.cancel()
+            print("⏹️ Interrupted, waiting for running merges; run the same command again to resume.")
+            raise
+        finally:
+            report(final=True)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.remerge", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, 4), help="worker processes")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="progress file used to resume")
+    parser.add_argument("--restart", action="store_true", help="ignore (and truncate) the existing checkpoint")
+    parser.add_argument("--force", action="store_true", help="merge again even if the inputs are cached")
+    parser.add_argument("--only", default="", help="comma separated NIKs instead of all operators")
+    parser.add_argument("--limit", type=int, default=None, help="max NIKs this run (for trial runs)")
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    db = SessionLocal()
+    try:
+        niks = crud.list_dossier_niks(db)
+    finally:
+        db.close()
+    # proses anak membuat koneksi sendiri
+    database.engine.dispose()
+
+    if args.only:
+        only = {nik.strip() for nik in args.only.split(",") if nik.strip()}
+        niks = [nik for nik in niks if nik.strip() in only]
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    done = load_checkpoint(args.checkpoint)
+    todo = [nik for nik in niks if nik not in done]
+    already = len(niks) - len(todo)
+    if args.limit is not None:
+        todo = todo[:args.limit]
+    print(f"🔁 Re-merge {len(todo)} of {len(niks)} operators ({already} already done), "
+          f"{args.workers} worker(s), mode {settings.DOSSIER_MODE}, checkpoint {args.checkpoint}")
+    if not todo:
+        return 0
+
+    try:
+        counts = run(todo, args.workers, args.checkpoint, force=args.force, report_every=args.report_every)
+    except KeyboardInterrupt:
+        return 130
+    return 1 if counts.get(FAILED) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
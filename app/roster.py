@@ -0,0 +1,113 @@
+"""
+Snapshot roster operator (NIK, Name, Line, Level) untuk pencarian di browser.
+
+JSON roster dibangun sekali lalu disimpan dalam bentuk mentah, gzip dan brotli
+(kalau modul brotli ter-install), dengan ETag kuat dari sha256 isinya. Snapshot
+dibuang setelah commit yang mengubah TM_Operator (crud.invalidate_operator_caches)
+dan dibangun ulang di request berikutnya; TTL hanya untuk perubahan dari luar
+aplikasi. Kalau isinya sama, ETag juga sama, jadi browser tetap mendapat 304.
+"""
+from typing import NamedTuple, Optional
+import gzip
+import hashlib
+import json
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import settings
+from .models import TMOperator
+
+try:
+    import brotli
+except ImportError:  # brotli opsional, tanpa itu cukup gzip
+    brotli = None
+
+FIELDS = ("nik", "name", "line", "level")
+# kolom yang kalau berubah membuat snapshot basi
+_COLUMNS = [getattr(TMOperator, f) for f in FIELDS]
+
+
+class RosterSnapshot(NamedTuple):
+    sha256: str
+    count: int
+    built_at: float
+    bodies: dict   # content-coding ("identity", "gzip", "br") -> bytes
+
+    def etag(self, coding: str) -> str:
+        # ETag kuat harus beda per content-coding
+        return f'"{self.sha256}"' if coding == "identity" else f'"{self.sha256}-{coding}"'
+
+    def etags(self) -> set:
+        return {self.etag(coding) for coding in self.bodies}
+
+
+def build_snapshot(db: Session) -> RosterSnapshot:
+    rows = db.execute(select(*_COLUMNS).order_by(TMOperator.nik)).all()
+    raw = json.dumps(
+        {"fields": FIELDS, "operators": [[value.strip() if isinstance(value, str) else value for value in row] for row in rows]},
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+    bodies = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(raw, quality=11)
+    return RosterSnapshot(hashlib.sha256(raw).hexdigest(), len(rows), time.time(), bodies)
+
+
+_lock = threading.Lock()
+_snapshot: Optional[RosterSnapshot] = None
+_generation = 0
+
+
+def get_snapshot(session_factory) -> RosterSnapshot:
+    """Snapshot terbaru; dibangun ulang kalau sudah di-invalidate atau lewat TTL."""
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and time.time() - snapshot.built_at < settings.OPERATOR_ROSTER_TTL:
+        return snapshot
+    with _lock:
+        # request lain mungkin sudah membangunnya sambil kita menunggu lock
+        snapshot = _snapshot
+        if snapshot is not None and time.time() - snapshot.built_at < settings.OPERATOR_ROSTER_TTL:
+            return snapshot
+        generation = _generation
+        started = time.perf_counter()
+        db = session_factory()
+        try:
+            snapshot = build_snapshot(db)
+        finally:
+            db.close()
+        sizes = ", ".join(f"{coding} {len(body)}" for coding, body in snapshot.bodies.items())
+        print(f"📋 Roster snapshot: {snapshot.count} operators in {(time.perf_counter() - started) * 1000:.0f} ms ({sizes} bytes)")
+        # commit yang masuk selama build: jangan simpan, tapi tetap kirim ke request ini
+        if generation == _generation:
+            _snapshot = snapshot
+        return snapshot
+
+
+def invalidate():
+    global _snapshot, _generation
+    _generation += 1
+    _snapshot = None
+
+
+def negotiate(accept_encoding: Optional[str], snapshot: RosterSnapshot) -> str:
+    """Pilih content-coding dari header Accept-Encoding (br > gzip > identity)."""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    for coding in ("br", "gzip"):
+        if coding in snapshot.bodies and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return "identity"
+
@@ -2,6 +2,8 @@ from pydantic import BaseModel, validator
 from datetime import date, datetime
 from typing import Optional
 
+from .uploads import decode_pdf_base64
+
 # ================= Operator List (untuk popup search) =================
 class OperatorListSchema(BaseModel):
     nik: str
@@ -14,6 +16,9 @@ class OperatorServerSideResponse(BaseModel):
     recordsTotal: int
     recordsFiltered: int
     data: list[OperatorListSchema]
+    next_cursor: Optional[str] = None
+    filtered_capped: bool = False
+    partial: bool = False
 
 class CertificationRecordSchema(BaseModel):
     id: int
@@ -264,12 +269,36 @@ class OperatorIABSchema(BaseModel):
         from_attributes = True
 
 # ================= Save and Merge PDF Input Schema =================
+def _decode_pdf_field(v) -> bytes:
+    if not isinstance(v, str) or not v:
+        raise ValueError("File must be a non-empty base64 string")
+    return decode_pdf_base64(v)
+
+
 class SaveMergeIn(BaseModel):
     nik: str
-    file_soldering: str
-    file_screwing: str
-    file_msa: str
-    op_train_eval: str
-    op_skills_eval: str
-    train_eval: str
-    created_at: Optional[date] = None
\ No newline at end of file
+    # file dikirim sebagai string base64 dan di-decode sekali di validator (bytes ke crud)
+    # kosong = pakai file certification terbaru yang sudah tersimpan di server
+    file_soldering: Optional[bytes] = None
+    file_screwing: Optional[bytes] = None
+    file_msa: Optional[bytes] = None
+    op_train_eval: bytes
+    op_skills_eval: bytes
+    train_eval: bytes
+    created_at: Optional[date] = None
+
+    @validator("file_soldering", "file_screwing", "file_msa", pre=True)
+    def decode_certification_pdf(cls, v):
+        if v is None or v == "":
+            return None
+        return _decode_pdf_field(v)
+
+    @validator("op_train_eval", "op_skills_eval", "train_eval", pre=True)
+    def decode_evaluation_pdf(cls, v):
+        return _decode_pdf_field(v)
+
+# ================= Batch Operator Lookup Input Schema =================
+class OperatorBatchIn(BaseModel):
+    niks: list[str]
+    # kosong = semua field kecuali Photo
+    fields: Optional[list[str]] = None
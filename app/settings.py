@@ -0,0 +1,123 @@
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+
+def env_str(name: str, default: str = None) -> str:
+    value = os.getenv(name)
+    return value if value not in (None, "") else default
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} harus berupa angka, dapat: {value!r}")
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} harus berupa angka, dapat: {value!r}")
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# -------------------- Database --------------------
+DATABASE_URL = env_str("DATABASE_URL")
+# Jalankan migrasi otomatis saat startup (praktis untuk SQLite dev/test)
+DB_AUTO_MIGRATE = env_bool("DB_AUTO_MIGRATE", False)
+# Kosongkan untuk diturunkan otomatis dari DATABASE_URL (mssql+pyodbc -> mssql+aioodbc)
+ASYNC_DATABASE_URL = env_str("ASYNC_DATABASE_URL")
+
+# -------------------- Connection Pool --------------------
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 20)
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)   # detik, -1 = tidak pernah
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 30.0)  # detik menunggu checkout
+
+# -------------------- Blob Store (PDF) --------------------
+BLOB_STORE = env_str("BLOB_STORE", "local")
+BLOB_STORE_DIR = env_str("BLOB_STORE_DIR", "blobstore")
+
+# -------------------- Operator List (/api/operators) --------------------
+# Cache recordsTotal (detik). Insert/delete TM_Operator lewat ORM langsung meng-invalidate;
+# TTL untuk perubahan dari luar aplikasi (sinkronisasi HR, dsb.)
+OPERATOR_COUNT_TTL = env_int("OPERATOR_COUNT_TTL", 300)
+# Mode hitung recordsFiltered default: "exact" atau "capped"
+OPERATOR_COUNT_MODE = env_str("OPERATOR_COUNT_MODE", "exact")
+# Batas hitung di mode "capped"; lebih dari ini dilaporkan sebagai "1000+"
+OPERATOR_COUNT_CAP = env_int("OPERATOR_COUNT_CAP", 1000)
+# Cache hasil per halaman DataTables (search/start/length/order). TTL detik, 0 = mati
+OPERATOR_PAGE_CACHE_TTL = env_int("OPERATOR_PAGE_CACHE_TTL", 60)
+OPERATOR_PAGE_CACHE_SIZE = env_int("OPERATOR_PAGE_CACHE_SIZE", 1024)
+# POST /api/operators/batch: maksimal NIK per request dan NIK per statement IN (...)
+OPERATOR_BATCH_MAX = env_int("OPERATOR_BATCH_MAX", 1000)
+OPERATOR_BATCH_CHUNK = env_int("OPERATOR_BATCH_CHUNK", 500)
+# GET /api/operators/roster: snapshot dibangun ulang setelah TM_Operator berubah,
+# TTL (detik) untuk perubahan dari luar aplikasi
+OPERATOR_ROSTER_TTL = env_int("OPERATOR_ROSTER_TTL", 300)
+
+# -------------------- Operator Search Index (in-memory) --------------------
+# "full", "compact" (hemat memori) atau "off" (semua pencarian lewat SQL)
+OPERATOR_INDEX = env_str("OPERATOR_INDEX", "full")
+OPERATOR_INDEX_REFRESH = env_int("OPERATOR_INDEX_REFRESH", 300)   # detik, 0 = hanya saat startup
+# TM_Operator diisi sistem HR (di luar app): COUNT(*)/MAX(NIK) dicek paling sering tiap N detik,
+# kalau beda dengan saat index dibangun pencarian lewat SQL sampai index dibangun ulang
+OPERATOR_INDEX_CHECK = env_float("OPERATOR_INDEX_CHECK", 5.0)   # 0 = cek di setiap query
+OPERATOR_INDEX_MAX_ROWS = env_int("OPERATOR_INDEX_MAX_ROWS", 500000)  # 0 = tanpa batas
+# Mode compact: trigram yang muncul di lebih dari rasio ini tidak disimpan
+OPERATOR_INDEX_STOP_RATIO = env_float("OPERATOR_INDEX_STOP_RATIO", 0.5)
+# Fuzzy search (toleran salah ketik): jumlah hasil teratas dan batas waktu per query
+OPERATOR_FUZZY_LIMIT = env_int("OPERATOR_FUZZY_LIMIT", 50)
+OPERATOR_FUZZY_BUDGET_MS = env_float("OPERATOR_FUZZY_BUDGET_MS", 5.0)
+
+# -------------------- PDF Merge Engine (process pool) --------------------
+MERGE_WORKERS = env_int("MERGE_WORKERS", 2)         # proses anak, 0 = merge di thread request
+MERGE_QUEUE = env_int("MERGE_QUEUE", 4)             # task yang boleh menunggu; lebih dari itu = 503
+MERGE_TIMEOUT = env_float("MERGE_TIMEOUT", 60.0)    # detik per merge
+MERGE_MAX_PAGES = env_int("MERGE_MAX_PAGES", 300)   # total halaman input, 0 = tanpa batas
+# Optimasi hasil merge (dedup object, kompres stream, buang object tak terpakai):
+# 0 = mati, 1-9 = level zlib; makin tinggi makin kecil tapi makin lama
+MERGE_COMPRESSION_LEVEL = env_int("MERGE_COMPRESSION_LEVEL", 6)
+
+# -------------------- Merged Dossier --------------------
+# "eager" = merge saat save dan simpan ke T_PDFOPT (seperti dulu)
+# "lazy"  = save hanya menyimpan evaluation; dossier di-merge saat pertama diunduh
+DOSSIER_MODE = env_str("DOSSIER_MODE", "eager")
+# Total ukuran merged PDF di T_DossierCache; lebih dari ini yang paling lama tidak diakses dibuang
+DOSSIER_CACHE_MAX_BYTES = env_int("DOSSIER_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+# File blob dari entry yang dibuang baru dihapus setelah N detik (download yang sedang jalan tetap utuh)
+DOSSIER_BLOB_GRACE = env_int("DOSSIER_BLOB_GRACE", 3600)
+
+# -------------------- Save+Merge Job Queue --------------------
+# True = POST /api/savemerge hanya mengantrikan job; yang memproses antrian: proses
+# `python -m app.worker` atau SAVEMERGE_EMBEDDED_WORKER=1. Default: merge langsung di request.
+SAVEMERGE_QUEUE = env_bool("SAVEMERGE_QUEUE", False)
+# Jalankan worker sebagai thread di proses web (dev / satu server tanpa proses worker)
+SAVEMERGE_EMBEDDED_WORKER = env_bool("SAVEMERGE_EMBEDDED_WORKER", False)
+SAVEMERGE_POLL = env_float("SAVEMERGE_POLL", 1.0)          # detik antar cek antrian
+SAVEMERGE_JOB_STALE = env_int("SAVEMERGE_JOB_STALE", 600)  # detik tanpa heartbeat = worker mati
+SAVEMERGE_JOB_ATTEMPTS = env_int("SAVEMERGE_JOB_ATTEMPTS", 3)
+# Worker dianggap hidup kalau T_WorkerHeartbeat-nya lebih baru dari N detik; kalau tidak ada,
+# save+merge langsung dijalankan di request (bukan diantrikan tanpa ada yang memproses)
+SAVEMERGE_WORKER_ALIVE = env_int("SAVEMERGE_WORKER_ALIVE", 30)
+
+# -------------------- Upload multipart --------------------
+UPLOAD_MAX_FILE_BYTES = env_int("UPLOAD_MAX_FILE_BYTES", 20 * 1024 * 1024)  # per file PDF
+UPLOAD_MAX_FIELD_BYTES = env_int("UPLOAD_MAX_FIELD_BYTES", 64 * 1024)       # per field teks
+UPLOAD_SPOOL_BYTES = env_int("UPLOAD_SPOOL_BYTES", 1024 * 1024)             # di atas ini file spool ke disk
@@ -0,0 +1,238 @@
+"""
+Upload PDF lewat multipart/form-data yang dibaca bertahap dari stream request.
+
+Setiap file ditulis per chunk ke SpooledTemporaryFile (di memori sampai
+UPLOAD_SPOOL_BYTES, setelah itu ke disk), lalu dipindah ke blob store dengan
+put_stream. Batas ukuran, Content-Type part dan header "%PDF-" dicek sambil
+data masuk, jadi upload yang salah dihentikan tanpa membaca sisa body.
+Tidak ada base64 dan tidak ada body JSON utuh di memori.
+
+    form = await uploads.read_pdf_form(request, files=("op_train_eval", ...))
+    form.fields["nik"], form.files["op_train_eval"]  # file-like, posisi di awal
+
+Endpoint JSON lama (file sebagai string base64) memakai decode_pdf_base64: base64
+di-decode per chunk dengan cek alfabet/padding, header "%PDF-" dicek dari chunk
+pertama dan "%%EOF" di akhir. Hasil decode diteruskan ke crud, jadi setiap file
+hanya di-decode sekali per request.
+"""
+from tempfile import SpooledTemporaryFile
+from typing import Dict, Iterable, Optional
+import base64
+import binascii
+import mimetypes
+import re
+
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from . import settings
+
+PDF_CONTENT_TYPES = {"application/pdf", "application/x-pdf"}
+PDF_MAGIC = b"%PDF-"
+# spesifikasi PDF: header boleh muncul di 1024 byte pertama
+PDF_MAGIC_WINDOW = 1024
+PDF_EOF = b"%%EOF"
+# karakter base64 per langkah decode (kelipatan 4)
+BASE64_CHUNK = 64 * 1024
+_BASE64_WHITESPACE = dict.fromkeys(map(ord, " \t\r\n"), None)
+# satu chunk: alfabet base64, padding hanya di akhir (a2b_base64 strict_mode baru ada di 3.11)
+_BASE64_CHUNK_RE = re.compile(r"[A-Za-z0-9+/]*={0,2}")
+
+
+class UploadedForm:
+    def __init__(self):
+        self.fields: Dict[str, str] = {}
+        self.files: Dict[str, SpooledTemporaryFile] = {}
+        self.filenames: Dict[str, str] = {}
+        self.sizes: Dict[str, int] = {}
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+class _Part:
+    def __init__(self):
+        self.headers = {}
+        self.header_field = b""
+        self.header_value = b""
+        self.name = None
+        self.filename = None
+        self.file = None
+        self.data = bytearray()
+        self.size = 0
+        self.head = b""   # awal file untuk cek %PDF-
+
+
+def _reject(status_code: int, detail: str):
+    raise HTTPException(status_code=status_code, detail=detail)
+
+
+async def read_pdf_form(
+    request: Request,
+    files: Iterable[str],
+    max_file_bytes: int = None,
+    max_field_bytes: int = None,
+) -> UploadedForm:
+    """
+    Baca body multipart. Part dengan nama di `files` harus PDF, part lain dianggap
+    field teks biasa. File yang tidak disebut di `files` ditolak (400).
+    """
+    max_file_bytes = max_file_bytes or settings.UPLOAD_MAX_FILE_BYTES
+    max_field_bytes = max_field_bytes or settings.UPLOAD_MAX_FIELD_BYTES
+    file_names = set(files)
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        _reject(415, "Expected multipart/form-data")
+
+    form = UploadedForm()
+    state = {"part": None}
+
+    def on_part_begin():
+        state["part"] = _Part()
+
+    def on_header_field(data, start, end):
+        state["part"].header_field += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["part"].header_value += data[start:end]
+
+    def on_header_end():
+        part = state["part"]
+        part.headers[part.header_field.lower()] = part.header_value
+        part.header_field, part.header_value = b"", b""
+
+    def on_headers_finished():
+        part = state["part"]
+        _, disposition = parse_options_header(part.headers.get(b"content-disposition", b""))
+        part.name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        filename = disposition.get(b"filename")
+        if filename is None and part.name not in file_names:
+            return  # field teks
+        if part.name not in file_names:
+            _reject(400, f"Unexpected file field '{part.name}'")
+        if part.name in form.files:
+            _reject(400, f"Duplicate file field '{part.name}'")
+        part.filename = (filename or b"").decode("utf-8", "replace")
+        part_type = part.headers.get(b"content-type", b"").decode("latin-1").split(";")[0].strip().lower()
+        # browser kadang mengirim octet-stream; tebak dari nama file
+        if part_type in ("", "application/octet-stream"):
+            part_type = mimetypes.guess_type(part.filename)[0] or part_type
+        if part_type not in PDF_CONTENT_TYPES:
+            _reject(415, f"File {part.filename or part.name} must be a PDF.")
+        part.file = SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_BYTES)
+
+    def on_part_data(data, start, end):
+        part = state["part"]
+        chunk = data[start:end]
+        if part.file is None:
+            part.data += chunk
+            if len(part.data) > max_field_bytes:
+                _reject(413, f"Field '{part.name}' too large")
+            return
+        part.size += len(chunk)
+        if part.size > max_file_bytes:
+            _reject(413, f"File {part.filename or part.name} too large (max {max_file_bytes // (1024 * 1024)}MB).")
+        if len(part.head) < PDF_MAGIC_WINDOW:
+            part.head += chunk[:PDF_MAGIC_WINDOW - len(part.head)]
+            if len(part.head) >= PDF_MAGIC_WINDOW and PDF_MAGIC not in part.head:
+                _reject(415, f"File {part.filename or part.name} is not a valid PDF.")
+        part.file.write(chunk)
+
+    def on_part_end():
+        part = state["part"]
+        state["part"] = None
+        if part.file is None:
+            form.fields[part.name] = part.data.decode("utf-8", "replace")
+            return
+        if part.size == 0:
+            part.file.close()
+            return  # input file kosong = tidak diisi
+        if PDF_MAGIC not in part.head:
+            part.file.close()
+            _reject(415, f"File {part.filename or part.name} is not a valid PDF.")
+        part.file.seek(0)
+        form.files[part.name] = part.file
+        form.filenames[part.name] = part.filename
+        form.sizes[part.name] = part.size
+
+    parser = MultipartParser(params[b"boundary"], callbacks={
+        "on_part_begin": on_part_begin,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except BaseException as e:
+        form.close()
+        part = state["part"]
+        if part is not None and part.file is not None:
+            part.file.close()
+        if isinstance(e, FormParserError):
+            raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+        raise
+    return form
+
+
+def decode_pdf_base64(value: str, max_bytes: Optional[int] = None) -> bytes:
+    """
+    Decode string base64 (boleh dengan prefix data URI) yang harus berisi PDF.
+    ValueError kalau base64 tidak valid, bukan PDF, atau lebih dari max_bytes
+    (default UPLOAD_MAX_FILE_BYTES; 0 = tanpa batas, untuk data yang sudah tersimpan);
+    berhenti di chunk pertama yang salah tanpa men-decode sisanya.
+    """
+    if max_bytes is None:
+        max_bytes = settings.UPLOAD_MAX_FILE_BYTES
+    too_large = f"File too large (max {max_bytes // (1024 * 1024)}MB)"
+    start = 0
+    while start < len(value) and value[start] in " \t\r\n":
+        start += 1  # tanpa value.strip(): string bisa puluhan MB
+    if value.startswith("data:", start):
+        start = value.find(",", start, start + 200) + 1
+    end = len(value)
+    if max_bytes and (end - start) // 4 * 3 > max_bytes * 2:
+        # jelas terlalu besar walaupun dikurangi whitespace
+        raise ValueError(too_large)
+
+    out = bytearray()
+    pending = ""
+    padded = False
+    head_checked = False
+    pos = start
+    while pos < end:
+        piece = pending + value[pos:pos + BASE64_CHUNK].translate(_BASE64_WHITESPACE)
+        pos += BASE64_CHUNK
+        # sisa yang belum kelipatan 4 dibawa ke chunk berikutnya
+        cut = len(piece) if pos >= end else len(piece) - len(piece) % 4
+        piece, pending = piece[:cut], piece[cut:]
+        if not piece:
+            continue
+        if padded or not _BASE64_CHUNK_RE.fullmatch(piece):
+            raise ValueError("Invalid base64 file input")
+        try:
+            # panjang bukan kelipatan 4 (chunk terakhir) -> binascii.Error
+            out += base64.b64decode(piece, validate=True)
+        except binascii.Error:
+            raise ValueError("Invalid base64 file input")
+        padded = piece.endswith("=")
+        if max_bytes and len(out) > max_bytes:
+            raise ValueError(too_large)
+        if not head_checked and (len(out) >= PDF_MAGIC_WINDOW or pos >= end):
+            if PDF_MAGIC not in out[:PDF_MAGIC_WINDOW]:
+                raise ValueError("File is not a valid PDF")
+            head_checked = True
+    if not out:
+        raise ValueError("Empty file")
+    if not head_checked and PDF_MAGIC not in out[:PDF_MAGIC_WINDOW]:
+        raise ValueError("File is not a valid PDF")
+    if PDF_EOF not in out[-PDF_MAGIC_WINDOW:]:
+        raise ValueError("File is not a valid PDF (missing %%EOF, truncated upload?)")
+    return bytes(out)
@@ -0,0 +1,157 @@
+"""
+Worker antrian save+merge (T_MergeJob, lihat app/jobs.py).
+
+    python -m app.worker               # jalan terus, cek antrian tiap SAVEMERGE_POLL detik
+    python -m app.worker --once        # proses antrian sampai kosong lalu keluar
+
+Boleh dijalankan lebih dari satu proses; setiap job hanya diambil satu worker.
+Dengan SAVEMERGE_EMBEDDED_WORKER=1 loop yang sama jalan sebagai thread di proses
+web (praktis untuk dev, tanpa proses terpisah).
+
+Selama jalan, worker menulis heartbeat ke T_WorkerHeartbeat; tanpa worker yang hidup
+POST /api/savemerge langsung menjalankan merge di request (lihat jobs.worker_alive).
+"""
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+
+from .database import SessionLocal
+from . import crud, jobs, settings
+
+
+def process_job(job_id: int, data: dict):
+    """Jalankan save+merge untuk satu job; progress ditulis lewat session terpisah."""
+    progress_db = SessionLocal()
+    db = SessionLocal()
+    try:
+        def progress(percent, message):
+            jobs.set_progress(progress_db, job_id, percent, message)
+
+        started = time.perf_counter()
+        # worker antrian boleh menunggu slot merge engine, request HTTP tidak
+        result = crud.save_evaluation_and_merge(db, data, progress=progress, merge_wait=settings.MERGE_TIMEOUT)
+        jobs.finish(progress_db, job_id, result)
+        print(f"✅ Job {job_id} ({data['nik']}) done in {time.perf_counter() - started:.1f}s: {result}")
+    except Exception as e:
+        traceback.print_exc()
+        jobs.fail(progress_db, job_id, f"{type(e).__name__}: {e}")
+        print(f"❌ Job {job_id} ({data['nik']}) failed: {e}")
+    finally:
+        db.close()
+        progress_db.close()
+
+
+def run_once(worker: str) -> int:
+    """Proses semua job yang ada di antrian; return jumlah job yang diproses."""
+    done = 0
+    db = SessionLocal()
+    try:
+        jobs.requeue_stale(db)
+        while True:
+            job = jobs.claim_next(db, worker)
+            if job is None:
+                return done
+            print(f"⚙️ Job {job.id} ({job.nik}) started, attempt {job.attempts}")
+            try:
+                data = jobs.job_inputs(job)
+            except Exception as e:
+                jobs.fail(db, job.id, f"Input files not readable: {e}")
+                continue
+            process_job(job.id, data)
+            done += 1
+    finally:
+        db.close()
+
+
+def heartbeat(worker: str, stop_event: threading.Event, every: float):
+    """Tulis heartbeat worker tiap `every` detik sampai stop_event; jalan di thread sendiri
+    supaya merge yang lama tidak membuat worker terlihat mati."""
+    db = SessionLocal()
+    try:
+        while True:
+            try:
+                jobs.beat(db, worker)
+            except Exception:
+                traceback.print_exc()
+                db.rollback()
+            if stop_event.wait(every):
+                break
+        try:
+            jobs.worker_stopped(db, worker)
+        except Exception:
+            traceback.print_exc()
+    finally:
+        db.close()
+
+
+def run(worker: str, stop_event: threading.Event = None, poll: float = None):
+    poll = poll if poll is not None else settings.SAVEMERGE_POLL
+    stop_event = stop_event or threading.Event()
+    beat_thread = threading.Thread(
+        target=heartbeat, args=(worker, stop_event, settings.SAVEMERGE_WORKER_ALIVE / 3),
+        name="savemerge-heartbeat", daemon=True,
+    )
+    beat_thread.start()
+    print(f"👷 Save+merge worker {worker} started (poll {poll}s)")
+    try:
+        while not stop_event.is_set():
+            try:
+                run_once(worker)
+            except Exception:
+                # database sementara tidak bisa diakses dsb.: coba lagi di putaran berikutnya
+                traceback.print_exc()
+            stop_event.wait(poll)
+    finally:
+        stop_event.set()
+        beat_thread.join(timeout=5)
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# -------------------- Embedded worker (thread di proses web) --------------------
+_thread = None
+_stop_event = threading.Event()
+
+
+def start_embedded():
+    global _thread
+    if not settings.SAVEMERGE_EMBEDDED_WORKER or _thread is not None:
+        return
+    _stop_event.clear()
+    _thread = threading.Thread(target=run, args=(f"{worker_name()}/embedded", _stop_event), name="savemerge-worker", daemon=True)
+    _thread.start()
+
+
+def stop_embedded():
+    global _thread
+    _stop_event.set()
+    if _thread is not None:
+        _thread.join(timeout=30)
+    _thread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.worker", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="process the queue until empty, then exit")
+    parser.add_argument("--poll", type=float, default=settings.SAVEMERGE_POLL, help="seconds between queue checks")
+    parser.add_argument("--name", default=worker_name(), help="worker name recorded on claimed jobs")
+    args = parser.parse_args(argv)
+
+    if args.once:
+        print(f"Processed {run_once(args.name)} job(s).")
+        return 0
+    try:
+        run(args.name, poll=args.poll)
+    except KeyboardInterrupt:
+        print("Worker stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark: endpoint /api sync (threadpool) vs async (AsyncSession) pada SQLite.
+
+    python benchmarks/bench_async_endpoints.py --clients 200 --requests 2000
+
+Versi sync dibuat ulang di sini dengan crud.* + get_db supaya dua jalur
+bisa dibandingkan pada database dan data yang sama.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from common import percentile, seed_roster, use_sqlite
+
+
+def build_sync_app():
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.orm import Session
+    from app import crud
+    from app.database import get_db
+    from app.main import serialize_certification
+
+    sync_app = FastAPI()
+
+    @sync_app.get("/api/operators")
+    def operators(search: str = "", start: int = 0, length: int = 10, db: Session = Depends(get_db)):
+        total, filtered, _, items, _ = crud.get_operators(db, search=search, start=start, length=length)
+        return {"recordsTotal": total, "recordsFiltered": filtered,
+                "data": [{"nik": o.nik, "name": o.name} for o in items]}
+
+    @sync_app.get("/api/certification")
+    def certification(nik: str, db: Session = Depends(get_db)):
+        cert = crud.get_latest_certification(db, nik)
+        return serialize_certification(cert) if cert else {}
+
+    return sync_app
+
+
+async def run_load(app, paths, clients: int, total_requests: int):
+    import httpx
+
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total_requests):
+        queue.put_nowait(paths[i % len(paths)])
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while True:
+                try:
+                    path = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                resp = await client.get(path)
+                resp.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return total_requests / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operators", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    use_sqlite()
+    seed_roster(args.operators, documents_every=10)
+
+    from app.main import app as async_app
+
+    rng = random.Random(7)
+    niks = [f"{i + 1:08d}" for i in range(0, args.operators, 10)]
+    paths = []
+    for _ in range(200):
+        paths.append(f"/api/operators?search={rng.choice(['Budi', 'Siti', 'Lubis', ''])}&start=0&length=10")
+        paths.append(f"/api/certification?nik={rng.choice(niks)}")
+
+    print(f"SQLite stand-in, {args.operators} operators, {args.clients} concurrent clients, {args.requests} requests")
+    print(f"{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, app in (("sync", build_sync_app()), ("async", async_app)):
+        rps, lat = asyncio.run(run_load(app, paths, args.clients, args.requests))
+        print(f"{label:<8}{rps:>10.1f}{percentile(lat, 50):>10.1f}{percentile(lat, 99):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: latency endpoint ringan selama ada merge PDF bersamaan,
+merge di thread request (MERGE_WORKERS=0) vs di process pool.
+
+    python benchmarks/bench_merge_engine.py --merges 4 --pages 150 --workers 2
+
+Beberapa client mengirim POST /api/savemerge (mode inline, tanpa antrian) terus
+menerus, sementara satu client mengukur GET /api/db/pool setiap 10 ms. Di mode
+thread, merge memegang GIL sehingga request ringan ikut tertahan. Request yang
+ditolak karena engine penuh (503) juga dihitung.
+"""
+import argparse
+import asyncio
+import base64
+import os
+import time
+
+from common import make_pdf, percentile, seed_roster, use_sqlite
+
+
+async def run(app, body: dict, merges: int, rounds: int):
+    import httpx
+
+    probe_ms, merge_ms, busy = [], [], 0
+    unique = iter(range(10 ** 9))
+    train_eval = base64.b64decode(body["train_eval"])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        done = asyncio.Event()
+
+        async def merger():
+            nonlocal busy
+            for _ in range(rounds):
+                started = time.perf_counter()
+                # input berbeda tiap request supaya tidak kena cache dossier (app/dossier.py)
+                marker = f"\n%bench {next(unique)}\n".encode()
+                resp = await client.post("/api/savemerge", json=dict(body, train_eval=base64.b64encode(train_eval + marker).decode()))
+                if resp.status_code == 503:
+                    busy += 1
+                    await asyncio.sleep(float(resp.headers.get("retry-after", 1)) / 10)
+                    continue
+                resp.raise_for_status()
+                merge_ms.append((time.perf_counter() - started) * 1000)
+
+        async def prober():
+            while not done.is_set():
+                started = time.perf_counter()
+                (await client.get("/api/db/pool")).raise_for_status()
+                probe_ms.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.01)
+
+        probe = asyncio.create_task(prober())
+        started = time.perf_counter()
+        await asyncio.gather(*(merger() for _ in range(merges)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe
+    return elapsed, probe_ms, merge_ms, busy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--merges", type=int, default=4, help="concurrent save+merge clients")
+    parser.add_argument("--rounds", type=int, default=3, help="merges per client")
+    parser.add_argument("--pages", type=int, default=150, help="pages per input PDF (6 inputs per merge)")
+    parser.add_argument("--workers", type=int, default=2, help="process pool size for the pool run")
+    args = parser.parse_args()
+
+    os.environ["SAVEMERGE_QUEUE"] = "0"
+    os.environ["MERGE_MAX_PAGES"] = "0"
+    use_sqlite()
+    seed_roster(10)
+
+    from app import merge_engine
+    from app.main import app
+
+    pdf_b64 = base64.b64encode(make_pdf(args.pages)).decode("utf-8")
+    body = {"nik": "00000001", **{attr: pdf_b64 for attr in (
+        "file_soldering", "file_screwing", "file_msa", "op_train_eval", "op_skills_eval", "train_eval")}}
+
+    print(f"{args.merges} merge clients x {args.rounds}, 6 x {args.pages} pages per merge, cpus={os.cpu_count()}")
+    print(f"{'engine':<10}{'probe p50':>11}{'probe p99':>11}{'probe max':>11}{'merge p50':>11}{'busy':>6}{'secs':>7}")
+    for label, workers in (("thread", 0), (f"pool x{args.workers}", args.workers)):
+        merge_engine.shutdown()
+        merge_engine._engine = merge_engine.MergeEngine(workers, 4, 300, 0)
+        elapsed, probe, merged, busy = asyncio.run(run(app, body, args.merges, args.rounds))
+        print(f"{label:<10}{percentile(probe, 50):>11.1f}{percentile(probe, 99):>11.1f}{max(probe):>11.1f}"
+              f"{percentile(merged, 50):>11.1f}{busy:>6}{elapsed:>7.1f}")
+    merge_engine.shutdown()
+
+
+if __name__ == "__main__":
+    main()
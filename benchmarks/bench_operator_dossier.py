@@ -0,0 +1,79 @@
+"""
+Benchmark + cek jumlah query untuk dossier /api/operator/iab.
+
+    python benchmarks/bench_operator_dossier.py --operators 20000 --lookups 2000
+
+Jalur lama: get_operator + get_latest_certification + get_latest_evaluation_document
+(3 round trip). Jalur baru: crud.get_operator_dossier (1 round trip). Script
+gagal (exit 1) kalau jalur baru memakai lebih dari satu statement SQL.
+"""
+import argparse
+import random
+import sys
+
+from common import percentile, seed_roster, timed, use_sqlite
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operators", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    use_sqlite()
+    seed_roster(args.operators, documents_every=2)
+
+    from app import crud
+    from app.database import SessionLocal, engine
+
+    counter = QueryCounter(engine)
+    rng = random.Random(3)
+    niks = [f"{rng.randrange(args.operators) + 1:08d}" for _ in range(args.lookups)]
+
+    def old_path(db, nik):
+        op = crud.get_operator(db, nik, with_photo=True)
+        if op:
+            crud.get_latest_certification(db, nik)
+            crud.get_latest_evaluation_document(db, nik)
+
+    def new_path(db, nik):
+        crud.get_operator_dossier(db, nik)
+
+    print(f"{args.operators} operators, {args.lookups} lookups")
+    print(f"{'path':<10}{'queries/lookup':>16}{'p50 ms':>10}{'p99 ms':>10}")
+    failed = False
+    for label, fn in (("3-query", old_path), ("dossier", new_path)):
+        db = SessionLocal()
+        samples = []
+        queries = []
+        try:
+            for nik in niks:
+                before = counter.count
+                samples += timed(lambda: fn(db, nik))
+                queries.append(counter.count - before)
+                db.expunge_all()
+        finally:
+            db.close()
+        print(f"{label:<10}{max(queries):>16}{percentile(samples, 50):>10.3f}{percentile(samples, 99):>10.3f}")
+        if label == "dossier" and max(queries) != 1:
+            failed = True
+
+    if failed:
+        print("FAIL: operator dossier must be a single SQL round trip")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Benchmark: fuzzy search nama operator (toleran salah ketik) di index in-memory.
+
+    python benchmarks/bench_operator_fuzzy.py --operators 100000 --queries 500
+
+Roster di benchmark lain hanya punya ~300 kombinasi nama, jadi di sini nama dibuat
+dari suku kata supaya hampir semuanya unik. Query diambil dari nama roster lalu
+diberi 1-2 salah ketik (hapus/ganti/tukar/sisip huruf). Dicatat latency top-k,
+berapa query yang kena batas waktu (partial) dan recall: nama asli ada di top-k.
+Tidak butuh database.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from common import LAST_NAMES, percentile  # noqa: E402
+
+SYLLABLES = [
+    "a", "ba", "bu", "di", "da", "de", "dewi", "eko", "fi", "ga", "gus", "ha", "hen", "in", "ju",
+    "ka", "ko", "la", "lis", "ma", "mi", "na", "ni", "nur", "pu", "ra", "ri", "ro", "sa", "si",
+    "sri", "ta", "ti", "tri", "tu", "wa", "wan", "ya", "yu", "yan",
+]
+
+
+def make_name(rng: random.Random) -> str:
+    first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    middle = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    return f"{first} {middle} {rng.choice(LAST_NAMES)}"
+
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word))
+    kind = rng.choice(("delete", "replace", "swap", "insert"))
+    if kind == "delete" and len(word) > 3:
+        return word[:i] + word[i + 1:]
+    if kind == "swap" and i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    if kind == "insert":
+        return word[:i] + letter + word[i:]
+    return word[:i] + letter + word[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operators", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    parser.add_argument("--compact", action="store_true")
+    args = parser.parse_args()
+
+    from app.operator_index import OperatorSearchIndex
+
+    rng = random.Random(7)
+    rows = [(f"{i + 1:08d}", make_name(rng)) for i in range(args.operators)]
+    started = time.perf_counter()
+    index = OperatorSearchIndex(compact=args.compact).load(rows)
+    print(f"{args.operators} operators, {len(set(n for _, n in rows))} distinct names, "
+          f"build {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    samples, partial, hits = [], 0, 0
+    for _ in range(args.queries):
+        nik, name = rng.choice(rows)
+        words = name.split()[:2]  # line leader biasanya mengetik nama depan + tengah
+        words = [typo(w, rng) if rng.random() < 0.7 else w for w in words]
+        query = " ".join(words)
+        started = time.perf_counter()
+        found, _, was_partial = index.fuzzy(query, args.limit, args.budget_ms)
+        samples.append((time.perf_counter() - started) * 1000)
+        partial += was_partial
+        hits += any(row.nik == nik for row in found)
+
+    print(f"top-{args.limit}, budget {args.budget_ms} ms, {args.queries} queries")
+    print(f"p50 {percentile(samples, 50):.3f} ms  p99 {percentile(samples, 99):.3f} ms  max {max(samples):.3f} ms")
+    print(f"partial {partial / args.queries:.1%}  recall@{args.limit} {hits / args.queries:.1%}")
+
+
+if __name__ == "__main__":
+    main()
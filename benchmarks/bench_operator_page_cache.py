@@ -0,0 +1,58 @@
+"""
+Benchmark: cache halaman /api/operators untuk popup DataTables yang dibuka berulang.
+
+    python benchmarks/bench_operator_page_cache.py --operators 50000 --draws 2000
+
+Draw diambil dari sekumpulan kecil parameter yang sering muncul (halaman awal,
+urut NIK/Name, beberapa kata pencarian), seperti line leader yang membuka popup
+di halaman IAB dan profile. Dibandingkan cache mati vs hidup lewat crud.get_operators,
+dengan index in-memory mati supaya jalur tanpa cache tetap ke SQL.
+"""
+import argparse
+import os
+import random
+
+from common import percentile, seed_roster, timed, use_sqlite
+
+SEARCHES = ["", "", "", "budi", "siregar", "000123", "putri w"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operators", type=int, default=50000)
+    parser.add_argument("--draws", type=int, default=2000)
+    parser.add_argument("--ttl", type=int, default=60)
+    args = parser.parse_args()
+
+    os.environ["OPERATOR_PAGE_CACHE_TTL"] = str(args.ttl)
+    os.environ["OPERATOR_INDEX"] = "off"
+    use_sqlite()
+    seed_roster(args.operators)
+
+    from app import crud
+    from app.database import SessionLocal
+
+    rng = random.Random(3)
+    draws = [
+        dict(search=rng.choice(SEARCHES), start=rng.choice((0, 0, 0, 10, 20)), length=10,
+             order_col=rng.choice((0, 0, 1)), order_dir="asc")
+        for _ in range(args.draws)
+    ]
+    db = SessionLocal()
+    cache = crud.operator_page_cache
+    print(f"{args.operators} operators, {args.draws} draws, {len({tuple(d.values()) for d in draws})} distinct")
+    print(f"{'cache':<8}{'p50 ms':>10}{'p99 ms':>10}{'hit rate':>10}")
+    for label, ttl in (("off", 0), ("on", args.ttl)):
+        cache.ttl = ttl
+        cache.invalidate()
+        cache.hits = cache.misses = 0
+        it = iter(draws)
+        samples = timed(lambda: crud.get_operators(db, **next(it)), len(draws))
+        lookups = cache.hits + cache.misses
+        rate = f"{cache.hits / lookups:.1%}" if lookups else "-"
+        print(f"{label:<8}{percentile(samples, 50):>10.3f}{percentile(samples, 99):>10.3f}{rate:>10}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
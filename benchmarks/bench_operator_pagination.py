@@ -0,0 +1,61 @@
+"""
+Benchmark: OFFSET vs keyset pagination untuk daftar operator DataTables.
+
+    python benchmarks/bench_operator_pagination.py --operators 100000 --offsets 0,5000,40000,90000
+
+Mengukur query halaman saja (tanpa COUNT) di beberapa posisi (offset baris),
+diurutkan per NIK dan per (Name, NIK). Di offset kecil dua mode hampir sama
+(keyset bisa sedikit lebih lambat karena predikat tuple); selisihnya baru
+terlihat di halaman dalam, karena OFFSET tetap membaca semua baris sebelumnya.
+"""
+import argparse
+
+from common import percentile, seed_roster, timed, use_sqlite
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operators", type=int, default=100000)
+    parser.add_argument("--length", type=int, default=10)
+    parser.add_argument("--offsets", default="0,5000,40000,90000", help="comma separated row offsets")
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+    offsets = sorted({min(int(o), max(args.operators - args.length, 0)) for o in args.offsets.split(",") if o.strip()})
+
+    use_sqlite()
+    seed_roster(args.operators)
+
+    from app import crud
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    base = crud._operators_filter_stmt("")
+
+    def run_page(order_col, start, after):
+        stmt = crud._operators_page_stmt(base, start, args.length, order_col, "asc", after)
+        return db.execute(stmt).scalars().all()
+
+    print(f"{args.operators} operators, length={args.length}, {args.repeat} runs each")
+    print(f"{'order':<12}{'offset':>8}{'offset p50':>12}{'keyset p50':>12}{'offset p99':>12}{'keyset p99':>12}{'speedup':>9}")
+    for order_col, label in ((0, "NIK"), (1, "Name,NIK")):
+        for start in offsets:
+            # cursor halaman ini = baris terakhir sebelum `start`
+            after = None
+            if start:
+                prev = run_page(order_col, start - 1, None)
+                token = crud.encode_operator_cursor(prev[0], "", order_col, "asc")
+                after = crud.decode_operator_cursor(token, "", order_col, "asc")
+                assert [o.nik for o in run_page(order_col, start, None)] == [o.nik for o in run_page(order_col, 0, after)]
+            result = {}
+            for mode, seek in (("offset", None), ("keyset", after)):
+                skip = start if mode == "offset" else 0
+                result[mode] = timed(lambda: (run_page(order_col, skip, seek), db.expunge_all()), args.repeat)
+            p50 = {mode: percentile(samples, 50) for mode, samples in result.items()}
+            p99 = {mode: percentile(samples, 99) for mode, samples in result.items()}
+            print(f"{label:<12}{start:>8}{p50['offset']:>12.3f}{p50['keyset']:>12.3f}"
+                  f"{p99['offset']:>12.3f}{p99['keyset']:>12.3f}{p50['offset'] / p50['keyset']:>8.1f}x")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
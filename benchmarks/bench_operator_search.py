@@ -0,0 +1,86 @@
+"""
+Benchmark: pencarian operator lewat index trigram in-memory vs ILIKE di SQL.
+
+    python benchmarks/bench_operator_search.py --operators 100000
+
+Untuk mode index "full" dan "compact" dicatat waktu build dan memori (tracemalloc),
+lalu setiap prefix dari beberapa query (seperti user mengetik di popup DataTables)
+dijalankan lewat crud.get_operators dengan length=10.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from common import percentile, seed_roster, timed, use_sqlite
+
+TYPED = ["budi sin", "siregar", "00012", "putri w", "xyz"]
+
+
+def keystrokes():
+    for word in TYPED:
+        for i in range(1, len(word) + 1):
+            yield word[:i]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operators", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--stop-ratio", type=float, default=0.5)
+    parser.add_argument("--order-col", type=int, default=0, help="0 = NIK (default DataTables), 1 = Name")
+    args = parser.parse_args()
+
+    use_sqlite()
+    seed_roster(args.operators)
+
+    from sqlalchemy import select
+    from app import crud, models, operator_index
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    rows = db.execute(select(models.TMOperator.nik, models.TMOperator.name)).all()
+    queries = list(keystrokes())
+
+    def run_queries():
+        samples = []
+        for q in queries:
+            samples += timed(lambda: crud.get_operators(db, search=q, length=10, order_col=args.order_col), args.repeat)
+        return samples
+
+    print(f"{args.operators} operators, {len(queries)} keystrokes x {args.repeat} runs, order_col={args.order_col}")
+    print(f"{'backend':<10}{'build ms':>10}{'memory MB':>11}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+
+    operator_index._index = None
+    crud.get_operators(db, search="warmup")
+    samples = run_queries()
+    print(f"{'sql':<10}{'-':>10}{'-':>11}{percentile(samples, 50):>10.3f}{percentile(samples, 99):>10.3f}{max(samples):>10.3f}")
+
+    for mode in ("full", "compact"):
+        def build():
+            index = operator_index.OperatorSearchIndex(compact=mode == "compact", stop_ratio=args.stop_ratio).load(rows)
+            index.search("", order_col=1)  # urutan sort ikut dihitung
+            return index
+
+        # memori diukur di build terpisah karena tracemalloc memperlambat build
+        gc.collect()
+        tracemalloc.start()
+        index = build()
+        memory_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        tracemalloc.stop()
+        del index
+        gc.collect()
+        started = time.perf_counter()
+        index = build()
+        build_ms = (time.perf_counter() - started) * 1000
+
+        operator_index._index = index
+        samples = run_queries()
+        print(f"{mode:<10}{build_ms:>10.0f}{memory_mb:>11.1f}{percentile(samples, 50):>10.3f}{percentile(samples, 99):>10.3f}{max(samples):>10.3f}")
+        operator_index._index = None
+        del index
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
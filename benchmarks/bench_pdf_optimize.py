@@ -0,0 +1,42 @@
+"""
+Benchmark: ukuran dan waktu merge dossier dengan optimasi PDF per level kompresi.
+
+    python benchmarks/bench_pdf_optimize.py --pages 2 --image-kb 40
+
+Enam input mirip form hasil scan (gambar & content stream tanpa kompresi);
+input sertifikat memakai template yang sama sehingga gambar/font-nya identik,
+seperti dossier sungguhan. Level 0 = output PdfMerger apa adanya.
+"""
+import argparse
+import time
+
+from common import make_scanned_pdf, percentile, use_sqlite
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2, help="pages per input PDF")
+    parser.add_argument("--image-kb", type=int, default=40, help="uncompressed image size per input")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    use_sqlite()
+
+    from app.merge_engine import merge_pdfs
+
+    # 3 sertifikat dari template yang sama + 3 form evaluasi dari template lain
+    files = [make_scanned_pdf(args.pages, seed=0, image_kb=args.image_kb) for _ in range(3)]
+    files += [make_scanned_pdf(args.pages, seed=1, image_kb=args.image_kb) for _ in range(3)]
+    print(f"6 inputs x {args.pages} pages, {sum(map(len, files))} bytes in")
+    print(f"{'level':<7}{'bytes':>10}{'saved':>8}{'p50 ms':>9}{'max ms':>9}")
+    for level in (0, 1, 6, 9):
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = merge_pdfs(files, compression_level=level)
+            samples.append((time.perf_counter() - started) * 1000)
+        saved = 100 - len(result.data) * 100 / result.size_before
+        print(f"{level:<7}{len(result.data):>10}{saved:>7.0f}%{percentile(samples, 50):>9.1f}{max(samples):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Helper bersama untuk script benchmark.
+
+Semua benchmark memakai database SQLite sintetis sebagai pengganti SQL Server,
+jadi DATABASE_URL harus di-set sebelum modul `app` di-import.
+"""
+import base64
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_NAMES = [
+    "Budi", "Siti", "Agus", "Dewi", "Rina", "Andi", "Putri", "Eko", "Sri", "Yusuf",
+    "Nur", "Wahyu", "Fitri", "Bayu", "Indah", "Rizky", "Ayu", "Dimas", "Lestari", "Hendra",
+]
+LAST_NAMES = [
+    "Sinambela", "Siregar", "Nainggolan", "Simanjuntak", "Hutapea", "Pratama", "Saputra",
+    "Wijaya", "Santoso", "Lubis", "Nasution", "Harahap", "Situmorang", "Manurung", "Purba",
+]
+
+
+def use_sqlite(path: str = None) -> str:
+    """Arahkan app ke file SQLite (dibuat di temp dir kalau path kosong)."""
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="iab-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("BLOB_STORE_DIR", os.path.join(os.path.dirname(path), "blobs"))
+    # benchmark mengukur query, bukan cache halaman (kecuali di-set sendiri)
+    os.environ.setdefault("OPERATOR_PAGE_CACHE_TTL", "0")
+    os.chdir(ROOT)  # app.main me-mount folder static/ dan templates/ secara relatif
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return path
+
+
+def make_pdf(pages: int = 1) -> bytes:
+    from PyPDF2 import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=595, height=842)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def make_scanned_pdf(pages: int = 1, seed: int = 0, image_kb: int = 40) -> bytes:
+    """
+    PDF mirip form hasil scan: satu gambar grayscale tanpa kompresi (sama untuk
+    seed yang sama), font Helvetica dan content stream tanpa filter per halaman.
+    """
+    from PyPDF2 import PageObject, PdfWriter
+    from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+    rng = random.Random(seed)
+    side = int((image_kb * 1024) ** 0.5)
+    writer = PdfWriter()
+    image = DecodedStreamObject()
+    image._data = bytes(rng.choice((0, 0, 0, 255)) for _ in range(side * side))
+    image.update({
+        NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+        NameObject("/Width"): NumberObject(side), NameObject("/Height"): NumberObject(side),
+        NameObject("/ColorSpace"): NameObject("/DeviceGray"), NameObject("/BitsPerComponent"): NumberObject(8),
+    })
+    image_ref = writer._add_object(image)
+    font_ref = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"), NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for i in range(pages):
+        page = PageObject.create_blank_page(None, 595, 842)
+        content = DecodedStreamObject()
+        content._data = (b"q 500 0 0 700 40 80 cm /Im0 Do Q\n" + b"BT /F1 12 Tf 40 40 Td (Form page %d) Tj ET\n" % i) * 20
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): image_ref}),
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font_ref}),
+        })
+        writer.add_page(page)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def operator_rows(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "nik": f"{i + 1:08d}",
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "line": f"LINE-{rng.randint(1, 12)}",
+            "contract_status": rng.choice(["PKWT", "PKWTT"]),
+            "end_contract_date": date(2027, rng.randint(1, 12), 1),
+            "level": str(rng.randint(1, 4)),
+            "photo": b"\xff\xd8\xff" + bytes(rng.getrandbits(8) for _ in range(32)),
+        }
+
+
+def create_schema():
+    from app.database import engine
+    from app import migrations
+
+    migrations.upgrade(engine, echo=lambda msg: None)
+
+
+def seed_roster(count: int, documents_every: int = 0, batch_size: int = 5000):
+    """Isi TM_Operator; kalau documents_every > 0, setiap operator ke-N dapat sertifikat + evaluasi."""
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app import models
+
+    create_schema()
+    db = SessionLocal()
+    try:
+        batch = []
+        for row in operator_rows(count):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                db.execute(insert(models.TMOperator), batch)
+                batch = []
+        if batch:
+            db.execute(insert(models.TMOperator), batch)
+
+        if documents_every:
+            pdf_b64 = base64.b64encode(make_pdf()).decode("utf-8")
+            d = date(2026, 1, 1)
+            certs, evals = [], []
+            for i in range(0, count, documents_every):
+                nik = f"{i + 1:08d}"
+                certs.append(dict(
+                    nik=nik, soldering_written=90, soldering_practical=90, soldering_result="PASS",
+                    screwing_technique=90, screwing_work=90, screwing_result="PASS",
+                    ds_tiu=1, ds_accu=1, ds_heco=1, ds_mcc=1, ds_result="PASS",
+                    process="Assembly", ls_target=100, ls_actual=95, ls_achievement=95, ls_result="PASS",
+                    msaa_accuracy=95, msaa_missrate=1, msaa_falsealarm=1, msaa_confidence=95, msaa_result="PASS",
+                    soldering_docno="SOL-1", soldering_traindate=d, soldering_expdate=d,
+                    screwing_docno="SCR-1", screwing_traindate=d, screwing_expdate=d,
+                    msa_docno="MSA-1", msa_traindate=d, msa_expdate=d,
+                    file_soldering=pdf_b64, file_screwing=pdf_b64, file_msa=pdf_b64,
+                    status="Active",
+                ))
+                evals.append(dict(
+                    nik=nik, upload_date=d,
+                    op_train_eval=pdf_b64, op_skills_eval=pdf_b64, train_eval=pdf_b64,
+                ))
+            db.execute(insert(models.CertificationRecord), certs)
+            db.execute(insert(models.EvaluationDocument), evals)
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def timed(fn, repeat: int = 1):
+    """Jalankan fn sebanyak repeat kali, return list durasi (ms)."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
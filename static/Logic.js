@@ -94,6 +94,9 @@ document.addEventListener('DOMContentLoaded', () => {
   // --- Ambil daftar operator ---
   let operatorTable;
 
+// Cursor keyset /api/operators per posisi start; direset kalau search/urutan berubah
+let operatorCursors = { key: null, byStart: {} };
+
 async function loadOperators() {
   if ($.fn.DataTable.isDataTable('#operatorTable')) {
     operatorTable.destroy(); // reset kalau sudah ada
@@ -114,16 +117,30 @@ async function loadOperators() {
     data: function(d) {
       // d contains DataTables params
       // Bisa diteruskan ke backend untuk query
+      const key = JSON.stringify([d.search.value, d.order[0].column, d.order[0].dir, d.length]);
+      if (operatorCursors.key !== key) operatorCursors = { key, byStart: {} };
+      operatorCursors.lastStart = d.start;
+      operatorCursors.lastLength = d.length;
       return {
         search: d.search.value,
         start: d.start,
         length: d.length,
         order_col: d.order[0].column,
-        order_dir: d.order[0].dir
+        order_dir: d.order[0].dir,
+        // keyset cursor kalau halaman ini diakses berurutan dari halaman sebelumnya
+        cursor: operatorCursors.byStart[d.start],
+        // cukup tahu "1000+" untuk pencarian yang luas, tidak perlu COUNT penuh
+        count: 'capped',
+        // salah ketik nama tetap ketemu kalau pencarian biasa kosong
+        mode: 'auto'
       };
     },
     dataSrc: function(json) {
       //console.log('Server response:', json);
+      if (json.next_cursor) {
+        operatorCursors.byStart[operatorCursors.lastStart + operatorCursors.lastLength] = json.next_cursor;
+      }
+      operatorCursors.filteredCapped = !!json.filtered_capped;
       return json.data || [];
     }
   },
@@ -142,7 +159,8 @@ async function loadOperators() {
     infoCallback: function(settings, start, end, max, total, pre) {
     // total = jumlah hasil filter
     // max   = total data di database
-    return 'Showing ' + total + ' of ' + max + ' operators';
+    const shown = operatorCursors.filteredCapped ? total + '+' : total;
+    return 'Showing ' + shown + ' of ' + max + ' operators';
   }
   }
 });
@@ -325,6 +343,10 @@ $('#operatorModal .dataTables_paginate').hide();
 
 
   // Open base64 PDF in a new window
+  function isDocumentUrl(value) {
+    return typeof value === 'string' && (value.startsWith('/') || value.startsWith('http'));
+  }
+
   function base64ToBlob(base64, mimeType = 'application/pdf') {
     // Hapus prefix jika ada
     const cleaned = base64.replace(/^data:application\/pdf;base64,/, '');
@@ -340,6 +362,11 @@ $('#operatorModal .dataTables_paginate').hide();
       alert('No file data available to display.');
       return;
     }
+    // Backend sekarang mengirim URL dokumen; PDF baru diunduh saat dibuka
+    if (isDocumentUrl(base64)) {
+      window.open(base64, '_blank');
+      return;
+    }
     try {
       const blob = base64ToBlob(base64, 'application/pdf');
       const url = URL.createObjectURL(blob);
@@ -571,23 +598,16 @@ rows.forEach((row, idx) => {
     
 
 
-      // --- Certification record (GET) ---
-      // Expectation: backend exposes GET /api/certification?nik=... returning latest certification record.
-      const resCert = await fetch(`/api/certification?nik=${encodeURIComponent(nik)}`);
-      if (!resCert.ok) {
-        if (resCert.status === 404) {
-          // Not an error — operator exists but no certification record yet
-          clearCertificationFields();
-          alert('No certification record found for this operator.');
-        } else {
-          clearCertificationFields();
-          console.error('Certification fetch error:', resCert.status, resCert.statusText);
-          alert('Failed to fetch certification data. Please try again later.');
-        }
+      // --- Certification + evaluation ikut dalam response /api/operator/iab (satu request) ---
+      operatorData.evaluation = op.evaluation;
+      if (!op.certification) {
+        // Not an error — operator exists but no certification record yet
+        clearCertificationFields();
+        alert('No certification record found for this operator.');
         return;
       }
-      const cert = await safeJson(resCert);
-      populateCertification(cert);
+      populateCertification(op.certification);
+      populateEvaluation(op.evaluation);
 
     } catch (err) {
       console.error('Unexpected error while searching operator:', err);
@@ -600,22 +620,6 @@ rows.forEach((row, idx) => {
     }
 
     
-   // --- Evaluation record (GET) ---
-  const resEval = await fetch(`/api/evaluation?nik=${encodeURIComponent(operatorData.NIK)}`);
-    if (resEval.ok) {
-      const evalData = await safeJson(resEval);
-        populateEvaluation(evalData);
-          // simpan juga ke operatorData biar bisa dipakai di tempat lain
-          operatorData.evaluation = evalData;
-        } else {
-      const evalData = await safeJson(resEval);
-          populateEvaluation(evalData);
-          operatorData.evaluation = evalData;
-          console.log("Eval data from backend:", evalData);
-
-        }
-  
-      
       // ===================== Populate existing evaluation if any =========================
       // Populate Evaluation Report dari server response
       function populateEvaluation(evalData) {
@@ -690,19 +694,6 @@ const validatePDF = (file) => {
     return true;
 }
 
-function fileToBase64(file) {
-    return new Promise((resolve, reject) => {
-        const reader = new FileReader();
-        reader.readAsDataURL(file); // this includes the data URL prefix
-        reader.onload = () => {
-            const base64 = reader.result.split(',')[1]; // remove the "data:application/pdf;base64," prefix
-            resolve(base64);
-        };
-        reader.onerror = error => reject(error);
-    });
-}
-
-
 // Gunakan di setiap input file
 fileTrainingEval.addEventListener("change", e => {
     const file = e.target.files[0];
@@ -762,12 +753,7 @@ fileTrainingInEval.addEventListener("change", e => {
 }
 
     try {
-        // ================= 1. Simpan Evaluation ke T_EvaluationDocument =================
-        const base64TrainEval = await fileToBase64(uploadedFiles.trainingEval);
-        const base64SkillsEval = await fileToBase64(uploadedFiles.skillsEval);
-        const base64TrainingInEval = await fileToBase64(uploadedFiles.trainingInEval);
-
-        // ================= 2. Ambil Certification dari backend =================
+        // ================= 1. Cek Certification di backend =================
         const certRes = await fetch(`/api/certification?nik=${operatorData.NIK}`);
         const certData = await safeJson(certRes);
         if (!certData?.file_soldering || !certData?.file_screwing || !certData?.file_msa) {
@@ -776,22 +762,24 @@ fileTrainingInEval.addEventListener("change", e => {
             return;
         }
 
-        // ambil certification dari backend
-        const res = await fetch("/api/savemerge", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-                nik: operatorData.NIK,
-                op_train_eval: base64TrainEval,
-                op_skills_eval: base64SkillsEval,
-                train_eval: base64TrainingInEval,
-                file_soldering: certData.file_soldering,
-                file_screwing: certData.file_screwing,
-                file_msa: certData.file_msa
-            }),
-        });
-
-        if (!res.ok) throw new Error("Failed to save evaluation data.");
+        // ================= 2. Kirim file evaluasi (multipart, tanpa base64) =================
+        // file sertifikat tidak perlu dikirim, server memakai file yang sudah tersimpan
+        const form = new FormData();
+        form.append("nik", operatorData.NIK);
+        form.append("op_train_eval", uploadedFiles.trainingEval);
+        form.append("op_skills_eval", uploadedFiles.skillsEval);
+        form.append("train_eval", uploadedFiles.trainingInEval);
+        const res = await fetch("/api/savemerge/multipart", { method: "POST", body: form });
+
+        if (!res.ok) {
+            const failed = await safeJson(res);
+            throw new Error(failed?.detail || "Failed to save evaluation data.");
+        }
+        const saved = await safeJson(res);
+        // 202 = merge PDF dikerjakan worker di background, tunggu sampai selesai
+        if (saved?.job_id) {
+            await waitForMergeJob(saved.events_url, saveBtn);
+        }
         console.log("Evaluation saved!");
 
         alert("Evaluation data saved successfully!");
@@ -811,4 +799,27 @@ fileTrainingInEval.addEventListener("change", e => {
 
 }); // DOMContentLoaded end
 
+// ================= Progress job save+merge (Server-Sent Events) =================
+function waitForMergeJob(eventsUrl, button) {
+    return new Promise((resolve, reject) => {
+        const originalText = button.textContent;
+        const source = new EventSource(eventsUrl);
+        const finish = (fn, value) => {
+            source.close();
+            button.textContent = originalText;
+            fn(value);
+        };
+        source.addEventListener("progress", (e) => {
+            const job = JSON.parse(e.data);
+            button.textContent = `${job.message || job.status} (${job.progress}%)`;
+            if (job.status === "done") finish(resolve, job);
+            else if (job.status === "failed") finish(reject, new Error(job.error || "Merge failed"));
+        });
+        source.addEventListener("error", (e) => {
+            // EventSource reconnect sendiri kalau koneksi putus; error dari server = job hilang
+            if (e.data) finish(reject, new Error(JSON.parse(e.data).detail));
+        });
+    });
+}
+
 
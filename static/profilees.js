@@ -59,6 +59,12 @@ function openBase64Pdf(base64Data, fileName = "Document.pdf") {
       return;
     }
 
+    // Backend sekarang mengirim URL dokumen; PDF baru diunduh saat dibuka
+    if (base64Data.startsWith("/") || base64Data.startsWith("http")) {
+      window.open(base64Data, "_blank");
+      return;
+    }
+
     // 🧹 Bersihkan prefix dan whitespace
     const cleanBase64 = base64Data
       .replace(/^data:application\/pdf;base64,/, "") // hapus prefix
@@ -97,15 +103,6 @@ function openBase64Pdf(base64Data, fileName = "Document.pdf") {
 
 
 // ==================== Upload File ====================
-function fileToBase64(file) {
-    return new Promise((resolve, reject) => {
-        const reader = new FileReader();
-        reader.onload = () => resolve(reader.result.split(",")[1]);
-        reader.onerror = reject;
-        reader.readAsDataURL(file);
-    });
-}
-
 // Upload file to server
 async function uploadFile(nik, index, certificationType) {
   const fileInput    = document.querySelectorAll(".form-upload")[index];
@@ -121,43 +118,23 @@ async function uploadFile(nik, index, certificationType) {
     return;
   }
 
-  const base64File = await fileToBase64(file);
-
-  // >>> payload sesuai tipe + tanggal ke MM/DD/YYYY
-  let payload = { nik, status };
-  const t = formatDateToMMDDYYYY(trainingDate);
-  const e = formatDateToMMDDYYYY(expiredDate);
-
-  if (certificationType === "Soldering") {
-    Object.assign(payload, {
-      soldering_docno: docNo,
-      soldering_traindate: t,
-      soldering_expdate: e,
-      file_soldering: base64File
-    });
-  } else if (certificationType === "Screwing") {
-    Object.assign(payload, {
-      screwing_docno: docNo,
-      screwing_traindate: t,
-      screwing_expdate: e,
-      file_screwing: base64File
-    });
-  } else if (certificationType === "MSA") {
-    Object.assign(payload, {
-      msa_docno: docNo,
-      msa_traindate: t,
-      msa_expdate: e,
-      file_msa: base64File
-    });
-  } else {
+  // >>> field sesuai tipe + tanggal ke MM/DD/YYYY, file dikirim apa adanya (multipart)
+  const prefixes = { Soldering: "soldering", Screwing: "screwing", MSA: "msa" };
+  const prefix = prefixes[certificationType];
+  if (!prefix) {
     console.warn("Unknown certificationType:", certificationType);
+    return;
   }
 
-  const res = await fetch("/api/hrd/certification/upload", {
-    method: "POST",
-    headers: {"Content-Type": "application/json"},
-    body: JSON.stringify(payload)
-  });
+  const form = new FormData();
+  form.append("nik", nik);
+  form.append("status", status);
+  form.append(`${prefix}_docno`, docNo);
+  form.append(`${prefix}_traindate`, formatDateToMMDDYYYY(trainingDate));
+  form.append(`${prefix}_expdate`, formatDateToMMDDYYYY(expiredDate));
+  form.append(`file_${prefix}`, file);
+
+  const res = await fetch("/api/hrd/certification/upload/multipart", { method: "POST", body: form });
 
   if (!res.ok) throw new Error(`Failed to upload file for ${certificationType}`);
   console.log(`${certificationType} file uploaded successfully.`);
@@ -354,6 +331,9 @@ let uploadDocDate = ""; // Disimpan di memori
 
 
 
+// Cursor keyset /api/operators per posisi start; direset kalau search/urutan berubah
+let operatorCursors = { key: null, byStart: {} };
+
 async function loadOperators() {
   if ($.fn.DataTable.isDataTable('#operatorTable')) {
     operatorTable.destroy(); // reset kalau sudah ada
@@ -374,16 +354,30 @@ async function loadOperators() {
     data: function(d) {
       // d contains DataTables params
       // Bisa diteruskan ke backend untuk query
+      const key = JSON.stringify([d.search.value, d.order[0].column, d.order[0].dir, d.length]);
+      if (operatorCursors.key !== key) operatorCursors = { key, byStart: {} };
+      operatorCursors.lastStart = d.start;
+      operatorCursors.lastLength = d.length;
       return {
         search: d.search.value,
         start: d.start,
         length: d.length,
         order_col: d.order[0].column,
-        order_dir: d.order[0].dir
+        order_dir: d.order[0].dir,
+        // keyset cursor kalau halaman ini diakses berurutan dari halaman sebelumnya
+        cursor: operatorCursors.byStart[d.start],
+        // cukup tahu "1000+" untuk pencarian yang luas, tidak perlu COUNT penuh
+        count: 'capped',
+        // salah ketik nama tetap ketemu kalau pencarian biasa kosong
+        mode: 'auto'
       };
     },
     dataSrc: function(json) {
       console.log('Server response:', json);
+      if (json.next_cursor) {
+        operatorCursors.byStart[operatorCursors.lastStart + operatorCursors.lastLength] = json.next_cursor;
+      }
+      operatorCursors.filteredCapped = !!json.filtered_capped;
       return json.data || [];
     }
   },
@@ -402,7 +396,8 @@ async function loadOperators() {
     infoCallback: function(settings, start, end, max, total, pre) {
     // total = jumlah hasil filter
     // max   = total data di database
-    return 'Showing ' + total + ' of ' + max + ' operators';
+    const shown = operatorCursors.filteredCapped ? total + '+' : total;
+    return 'Showing ' + shown + ' of ' + max + ' operators';
   }
   }
 });
@@ -1333,61 +1328,3 @@ const certificationData = {
     alert("Error saving data: " + err.message);
   }
 });
-
-
-
-// ==================== Render Cert Files ====================
-function renderCertFiles(cert) {
-  const rows = document.querySelectorAll("#uploadCertTable tbody tr");
-
-  // Mapping row ke field cert
-  const certMap = [
-    { key: "file_soldering", rowIndex: 0, defaultName: "Soldering_Cert.pdf" },
-    { key: "file_screwing", rowIndex: 1, defaultName: "Screwing_Cert.pdf" },
-    { key: "file_msa",       rowIndex: 2, defaultName: "MSA_Cert.pdf" }
-  ];
-
-  certMap.forEach(cfg => {
-    const row = rows[cfg.rowIndex];
-    const fileData = cert[cfg.key];
-    if (!row) return;
-
-    const uploadBtn   = row.querySelector(".btn-upload-trigger");
-    const hiddenInput = row.querySelector(".form-upload");
-    const viewBtn     = row.querySelector(".btn-download");
-    const fileNameEl  = row.querySelector(".file-name");
-
-    if (fileData) {
-      // 1. Nonaktifkan form biar readonly
-      if (uploadBtn) uploadBtn.classList.add("d-none");
-      if (hiddenInput) hiddenInput.classList.add("d-none");
-
-      row.querySelectorAll("input").forEach(inp => inp.readOnly = true);
-
-      // 2. Tampilkan tombol View
-      viewBtn.classList.remove("d-none");
-      viewBtn.addEventListener("click", () => {
-        const blob = base64ToBlob(fileData, "application/pdf");
-        const url = URL.createObjectURL(blob);
-        window.open(url, "_blank");
-      });
-
-      // 3. Tampilkan nama file default
-      if (fileNameEl) fileNameEl.textContent = cfg.defaultName;
-    }
-  });
-}
-
-
-// ==================== Convert Base61 to Blob ====================
-  function base64ToBlob(base64, mimeType) {
-    const byteCharacters = atob(base64);
-    const byteNumbers = new Array(byteCharacters.length);
-    for (let i = 0; i < byteCharacters.length; i++) {
-      byteNumbers[i] = byteCharacters.charCodeAt(i);
-    }
-    const byteArray = new Uint8Array(byteNumbers);
-    return new Blob([byteArray], { type: mimeType });
-  }
-
-